@@ -0,0 +1,241 @@
+"""Stock allocation: job stock needs → reservations → job readiness.
+
+A job's `stockNeeds` are reserved against each item's free quantity
+(`onHand - reserved`). Every (job, item) pair gets one reservation record
+holding the allocated `qty`, the `requested` quantity and the remaining
+`shortage`; reservations with a shortage wait ("Beklemede") and are topped
+up by `replan` when stock comes in, oldest first. A job whose reservations
+are all complete becomes `URETIME_HAZIR`, otherwise `STOK_BEKLIYOR`.
+
+Waiting reservations are found through the `itemId` / `jobId` / `status`
+hash indexes of reservations.json, so re-planning after a goods receipt
+only touches the reservations of the received items.
+
+Callers hold `locked(*COLLECTIONS)`; each run is saved with one
+`save_changes` call.
+"""
+
+import uuid
+from datetime import datetime
+
+from .data_loader import find_records, get_record, load_json, save_changes
+from .inventory import apply_movement
+from .workflow import transition
+
+COLLECTIONS = ("jobs.json", "reservations.json", "stockItems.json", "stockMovements.json")
+
+RESERVED = "Ayrıldı"
+WAITING = "Beklemede"
+CANCELLED = "İptal"
+
+READY_STATUS = "URETIME_HAZIR"
+WAITING_STATUS = "STOK_BEKLIYOR"
+
+
+def need_item_id(need: dict) -> str | None:
+  """Item id of a `stockNeeds` line (`itemId`, or `id` as sent by md.web)."""
+  return need.get("itemId") or need.get("id")
+
+
+class _Run:
+  """Working copies of everything one allocation run changes."""
+
+  def __init__(self):
+    self.now = datetime.utcnow().isoformat()
+    self.items: dict[str, dict] = {}
+    self.original_items: dict[str, dict] = {}
+    self.movements: list[dict] = []
+    self.reservations: dict[str, dict] = {}
+    self.jobs: dict[str, tuple[dict, str, str | None]] = {}
+
+  def item(self, item_id: str) -> dict | None:
+    if item_id not in self.items:
+      item = get_record("stockItems.json", item_id)
+      if item is None:
+        return None
+      self.original_items[item_id] = self.items[item_id] = item
+    return self.items[item_id]
+
+  def free(self, item_id: str) -> float:
+    item = self.item(item_id)
+    return max(0, (item.get("onHand") or 0) - (item.get("reserved") or 0))
+
+  def move(self, item_id: str, movement_type: str, qty: float, job_id: str) -> None:
+    target, movement = apply_movement(
+        self.item(item_id), movement_type, qty, self.now,
+        reason="Rezervasyon" if movement_type == "reserve" else "Rezervasyon iptali",
+        reference=job_id,
+    )
+    self.items[item_id] = target
+    self.movements.append(movement)
+
+  def reservation(self, reservation: dict) -> dict:
+    return self.reservations.get(reservation["id"], reservation)
+
+  def job_reservations(self, job_id: str) -> list[dict]:
+    stored = {r["id"]: self.reservation(r) for r in find_records("reservations.json", "jobId", job_id)}
+    for reservation in self.reservations.values():
+      if reservation.get("jobId") == job_id:
+        stored[reservation["id"]] = reservation
+    return [r for r in stored.values() if r.get("status") != CANCELLED]
+
+  def save_job(self, job: dict, action: str, note: str | None = None) -> None:
+    job.setdefault("logs", []).append({"at": self.now, "action": action, "note": note})
+    self.jobs[job["id"]] = (job, action, note)
+
+  def commit(self) -> None:
+    changes = {}
+    if self.jobs:
+      jobs = load_json("jobs.json")
+      for job_id, (job, _action, _note) in self.jobs.items():
+        current = get_record("jobs.json", job_id)
+        if current is None:
+          jobs.insert(0, job)
+        else:
+          jobs[jobs.index(current)] = job
+      changes["jobs.json"] = (jobs, [
+          {"op": "put", "id": job_id, "at": self.now, "action": action, "note": note, "record": job}
+          for job_id, (job, action, note) in self.jobs.items()
+      ])
+    if self.reservations:
+      reservations = load_json("reservations.json")
+      added = []
+      for reservation_id, reservation in self.reservations.items():
+        current = get_record("reservations.json", reservation_id)
+        if current is None:
+          added.append(reservation)
+        else:
+          reservations[reservations.index(current)] = reservation
+      changes["reservations.json"] = (
+          added[::-1] + reservations,
+          [{"op": "put", "id": r["id"], "record": r} for r in self.reservations.values()],
+      )
+    if self.movements:
+      items = load_json("stockItems.json")
+      for item_id, original in self.original_items.items():
+        if self.items[item_id] is not original:
+          items[items.index(original)] = self.items[item_id]
+      changes["stockItems.json"] = (items, [
+          {"op": "put", "id": item_id, "record": item}
+          for item_id, item in self.items.items() if item is not self.original_items[item_id]
+      ])
+      changes["stockMovements.json"] = (
+          self.movements[::-1] + load_json("stockMovements.json"),
+          [{"op": "put", "id": m["id"], "record": m} for m in self.movements],
+      )
+    if changes:
+      save_changes(changes)
+
+
+def _refresh_job(run: _Run, job: dict) -> None:
+  """Recompute a job's stock summary from its reservations."""
+  reservations = run.job_reservations(job["id"])
+  shortages = [
+      {"itemId": r["itemId"], "item": r.get("item"), "shortage": r["shortage"]}
+      for r in reservations if r.get("shortage", 0) > 0
+  ]
+  stock = dict(job.get("stock") or {})
+  stock["ready"] = not shortages
+  stock["reservations"] = [r["id"] for r in reservations]
+  stock["shortages"] = shortages
+  stock["purchaseNotes"] = "; ".join(f"{s['item']}: {s['shortage']} eksik" for s in shortages) or stock.get("purchaseNotes")
+  job["stock"] = stock
+
+
+def allocate(job: dict, needs: list[dict]) -> dict:
+  """Reserve `needs` for `job` (replacing its earlier reservations) and save.
+
+  `job` is a working copy; its status and stock summary are updated and it
+  is saved together with the reservations and stock movements.
+  """
+  run = _Run()
+  job_id = job["id"]
+
+  # re-allocation: give back what this job held before
+  for reservation in run.job_reservations(job_id):
+    if reservation.get("qty") and run.item(reservation["itemId"]) is not None:
+      run.move(reservation["itemId"], "release", reservation["qty"], job_id)
+    run.reservations[reservation["id"]] = {**reservation, "qty": 0, "shortage": 0, "status": CANCELLED}
+
+  requested: dict[str, float] = {}
+  for need in needs:
+    item_id = need_item_id(need)
+    requested[item_id] = requested.get(item_id, 0) + float(need.get("qty") or 0)
+
+  for item_id, qty in requested.items():
+    if qty <= 0 or run.item(item_id) is None:
+      continue
+    allocated = min(qty, run.free(item_id))
+    if allocated > 0:
+      run.move(item_id, "reserve", allocated, job_id)
+    reservation_id = f"RSV-{str(uuid.uuid4())[:8].upper()}"
+    run.reservations[reservation_id] = {
+        "id": reservation_id,
+        "job": job_id,
+        "jobId": job_id,
+        "item": run.item(item_id).get("name"),
+        "itemId": item_id,
+        "qty": allocated,
+        "requested": qty,
+        "shortage": qty - allocated,
+        "dueDate": run.now[:10],
+        "createdAt": run.now,
+        "status": RESERVED if allocated >= qty else WAITING,
+    }
+
+  _refresh_job(run, job)
+  if requested:
+    transition(job, READY_STATUS if job["stock"]["ready"] else WAITING_STATUS)
+  note = "hazır" if job["stock"]["ready"] else f"{len(job['stock']['shortages'])} kalem eksik"
+  run.save_job(job, "stock.allocated", note)
+  run.commit()
+  return job
+
+
+def replan(item_ids: list[str] | None = None) -> list[str]:
+  """Top up waiting reservations from free stock, oldest first, and save.
+
+  With `item_ids` only those items are considered (e.g. after a goods
+  receipt); otherwise every item with a waiting reservation. Returns the
+  ids of jobs that became ready.
+  """
+  run = _Run()
+  if item_ids is None:
+    waiting = find_records("reservations.json", "status", WAITING)
+    item_ids = list(dict.fromkeys(r.get("itemId") for r in waiting if r.get("itemId")))
+
+  touched_jobs: set[str] = set()
+  for item_id in item_ids:
+    waiting = [r for r in find_records("reservations.json", "itemId", item_id) if r.get("status") == WAITING]
+    if not waiting or run.item(item_id) is None:
+      continue
+    for reservation in sorted(waiting, key=lambda r: (r.get("dueDate") or "", r.get("createdAt") or "")):
+      free = run.free(item_id)
+      if free <= 0:
+        break
+      add = min(reservation.get("shortage") or 0, free)
+      if add <= 0:
+        continue
+      run.move(item_id, "reserve", add, reservation["jobId"])
+      shortage = reservation["shortage"] - add
+      run.reservations[reservation["id"]] = {
+          **reservation,
+          "qty": (reservation.get("qty") or 0) + add,
+          "shortage": shortage,
+          "status": RESERVED if shortage <= 0 else WAITING,
+      }
+      touched_jobs.add(reservation["jobId"])
+
+  ready = []
+  for job_id in sorted(touched_jobs):
+    current = get_record("jobs.json", job_id)
+    if current is None:
+      continue
+    job = {**current, "stock": dict(current.get("stock") or {}), "logs": list(current.get("logs") or [])}
+    _refresh_job(run, job)
+    if job["stock"]["ready"] and job.get("status") == WAITING_STATUS:
+      transition(job, READY_STATUS)
+      ready.append(job_id)
+    run.save_job(job, "stock.allocated", "hazır" if job["stock"]["ready"] else "kısmi rezervasyon")
+  run.commit()
+  return ready
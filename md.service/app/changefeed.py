@@ -0,0 +1,102 @@
+"""Record-level change feed behind `/events/stream`.
+
+The feed lives in the process that saved the change: sequence numbers,
+the ring buffer and the `epoch` are per process. With `uvicorn --workers N`
+a client sees the per-record changes of the worker it is connected to;
+writes made by other workers only show up as a `reload` of the collection,
+once this worker notices the changed file on its next read of it.
+"""
+
+import asyncio
+import threading
+import uuid
+from collections import deque
+
+from .data_loader import store, subscribe
+
+DEFAULT_BUFFER = 1000
+
+
+class ChangeFeed:
+  """Ordered record-level changes of several collections.
+
+  Every put/delete event saved for a watched collection is numbered with a
+  process-wide sequence and kept in a bounded ring buffer, so a client can
+  resume from the last sequence it saw. A wholesale replacement or reload
+  of a collection becomes a single `reload` change; so does a resume point
+  that already fell out of the buffer (or belongs to an earlier process,
+  see `epoch`), since the client then has to refetch.
+  """
+
+  def __init__(self, collections: dict[str, str], size: int = DEFAULT_BUFFER):
+    # filename -> public collection name sent to clients
+    self.collections = collections
+    self.epoch = uuid.uuid4().hex[:8]
+    self._lock = threading.Lock()
+    self._buffer: deque[dict] = deque(maxlen=size)
+    self._seq = 0
+    self._loaded = {filename for filename in collections if store.is_cached(filename)}
+    self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+    for filename in collections:
+      subscribe(filename, lambda data, events, filename=filename: self._on_change(filename, events))
+
+  @property
+  def last_seq(self) -> int:
+    return self._seq
+
+  def _on_change(self, filename: str, events: list[dict] | None) -> None:
+    name = self.collections[filename]
+    with self._lock:
+      if events is None:
+        if filename not in self._loaded:
+          # first load from storage, nothing changed for clients
+          self._loaded.add(filename)
+          return
+        changes = [{"collection": name, "op": "reload"}]
+      else:
+        self._loaded.add(filename)
+        changes = [{"collection": name, **event} for event in events]
+      for change in changes:
+        self._seq += 1
+        self._buffer.append({"seq": self._seq, **change})
+      waiters = list(self._waiters)
+    for loop, event in waiters:
+      loop.call_soon_threadsafe(event.set)
+
+  def since(self, seq: int, collections: set[str] | None = None) -> list[dict] | None:
+    """Changes after `seq`, or None if some of them are no longer buffered."""
+    with self._lock:
+      if seq > self._seq:
+        return None
+      if seq < self._seq and (not self._buffer or self._buffer[0]["seq"] > seq + 1):
+        return None
+      changes = [c for c in self._buffer if c["seq"] > seq]
+    if collections:
+      changes = [c for c in changes if c["collection"] in collections]
+    return changes
+
+  async def wait(self, seq: int, timeout: float) -> None:
+    """Wait until there is a change after `seq` or `timeout` seconds pass."""
+    event = asyncio.Event()
+    waiter = (asyncio.get_running_loop(), event)
+    with self._lock:
+      if self._seq > seq:
+        return
+      self._waiters.add(waiter)
+    try:
+      await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+      pass
+    finally:
+      with self._lock:
+        self._waiters.discard(waiter)
+
+
+feed = ChangeFeed({
+    "jobs.json": "jobs",
+    "stockItems.json": "stockItems",
+    "stockMovements.json": "stockMovements",
+    "reservations.json": "reservations",
+    "customers.json": "customers",
+    "documents.json": "documents",
+})
@@ -0,0 +1,147 @@
+import hashlib
+from datetime import date
+
+from starlette.concurrency import run_in_threadpool
+
+from .data_loader import collection_tag
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def _if_none_match(headers: list[tuple[bytes, bytes]]) -> set[str]:
+  for name, value in headers:
+    if name == b"if-none-match":
+      tags = set()
+      for tag in value.decode("latin-1").split(","):
+        tag = tag.strip()
+        tags.add(tag[2:] if tag.startswith("W/") else tag)
+      return tags
+  return set()
+
+
+def _matches(etag: str, tags: set[str]) -> bool:
+  return "*" in tags or etag in tags
+
+
+def _under(path: str, prefix: str) -> bool:
+  return path == prefix or path.startswith(prefix.rstrip("/") + "/")
+
+
+class ConditionalGetMiddleware:
+  """Strong ETags, `If-None-Match` → 304 and Cache-Control for GET/HEAD.
+
+  Paths under a prefix registered in `collections` get an ETag derived from
+  the URL and the change tokens of the collections they read, so a match is
+  answered before the endpoint runs. Change tokens are read in the
+  threadpool, as they take the collection's read lock and may revalidate
+  it against storage. Prefixes in `dated` answer relative to today (e.g.
+  proposed slots, consumption windows), so today's date is part of their
+  ETag as well. Other JSON responses get an ETag from
+  a hash of their body. Responses that already carry an ETag, streams and
+  non-200 responses are passed through.
+  """
+
+  def __init__(
+      self, app, collections: dict[str, tuple[str, ...]] | None = None, dated: tuple[str, ...] = (),
+  ):
+    self.app = app
+    # longest prefix first so /stock/items can override /stock
+    self.collections = sorted((collections or {}).items(), key=lambda kv: len(kv[0]), reverse=True)
+    self.dated = dated
+
+  def _collections_for(self, path: str) -> tuple[str, ...] | None:
+    for prefix, names in self.collections:
+      if _under(path, prefix):
+        return names
+    return None
+
+  def _etag(self, scope, names: tuple[str, ...]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(scope["path"].encode())
+    digest.update(b"?" + scope.get("query_string", b""))
+    if any(_under(scope["path"], prefix) for prefix in self.dated):
+      digest.update(b"@" + date.today().isoformat().encode())
+    for name in names:
+      digest.update(b"\0" + collection_tag(name).encode())
+    return f'"{digest.hexdigest()}"'
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+      await self.app(scope, receive, send)
+      return
+
+    requested = _if_none_match(scope["headers"])
+    names = self._collections_for(scope["path"])
+    if names:
+      await self._versioned(scope, receive, send, names, requested)
+    else:
+      await self._hashed(scope, receive, send, requested)
+
+  async def _versioned(self, scope, receive, send, names, requested):
+    try:
+      etag = await run_in_threadpool(self._etag, scope, names)
+    except FileNotFoundError:
+      await self.app(scope, receive, send)
+      return
+    if _matches(etag, requested):
+      await _send_not_modified(send, etag)
+      return
+
+    async def send_with_etag(message):
+      if message["type"] == "http.response.start" and message["status"] == 200:
+        headers = list(message.get("headers", []))
+        if not any(k == b"etag" for k, _ in headers):
+          headers.append((b"etag", etag.encode()))
+          headers.append((b"cache-control", CACHE_CONTROL.encode()))
+        message = {**message, "headers": headers}
+      await send(message)
+
+    await self.app(scope, receive, send_with_etag)
+
+  async def _hashed(self, scope, receive, send, requested):
+    start = None
+    chunks: list[bytes] = []
+    passthrough = False
+
+    async def buffering_send(message):
+      nonlocal start, passthrough
+      if passthrough:
+        await send(message)
+        return
+      if message["type"] == "http.response.start":
+        headers = message.get("headers", [])
+        content_type = next((v for k, v in headers if k == b"content-type"), b"")
+        if (
+            message["status"] != 200
+            or not content_type.startswith(b"application/json")
+            or any(k == b"etag" for k, _ in headers)
+        ):
+          passthrough = True
+          await send(message)
+          return
+        start = message
+        return
+      chunks.append(message.get("body", b""))
+      if message.get("more_body"):
+        return
+      body = b"".join(chunks)
+      etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+      if _matches(etag, requested):
+        await _send_not_modified(send, etag)
+        return
+      headers = list(start.get("headers", []))
+      headers.append((b"etag", etag.encode()))
+      headers.append((b"cache-control", CACHE_CONTROL.encode()))
+      await send({**start, "headers": headers})
+      await send({"type": "http.response.body", "body": body})
+
+    await self.app(scope, receive, buffering_send)
+
+
+async def _send_not_modified(send, etag: str) -> None:
+  await send({
+      "type": "http.response.start",
+      "status": 304,
+      "headers": [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode())],
+  })
+  await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,126 @@
+"""Per-customer rollups over jobs.json, kept current from its change events.
+
+For each customer: job count by status, total and open offer value, and
+last activity (latest job log entry). A job change removes the job's
+previous contribution and adds the new one, so creating a job, updating an
+offer or closing its finance touches one customer's counters instead of
+rescanning every job. Outstanding balances come from the finance ledger
+(`app.receivables`), which is maintained the same way.
+"""
+
+import threading
+from typing import Any
+
+from .data_loader import load_json, subscribe
+from .money import to_kurus, to_lira
+from .receivables import ledger
+
+JOBS = "jobs.json"
+CLOSED_STATUS = "KAPALI"
+
+
+def _contribution(job: dict) -> tuple[Any, str | None, int, str | None]:
+  """(customer id, status, offer total in kuruş, last activity) of a job."""
+  try:
+    offer = to_kurus((job.get("offer") or {}).get("total"))
+  except ValueError:
+    offer = 0
+  logs = job.get("logs") or []
+  last = max((entry.get("at") or "" for entry in logs), default="") or None
+  return job.get("customerId"), job.get("status"), offer, last
+
+
+def _empty() -> dict:
+  return {"jobs": 0, "byStatus": {}, "offerTotal": 0, "openOfferTotal": 0, "activity": {}}
+
+
+class _Rollups:
+  def __init__(self):
+    self.jobs: dict[str, tuple] = {}
+    self.customers: dict[Any, dict] = {}
+
+  def apply(self, job_id: str, contribution: tuple, sign: int) -> None:
+    customer_id, status, offer, last = contribution
+    rollup = self.customers.get(customer_id)
+    if rollup is None:
+      rollup = self.customers[customer_id] = _empty()
+    rollup["jobs"] += sign
+    count = rollup["byStatus"].get(status, 0) + sign
+    if count:
+      rollup["byStatus"][status] = count
+    else:
+      rollup["byStatus"].pop(status, None)
+    rollup["offerTotal"] += sign * offer
+    if status != CLOSED_STATUS:
+      rollup["openOfferTotal"] += sign * offer
+    if sign > 0:
+      rollup["activity"][job_id] = last
+    else:
+      rollup["activity"].pop(job_id, None)
+    if rollup["jobs"] <= 0:
+      del self.customers[customer_id]
+
+  def put(self, job: dict) -> None:
+    self.remove(job.get("id"))
+    contribution = _contribution(job)
+    self.jobs[job.get("id")] = contribution
+    self.apply(job.get("id"), contribution, +1)
+
+  def remove(self, job_id: str) -> None:
+    previous = self.jobs.pop(job_id, None)
+    if previous is not None:
+      self.apply(job_id, previous, -1)
+
+
+class CustomerRollups:
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._rollups: _Rollups | None = None
+    self._changes = 0
+    subscribe(JOBS, self._on_change)
+
+  def _ensure(self) -> _Rollups:
+    rollups = self._rollups
+    if rollups is None:
+      seen = self._changes
+      rollups = _Rollups()
+      for job in load_json(JOBS):
+        rollups.put(job)
+      with self._lock:
+        if self._rollups is None and self._changes == seen:
+          self._rollups = rollups
+    return rollups
+
+  def _on_change(self, _data: Any, events: list[dict] | None) -> None:
+    with self._lock:
+      self._changes += 1
+      rollups = self._rollups
+      if rollups is None:
+        return
+      if events is None:
+        self._rollups = None
+        return
+      for event in events:
+        if event.get("op") == "delete":
+          rollups.remove(event.get("id"))
+        else:
+          rollups.put(event["record"])
+
+  def get(self, customer_id: str) -> dict:
+    """Rollup of one customer (zeros if it has no jobs)."""
+    rollup = self._ensure().customers.get(customer_id) or _empty()
+    account = ledger.account(customer_id)
+    closed = rollup["byStatus"].get(CLOSED_STATUS, 0)
+    return {
+        "jobs": rollup["jobs"],
+        "openJobs": rollup["jobs"] - closed,
+        "byStatus": dict(rollup["byStatus"]),
+        "offerTotal": to_lira(rollup["offerTotal"]),
+        "openOfferTotal": to_lira(rollup["openOfferTotal"]),
+        "outstanding": account["balance"] if account is not None else 0.0,
+        "afterDelivery": account["afterDelivery"] if account is not None else 0.0,
+        "lastActivity": max((at for at in rollup["activity"].values() if at), default=None),
+    }
+
+
+rollups = CustomerRollups()
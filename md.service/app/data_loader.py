@@ -1,8 +1,16 @@
-import json
 import os
+import threading
+import uuid
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
+
+from .indexes import RecordIndex
+from .locks import LockManager, file_lock
+from .persistence import writer_from_env
+from .storage import INDEXED_FIELDS, backend_from_env
 
 
 @lru_cache(maxsize=None)
@@ -14,29 +22,360 @@ def get_data_dir() -> Path:
   return Path(__file__).resolve().parent.parent.parent / "md.data"
 
 
-def load_json(filename: str) -> Any:
-  data_dir = get_data_dir()
-  path = data_dir / filename
-  if not path.exists():
-    raise FileNotFoundError(f"Data file not found: {path}")
-  
-  # Try different encodings
-  for encoding in ["utf-8", "utf-8-sig", "utf-16", "latin-1"]:
+def _env_int(name: str, default: int) -> int:
+  try:
+    return int(os.getenv(name, default))
+  except ValueError:
+    return default
+
+
+def _shallow_copy(data: Any) -> Any:
+  if isinstance(data, list):
+    return list(data)
+  if isinstance(data, dict):
+    return dict(data)
+  return data
+
+
+# distinguishes in-process version counters of different workers
+_PROCESS_TAG = uuid.uuid4().hex[:12]
+
+
+class VersionConflict(RuntimeError):
+  """A collection changed between a versioned load and its save."""
+
+
+@dataclass
+class _Entry:
+  # None while a write-behind flush is pending: the cached copy is newer
+  # than storage and must not be revalidated against it.
+  signature: tuple | None
+  data: Any
+  version: int
+  index: RecordIndex | None = None
+
+
+class CollectionStore:
+  """Process-wide cache of parsed md.data collections.
+
+  A cached collection is reused until the backend reports a different
+  signature (file inode/mtime/size for JSON, row version for SQLite), or
+  until it is replaced through `put`. Every replacement bumps the
+  collection's version counter. List collections get a `RecordIndex` on
+  first lookup, which is carried over and updated incrementally when a
+  replacement comes with its record-level events.
+
+  Listeners registered with `subscribe` are told about every replacement:
+  `callback(data, events)`, where `events` is None when the collection was
+  replaced wholesale or reloaded from storage.
+  """
+
+  def __init__(self, backend):
+    self.backend = backend
+    self._lock = threading.Lock()
+    self._entries: dict[str, _Entry] = {}
+    self._versions: dict[str, int] = {}
+    self._listeners: dict[str, list[Callable[[Any, list[dict] | None], None]]] = {}
+
+  def subscribe(self, filename: str, callback: Callable[[Any, list[dict] | None], None]) -> None:
+    self._listeners.setdefault(filename, []).append(callback)
+
+  def _notify(self, filename: str, data: Any, events: list[dict] | None) -> None:
+    for callback in self._listeners.get(filename, ()):
+      callback(data, events)
+
+  def get(self, filename: str) -> Any:
+    return self._entry(filename).data
+
+  def get_versioned(self, filename: str) -> tuple[Any, int]:
+    entry = self._entry(filename)
+    return entry.data, entry.version
+
+  def version(self, filename: str) -> int:
+    return self._entry(filename).version
+
+  def tag(self, filename: str) -> str:
+    """Opaque token that changes whenever the collection does.
+
+    Uses the storage signature when the cache is in sync with storage, so
+    workers sharing md.data produce the same token for the same content.
+    """
+    entry = self._entry(filename)
+    if entry.signature is not None:
+      return repr(entry.signature)
+    return f"{_PROCESS_TAG}:{entry.version}"
+
+  def index(self, filename: str) -> RecordIndex:
+    entry = self._entry(filename)
+    if entry.index is None:
+      with self._lock:
+        if entry.index is None:
+          entry.index = RecordIndex(entry.data if isinstance(entry.data, list) else [])
+    return entry.index
+
+  def is_cached(self, filename: str) -> bool:
+    return filename in self._entries
+
+  def _entry(self, filename: str) -> _Entry:
+    entry = self._entries.get(filename)
+    if entry is not None and entry.signature is None:
+      return entry
+
     try:
-      with path.open(encoding=encoding) as f:
-        return json.load(f)
-    except (UnicodeDecodeError, json.JSONDecodeError):
-      continue
-  
-  # If all encodings fail, raise error
-  raise ValueError(f"Cannot decode JSON file: {path}")
+      signature = self.backend.signature(filename)
+    except FileNotFoundError:
+      self.invalidate(filename)
+      raise
+
+    if entry is not None and entry.signature == signature:
+      return entry
+
+    with self._lock:
+      entry = self._entries.get(filename)
+      if entry is not None and entry.signature in (None, signature):
+        return entry
+      data = self.backend.read(filename)
+      entry = _Entry(signature, data, self._bump(filename))
+      self._entries[filename] = entry
+    self._notify(filename, data, None)
+    return entry
+
+  def put(
+      self,
+      filename: str,
+      data: Any,
+      expected_version: int | None = None,
+      events: Iterable[dict] | None = None,
+  ) -> int:
+    """Replace the cached collection ahead of its (pending) write.
+
+    Without `events` the indexes are dropped and rebuilt on next use.
+    """
+    if expected_version is not None:
+      # pick up writes of other workers before comparing versions
+      self._entry(filename)
+    with self._lock:
+      if expected_version is not None and self._versions.get(filename, 0) != expected_version:
+        raise VersionConflict(f"{filename} changed since version {expected_version}")
+      index = None
+      previous = self._entries.get(filename)
+      if events is not None and previous is not None and previous.index is not None:
+        index = previous.index
+        index.apply(events, data)
+      version = self._bump(filename)
+      self._entries[filename] = _Entry(None, data, version, index)
+    self._notify(filename, data, None if events is None else list(events))
+    return version
+
+  def _bump(self, filename: str) -> int:
+    version = self._versions.get(filename, 0) + 1
+    self._versions[filename] = version
+    return version
+
+  def mark_written(self, filename: str, data: Any) -> None:
+    """Called once `data` is in storage; re-enables revalidation."""
+    with self._lock:
+      entry = self._entries.get(filename)
+      if entry is not None and entry.data is data:
+        entry.signature = self.backend.signature(filename)
+
+  def invalidate(self, filename: str | None = None) -> None:
+    with self._lock:
+      if filename is None:
+        self._entries.clear()
+      else:
+        self._entries.pop(filename, None)
+
+
+backend = backend_from_env(get_data_dir(), fsync=os.getenv("DATA_DURABILITY", "batched").lower() == "sync")
+store = CollectionStore(backend)
+writer = writer_from_env(backend.write, on_written=store.mark_written)
+journal_compact_every = _env_int("JOURNAL_COMPACT_EVERY", 200)
+locks = LockManager(use_file_locks=os.getenv("DATA_FILE_LOCKS", "0").lower() in ("1", "true", "yes"))
+
+
+@contextmanager
+def locked(*filenames: str):
+  """Hold the write lock of one or more collections.
+
+  Wrap every load → mutate → save sequence in it (also usable as a
+  decorator). Locks are taken in sorted order; acquire every collection a
+  block needs in a single call. With `DATA_FILE_LOCKS=1` an `flock` is held
+  as well and pending writes are flushed before it is released, so several
+  uvicorn workers can share one md.data directory.
+  """
+  with ExitStack() as stack:
+    for name in sorted(set(filenames)):
+      lock = locks.get(name)
+      nested = lock.held_by_me()
+      stack.enter_context(lock.write())
+      if locks.use_file_locks and not nested:
+        stack.enter_context(file_lock(get_data_dir() / ".locks" / f"{name}.lock"))
+        stack.callback(writer.flush, name)
+    yield
+
+
+def subscribe(filename: str, callback: Callable[[Any, list[dict] | None], None]) -> None:
+  """Call `callback(data, events)` whenever `filename` is replaced.
+
+  `events` are the record-level put/delete events of the change, or None
+  when the whole collection was replaced or reloaded from storage.
+  """
+  store.subscribe(filename, callback)
+
+
+def load_json(filename: str) -> Any:
+  """Return a collection from the in-memory store.
+
+  The top-level list/dict is a fresh shallow copy, so callers may insert,
+  remove or replace entries freely; records themselves are shared with the
+  cache and must be replaced (not mutated in place) unless saved afterwards.
+  """
+  with locks.get(filename).read():
+    return _shallow_copy(store.get(filename))
+
+
+def collection_version(filename: str) -> int:
+  """Current version counter of `filename` (revalidated against storage)."""
+  with locks.get(filename).read():
+    return store.version(filename)
+
+
+def collection_tag(filename: str) -> str:
+  """Change token of `filename` for HTTP validators (see `CollectionStore.tag`)."""
+  with locks.get(filename).read():
+    return store.tag(filename)
+
+
+def load_versioned(filename: str) -> tuple[Any, int]:
+  """Like `load_json`, plus the version to pass to `save_json`."""
+  with locks.get(filename).read():
+    data, version = store.get_versioned(filename)
+    return _shallow_copy(data), version
+
+
+def get_record(filename: str, record_id: str) -> dict | None:
+  """Return the record with `id == record_id`, or None.
+
+  Served from the collection's hash index; a collection that is not cached
+  yet is read with an indexed point query when the backend supports it.
+  """
+  with locks.get(filename).read():
+    if backend.supports_queries and not store.is_cached(filename):
+      return backend.get_record(filename, record_id)
+    return store.index(filename).get(record_id)
+
+
+def find_records(filename: str, field: str, value: Any) -> list[dict]:
+  """Return the records whose `field` equals `value`, in collection order."""
+  with locks.get(filename).read():
+    if backend.supports_queries and not store.is_cached(filename) and field in INDEXED_FIELDS:
+      return backend.find_records(filename, field, value)
+    return store.index(filename).find(field, value)
+
+
+def put_record(filename: str, record: dict, front: bool = True, **meta: Any) -> dict:
+  """Insert or replace `record` (matched by `id`) and persist just that change.
+
+  New records go to the front of the list unless `front=False`. `meta`
+  (e.g. action/note) is stored on the event next to the record.
+  """
+  with locked(filename):
+    data = load_json(filename)
+    current = store.index(filename).get(record["id"])
+    if current is None:
+      data.insert(0, record) if front else data.append(record)
+      if not front:
+        meta["front"] = False
+    else:
+      data[data.index(current)] = record
+    save_changes({filename: (data, [{"op": "put", "id": record["id"], **meta, "record": record}])})
+  return record
+
+
+def delete_record(filename: str, record_id: str, **meta: Any) -> dict | None:
+  """Remove the record with `id == record_id`; returns it, or None if absent."""
+  with locked(filename):
+    current = store.index(filename).get(record_id)
+    if current is None:
+      return None
+    data = load_json(filename)
+    data.remove(current)
+    save_changes({filename: (data, [{"op": "delete", "id": record_id, **meta}])})
+  return current
+
+
+def save_json(filename: str, data: Any, expected_version: int | None = None) -> None:
+  """Store `data` as the new collection and schedule its write.
+
+  The in-memory store is updated immediately; storage is updated
+  according to `DATA_DURABILITY` (sync, batched or interval).
+  With `expected_version` (from `load_versioned`) the save is optimistic:
+  only the save itself holds the collection lock, and it raises
+  `VersionConflict` if the collection was replaced since that load.
+  """
+  if expected_version is not None:
+    with locked(filename):
+      _save_json(filename, data, expected_version)
+  else:
+    _save_json(filename, data)
+
+
+def _save_json(filename: str, data: Any, expected_version: int | None = None) -> None:
+  store.put(filename, data, expected_version)
+  if backend.journaled(filename):
+    # a full save of a journaled collection is its compaction
+    writer.write(filename, data)
+    return
+  writer.submit(filename, data)
+
+
+def use_journal(filename: str) -> None:
+  """Persist `filename` as snapshot + append-only `<name>.events.jsonl`.
+
+  Record changes are then written with `save_changes`; the snapshot is
+  rewritten every `JOURNAL_COMPACT_EVERY` events or on a full `save_json`.
+  The SQLite backend already writes single rows, so it needs no journal.
+  """
+  if hasattr(backend, "use_journal"):
+    backend.use_journal(filename)
+    store.invalidate(filename)
+
+
+def save_changes(changes: dict[str, tuple[Any, Iterable[dict]]]) -> None:
+  """Store several collections and persist their record-level events.
+
+  `changes` maps a filename to `(new_data, events)`. With SQLite all events
+  are applied in one transaction. With JSON files, journaled collections
+  append their events and the others are written through the write-behind
+  queue.
+  """
+  changes = {filename: (data, list(events)) for filename, (data, events) in changes.items()}
+  for filename, (data, events) in changes.items():
+    if backend.supports_queries or backend.journaled(filename):
+      # a pending full write would otherwise land on top of these events;
+      # plain JSON files just get their pending document replaced below
+      writer.flush(filename)
+    store.put(filename, data, events=events)
 
+  if backend.supports_queries:
+    backend.apply_events({
+        filename: (data if isinstance(data, list) else None, events)
+        for filename, (data, events) in changes.items()
+    })
+    for filename, (data, _events) in changes.items():
+      store.mark_written(filename, data)
+    return
 
-def save_json(filename: str, data: Any) -> None:
-  data_dir = get_data_dir()
-  data_dir.mkdir(parents=True, exist_ok=True)
-  path = data_dir / filename
-  with path.open("w", encoding="utf-8") as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
+  for filename, (data, events) in changes.items():
+    if not backend.journaled(filename):
+      writer.submit(filename, data)
+    elif backend.append_events(filename, events) >= journal_compact_every:
+      writer.write(filename, data)
+    else:
+      store.mark_written(filename, data)
 
 
+def flush(filename: str | None = None) -> None:
+  """Write pending collections to storage without waiting for the debounce."""
+  writer.flush(filename)
@@ -0,0 +1,111 @@
+"""Content-addressed storage for uploaded document files.
+
+Files live once under `md.docs/blobs/<sha256[:2]>/<sha256><ext>`, however
+many `documents.json` entries point at them (`DOCS_DIR` moves md.docs).
+The reference count of a blob is the number of documents with its
+`sha256` (answered from the hash index), so there is no separate counter
+to keep in sync; callers hold `locked("documents.json")` while adding or
+releasing references.
+
+`python -m app.docstore migrate` moves an existing per-type tree into the
+blob store, deduplicating identical files.
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+from .data_loader import find_records, flush, load_json, locked, save_json
+
+DOCS_ROOT = Path(os.getenv("DOCS_DIR") or Path(__file__).resolve().parent.parent.parent / "md.docs").resolve()
+BLOB_DIR = DOCS_ROOT / "blobs"
+BLOB_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def blob_relpath(sha256: str, ext: str) -> str:
+  """`path` value (relative to md.docs) of the blob with this hash."""
+  return f"blobs/{sha256[:2]}/{sha256}{ext}"
+
+
+def store_blob(tmp_path: Path, sha256: str, ext: str) -> str:
+  """Move a received file into the blob store; drop it if the blob exists."""
+  relpath = blob_relpath(sha256, ext)
+  target = DOCS_ROOT / relpath
+  if target.exists():
+    tmp_path.unlink(missing_ok=True)
+  else:
+    target.parent.mkdir(exist_ok=True)
+    os.replace(tmp_path, target)
+  return relpath
+
+
+def release_blob(doc: dict) -> bool:
+  """Remove the file of a deleted document unless others still reference it.
+
+  Call after the document was removed from `documents.json`. Documents
+  stored before the blob store (no `sha256`) own their file outright.
+  Returns True if a file was removed.
+  """
+  sha256 = doc.get("sha256")
+  if sha256 and any(d.get("path") == doc["path"] for d in find_records("documents.json", "sha256", sha256)):
+    return False
+  file_path = DOCS_ROOT / doc["path"]
+  try:
+    file_path.unlink()
+  except OSError:
+    return False  # file deletion is best effort
+  return True
+
+
+def file_sha256(path: Path) -> str:
+  digest = hashlib.sha256()
+  with open(path, "rb") as f:
+    while chunk := f.read(1024 * 1024):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+@locked("documents.json")
+def migrate() -> dict:
+  """Move every document file into the blob store, deduplicating by hash."""
+  docs = load_json("documents.json")
+  stats = {"moved": 0, "deduplicated": 0, "missing": 0, "bytesSaved": 0}
+  changed = False
+  for i, doc in enumerate(docs):
+    if doc.get("path", "").startswith("blobs/"):
+      continue
+    source = DOCS_ROOT / doc["path"]
+    if not source.exists():
+      stats["missing"] += 1
+      continue
+    sha256 = file_sha256(source)
+    relpath = blob_relpath(sha256, source.suffix.lower())
+    if (DOCS_ROOT / relpath).exists():
+      stats["deduplicated"] += 1
+      stats["bytesSaved"] += source.stat().st_size
+    else:
+      stats["moved"] += 1
+    store_blob(source, sha256, source.suffix.lower())
+    docs[i] = {**doc, "path": relpath, "sha256": sha256}
+    changed = True
+  if changed:
+    save_json("documents.json", docs)
+  return stats
+
+
+def main(argv: list[str]) -> int:
+  if argv[:1] != ["migrate"]:
+    print("usage: python -m app.docstore migrate", file=sys.stderr)
+    return 2
+  stats = migrate()
+  flush()
+  print(
+      f"taşınan: {stats['moved']}, tekilleştirilen: {stats['deduplicated']}, "
+      f"dosyası bulunamayan: {stats['missing']}, kazanılan: {stats['bytesSaved']} bayt"
+  )
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
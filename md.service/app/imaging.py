@@ -0,0 +1,51 @@
+"""Thumbnail rendering; runs inside the thumbnail worker processes.
+
+Kept free of service imports so a spawned worker only loads this module.
+Pillow (images) and pypdfium2 (PDF first page) are optional.
+"""
+
+import os
+
+try:
+  from PIL import Image
+except ImportError:  # optional: no thumbnails without Pillow
+  Image = None
+
+try:
+  import pypdfium2
+except ImportError:  # optional: no PDF previews without pypdfium2
+  pypdfium2 = None
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif"}
+PDF_TYPE = "application/pdf"
+
+
+def can_render(mime_type: str | None) -> bool:
+  if Image is None:
+    return False
+  if mime_type in IMAGE_TYPES:
+    return True
+  return mime_type == PDF_TYPE and pypdfium2 is not None
+
+
+def render_thumbnail(source: str, mime_type: str, target: str, size: int) -> str:
+  """Write a JPEG of at most `size`×`size` pixels for `source` to `target`."""
+  if mime_type == PDF_TYPE:
+    pdf = pypdfium2.PdfDocument(source)
+    try:
+      page = pdf[0]
+      # render close to the target size instead of full resolution
+      scale = size / max(page.get_size())
+      image = page.render(scale=max(scale, 0.1) * 2).to_pil()
+    finally:
+      pdf.close()
+  else:
+    image = Image.open(source)
+    image.draft("RGB", (size, size))  # JPEG: decode at reduced scale
+  image.thumbnail((size, size))
+  if image.mode not in ("RGB", "L"):
+    image = image.convert("RGB")
+  tmp = f"{target}.{os.getpid()}.tmp"
+  image.save(tmp, "JPEG", quality=80, optimize=True)
+  os.replace(tmp, target)
+  return target
@@ -0,0 +1,132 @@
+import threading
+from typing import Any, Iterable
+
+
+def _key(record: Any) -> Any:
+  record_id = record.get("id") if isinstance(record, dict) else None
+  return record_id if record_id is not None else id(record)
+
+
+def inserted_runs(records: list, added: set) -> tuple[int, int] | None:
+  """Lengths of the front and back runs of `records` whose keys are in `added`.
+
+  New records are inserted at the front or appended at the back of a
+  collection (in any event order); None means some were inserted elsewhere.
+  """
+  front = 0
+  while front < len(records) and _key(records[front]) in added:
+    front += 1
+  back = 0
+  while back < len(records) - front and _key(records[-1 - back]) in added:
+    back += 1
+  if front + back < len(added):
+    return None
+  return front, back
+
+
+class RecordIndex:
+  """Hash indexes over a list collection.
+
+  `id` is always indexed; a secondary index for any other field is built on
+  its first `find` and from then on kept up to date by `apply`, together
+  with the primary one. Collection order is tracked with a sequence number
+  per record so `find` can return matches in list order without scanning.
+  """
+
+  def __init__(self, records: list):
+    self._lock = threading.Lock()
+    self._by_id: dict[Any, dict] = {}
+    self._seq: dict[Any, int] = {}
+    self._fields: dict[str, dict[Any, dict[Any, dict]]] = {}
+    for pos, record in enumerate(records):
+      key = _key(record)
+      self._by_id[key] = record
+      self._seq[key] = pos
+    self._first = 0
+    self._last = len(records) - 1
+
+  def get(self, record_id: Any) -> dict | None:
+    return self._by_id.get(record_id)
+
+  def find(self, field: str, value: Any) -> list[dict]:
+    buckets = self._fields.get(field)
+    if buckets is None:
+      buckets = self._build(field)
+    try:
+      bucket = buckets.get(value)
+    except TypeError:  # unhashable filter value
+      return []
+    if not bucket:
+      return []
+    seq = self._seq
+    return [bucket[k] for k in sorted(bucket, key=seq.__getitem__)]
+
+  def apply(self, events: Iterable[dict], records: list) -> None:
+    """Update the indexes for `put`/`delete` events already applied to `records`."""
+    added = []
+    for event in events:
+      key = event.get("id")
+      old = self._by_id.get(key)
+      if old is not None:
+        self._unindex(key, old)
+      if event.get("op") == "delete":
+        self._by_id.pop(key, None)
+        self._seq.pop(key, None)
+        continue
+      record = event["record"]
+      if old is None:
+        added.append(key)
+      self._by_id[key] = record
+      self._reindex(key, record)
+    if added:
+      self._place({key for key in added if key in self._by_id}, records)
+
+  def _place(self, added: set, records: list) -> None:
+    """Sequence numbers for new records from their position in `records`.
+
+    The front and back runs of new records are numbered in list order; an
+    insert anywhere else renumbers the whole collection.
+    """
+    runs = inserted_runs(records, added)
+    if runs is None:
+      self._seq = {_key(record): pos for pos, record in enumerate(records)}
+      self._first, self._last = 0, len(records) - 1
+      return
+    front, back = runs
+    for i in range(front):
+      self._seq[_key(records[i])] = self._first - front + i
+    self._first -= front
+    for i in range(back):
+      self._seq[_key(records[len(records) - back + i])] = self._last + 1 + i
+    self._last += back
+
+  def _build(self, field: str) -> dict[Any, dict[Any, dict]]:
+    with self._lock:
+      buckets = self._fields.get(field)
+      if buckets is not None:
+        return buckets
+      buckets = {}
+      for key, record in self._by_id.items():
+        value = record.get(field)
+        try:
+          buckets.setdefault(value, {})[key] = record
+        except TypeError:
+          continue
+      self._fields[field] = buckets
+      return buckets
+
+  def _unindex(self, key: Any, record: dict) -> None:
+    for field, buckets in self._fields.items():
+      try:
+        bucket = buckets.get(record.get(field))
+      except TypeError:
+        continue
+      if bucket is not None:
+        bucket.pop(key, None)
+
+  def _reindex(self, key: Any, record: dict) -> None:
+    for field, buckets in self._fields.items():
+      try:
+        buckets.setdefault(record.get(field), {})[key] = record
+      except TypeError:
+        continue
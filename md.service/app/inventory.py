@@ -0,0 +1,48 @@
+"""Stock quantity changes shared by the stock endpoints and the allocation engine."""
+
+import uuid
+
+
+def apply_movement(
+    item: dict,
+    movement_type: str,
+    qty: float,
+    now: str,
+    reason: str | None = None,
+    operator: str | None = None,
+    reference: str | None = None,
+    location: str | None = None,
+) -> tuple[dict, dict]:
+  """Return the updated item and the movement record for one movement."""
+  target = dict(item)
+
+  # Apply movement
+  if movement_type == "stockIn":
+    target["onHand"] = (target.get("onHand") or 0) + qty
+  elif movement_type == "stockOut":
+    target["onHand"] = max(0, (target.get("onHand") or 0) - qty)
+  elif movement_type == "reserve":
+    target["reserved"] = (target.get("reserved") or 0) + qty
+  elif movement_type == "release":
+    target["reserved"] = max(0, (target.get("reserved") or 0) - qty)
+  target["lastUpdated"] = now[:10]
+
+  # Create movement record; deltas and resulting balances feed the stock ledger
+  change = qty if movement_type in ("stockIn", "reserve") else -qty
+  movement = {
+      "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
+      "date": now[:10],
+      "at": now,
+      "item": target.get("name"),
+      "itemId": item["id"],
+      "change": change,
+      "reason": reason or movement_type,
+      "operator": operator or "Sistem",
+      "reference": reference,
+      "location": location or target.get("warehouse") or "Ana Depo",
+      "type": movement_type,
+      "onHandChange": (target.get("onHand") or 0) - (item.get("onHand") or 0),
+      "reservedChange": (target.get("reserved") or 0) - (item.get("reserved") or 0),
+      "balanceAfter": {"onHand": target.get("onHand") or 0, "reserved": target.get("reserved") or 0},
+  }
+  return target, movement
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+
+class EventJournal:
+  """Append-only JSONL journal of record-level events for one collection.
+
+  Each event carries the full record after the change (`op: "put"`) or just
+  its id (`op: "delete"`), so appending costs O(record) and replaying the
+  journal over the last snapshot is idempotent.
+  """
+
+  def __init__(self, path: Path, fsync: bool = False):
+    self.path = path
+    self.fsync = fsync
+    self.count = 0
+    self._lock = threading.Lock()
+
+  def signature(self) -> tuple[int, int, int] | None:
+    try:
+      st = self.path.stat()
+    except FileNotFoundError:
+      return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+  def append(self, event: dict) -> None:
+    line = json.dumps(event, ensure_ascii=False) + "\n"
+    with self._lock:
+      self.path.parent.mkdir(parents=True, exist_ok=True)
+      with self.path.open("a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        if self.fsync:
+          os.fsync(f.fileno())
+      self.count += 1
+
+  def read(self) -> list[dict]:
+    events = []
+    try:
+      with self.path.open(encoding="utf-8") as f:
+        for line in f:
+          line = line.strip()
+          if not line:
+            continue
+          try:
+            events.append(json.loads(line))
+          except json.JSONDecodeError:
+            # torn final line from a crash mid-append
+            break
+    except FileNotFoundError:
+      pass
+    self.count = len(events)
+    return events
+
+  def truncate(self) -> None:
+    """Drop all events; call only once a snapshot containing them is durable."""
+    with self._lock:
+      try:
+        self.path.unlink()
+      except FileNotFoundError:
+        pass
+      self.count = 0
+
+
+def replay(records: list, events: Iterable[dict]) -> list:
+  """Rebuild a collection from a snapshot list and its journal events.
+
+  Records are matched by `id`; records created by the journal are placed in
+  front of the snapshot, newest first, the same way the routers insert them,
+  or appended after it when the event says `front: false`.
+  """
+  records = list(records)
+  added: list[Any] = []
+  appended: list[Any] = []
+  slots = {r.get("id"): (records, idx) for idx, r in enumerate(records)}
+  for event in events:
+    record_id = event.get("id")
+    slot = slots.get(record_id)
+    if event.get("op") == "delete":
+      if slot is not None:
+        slot[0][slot[1]] = None
+        del slots[record_id]
+      continue
+    if slot is not None:
+      slot[0][slot[1]] = event.get("record")
+    else:
+      target = added if event.get("front", True) else appended
+      slots[record_id] = (target, len(target))
+      target.append(event.get("record"))
+  return [r for r in reversed(added) if r is not None] + [r for r in records + appended if r is not None]
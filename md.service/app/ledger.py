@@ -0,0 +1,196 @@
+"""Per-item stock ledger with running balances.
+
+Each movement written by `create_movement` records its own deltas
+(`onHandChange` / `reservedChange`) and the resulting balances
+(`balanceAfter`), so every ledger entry is a balance checkpoint. Older
+movements that only carry a signed `change` get theirs reconstructed once,
+backwards from the nearest later checkpoint or the item's current balance.
+
+Entries are kept per item in chronological order with a parallel list of
+sort keys, so point-in-time balances and date ranges are binary searches.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any
+
+from .data_loader import load_json, subscribe
+
+MOVEMENTS = "stockMovements.json"
+ITEMS = "stockItems.json"
+
+# legacy movements stored the movement type as their reason
+RESERVED_REASONS = {"reserve", "release"}
+
+
+def movement_deltas(movement: dict) -> tuple[float, float]:
+  """(onHand change, reserved change) of a movement."""
+  if "onHandChange" in movement or "reservedChange" in movement:
+    return movement.get("onHandChange") or 0, movement.get("reservedChange") or 0
+  change = movement.get("change") or 0
+  if movement.get("type", movement.get("reason")) in RESERVED_REASONS:
+    return 0, change
+  return change, 0
+
+
+def _key(movement: dict, seq: int) -> tuple:
+  return (movement.get("date") or "", movement.get("at") or "", seq)
+
+
+def _probe(at: str, upper: bool) -> tuple:
+  """Search key for a date or timestamp; a bare date covers the whole day."""
+  if len(at) == 10:
+    return (at, "\uffff" if upper else "", float("inf") if upper else -1)
+  return (at[:10], at, float("inf") if upper else -1)
+
+
+class _ItemLedger:
+  def __init__(self, opening: tuple[float, float]):
+    self.opening = opening
+    self.keys: list[tuple] = []
+    self.entries: list[dict] = []
+
+  def append(self, key: tuple, movement: dict) -> None:
+    on_hand_change, reserved_change = movement_deltas(movement)
+    balance = movement.get("balanceAfter")
+    if balance is None:
+      on_hand, reserved = (self.entries[-1]["onHand"], self.entries[-1]["reserved"]) if self.entries else self.opening
+      balance = {"onHand": on_hand + on_hand_change, "reserved": reserved + reserved_change}
+    self.keys.append(key)
+    self.entries.append({
+        "movementId": movement.get("id"),
+        "date": movement.get("date"),
+        "at": movement.get("at"),
+        "reason": movement.get("reason"),
+        "reference": movement.get("reference"),
+        "onHandChange": on_hand_change,
+        "reservedChange": reserved_change,
+        "onHand": balance["onHand"],
+        "reserved": balance["reserved"],
+    })
+
+
+def _build(movements: list[dict], items: list[dict]) -> dict[str, _ItemLedger]:
+  ids_by_name = {item.get("name"): item["id"] for item in items}
+  current = {item["id"]: (item.get("onHand") or 0, item.get("reserved") or 0) for item in items}
+
+  grouped: dict[str, list[tuple[tuple, dict]]] = {}
+  # the collection is newest first: walk it backwards to number movements
+  # in the order they were made
+  for seq, movement in enumerate(reversed(movements)):
+    item_id = movement.get("itemId") or ids_by_name.get(movement.get("item"))
+    if item_id is not None:
+      grouped.setdefault(item_id, []).append((_key(movement, seq), movement))
+
+  ledgers = {}
+  for item_id, rows in grouped.items():
+    rows.sort(key=lambda row: row[0])
+    # balances after each movement, newest to oldest
+    after = [None] * len(rows)
+    balance = current.get(item_id)
+    for i in range(len(rows) - 1, -1, -1):
+      movement = rows[i][1]
+      stored = movement.get("balanceAfter")
+      if stored is not None:
+        balance = (stored["onHand"], stored["reserved"])
+      elif balance is None:
+        balance = (0, 0)
+      after[i] = balance
+      on_hand_change, reserved_change = movement_deltas(movement)
+      balance = (balance[0] - on_hand_change, balance[1] - reserved_change)
+    ledger = _ItemLedger(balance)
+    for (key, movement), (on_hand, reserved) in zip(rows, after):
+      ledger.append(key, {**movement, "balanceAfter": {"onHand": on_hand, "reserved": reserved}})
+    ledgers[item_id] = ledger
+  return ledgers
+
+
+class StockLedger:
+  """In-memory ledger built from stockMovements and kept up to date from its events."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._ledgers: dict[str, _ItemLedger] | None = None
+    self._known: set[str] = set()
+    self._next_seq = 0
+    self._changes = 0
+    subscribe(MOVEMENTS, self._on_movements)
+    subscribe(ITEMS, self._on_items)
+
+  def _ensure(self) -> dict[str, _ItemLedger]:
+    ledgers = self._ledgers
+    if ledgers is None:
+      seen = self._changes
+      movements = load_json(MOVEMENTS)
+      ledgers = _build(movements, load_json(ITEMS))
+      with self._lock:
+        if self._ledgers is None and self._changes == seen:
+          self._ledgers = ledgers
+          self._known = {m.get("id") for m in movements}
+          self._next_seq = len(movements)
+    return ledgers
+
+  def _on_movements(self, _data: Any, events: list[dict] | None) -> None:
+    with self._lock:
+      self._changes += 1
+      ledgers = self._ledgers
+      if ledgers is None:
+        return
+      for event in events or [None]:
+        movement = event.get("record") if event and event.get("op") == "put" else None
+        item_id = movement.get("itemId") if movement else None
+        ledger = ledgers.get(item_id)
+        key = _key(movement, self._next_seq) if movement else None
+        if (
+            item_id is None
+            or movement.get("id") in self._known
+            or (ledger is not None and key < ledger.keys[-1])
+        ):
+          # deletions, edits, back-dated movements and wholesale saves: rebuild
+          self._ledgers = None
+          return
+        if ledger is None:
+          ledger = ledgers[item_id] = _ItemLedger(_opening(movement))
+        ledger.append(key, movement)
+        self._known.add(movement.get("id"))
+        self._next_seq += 1
+
+  def _on_items(self, _data: Any, events: list[dict] | None) -> None:
+    if events is None:
+      # reconstructed balances depend on the items' current balances
+      with self._lock:
+        self._changes += 1
+        self._ledgers = None
+
+  def item(self, item_id: str) -> _ItemLedger | None:
+    return self._ensure().get(item_id)
+
+  def balance_at(self, item_id: str, at: str) -> dict | None:
+    """Balances of `item_id` after every movement up to `at` (date or ISO timestamp)."""
+    ledger = self.item(item_id)
+    if ledger is None:
+      return None
+    i = bisect_right(ledger.keys, _probe(at, upper=True)) - 1
+    if i < 0:
+      on_hand, reserved = ledger.opening
+      return {"onHand": on_hand, "reserved": reserved, "movementId": None}
+    entry = ledger.entries[i]
+    return {"onHand": entry["onHand"], "reserved": entry["reserved"], "movementId": entry["movementId"]}
+
+  def history(self, item_id: str, date_from: str | None = None, date_to: str | None = None) -> list[dict]:
+    """Ledger entries of `item_id` in chronological order, optionally within a range."""
+    ledger = self.item(item_id)
+    if ledger is None:
+      return []
+    start = bisect_left(ledger.keys, _probe(date_from, upper=False)) if date_from else 0
+    end = bisect_right(ledger.keys, _probe(date_to, upper=True)) if date_to else len(ledger.keys)
+    return ledger.entries[start:end]
+
+
+def _opening(movement: dict) -> tuple[float, float]:
+  balance = movement.get("balanceAfter") or {"onHand": 0, "reserved": 0}
+  on_hand_change, reserved_change = movement_deltas(movement)
+  return balance["onHand"] - on_hand_change, balance["reserved"] - reserved_change
+
+
+ledger = StockLedger()
@@ -0,0 +1,119 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+  import fcntl
+except ImportError:  # Windows: file locks are unavailable, single worker only
+  fcntl = None
+
+
+class RWLock:
+  """Readers-writer lock with writer preference.
+
+  The writing thread may re-enter both the write side and the read side, so
+  helpers that call `load_json` inside a `locked()` block do not deadlock.
+  """
+
+  def __init__(self):
+    self._cond = threading.Condition(threading.Lock())
+    self._readers = 0
+    self._writer: int | None = None
+    self._writer_depth = 0
+    self._waiting_writers = 0
+
+  def acquire_read(self) -> None:
+    me = threading.get_ident()
+    with self._cond:
+      if self._writer == me:
+        self._writer_depth += 1
+        return
+      while self._writer is not None or self._waiting_writers:
+        self._cond.wait()
+      self._readers += 1
+
+  def release_read(self) -> None:
+    me = threading.get_ident()
+    with self._cond:
+      if self._writer == me:
+        self._writer_depth -= 1
+        return
+      self._readers -= 1
+      if not self._readers:
+        self._cond.notify_all()
+
+  def acquire_write(self) -> None:
+    me = threading.get_ident()
+    with self._cond:
+      if self._writer == me:
+        self._writer_depth += 1
+        return
+      self._waiting_writers += 1
+      try:
+        while self._writer is not None or self._readers:
+          self._cond.wait()
+      finally:
+        self._waiting_writers -= 1
+      self._writer = me
+      self._writer_depth = 1
+
+  def release_write(self) -> None:
+    with self._cond:
+      self._writer_depth -= 1
+      if not self._writer_depth:
+        self._writer = None
+        self._cond.notify_all()
+
+  def held_by_me(self) -> bool:
+    return self._writer == threading.get_ident()
+
+  @contextmanager
+  def read(self):
+    self.acquire_read()
+    try:
+      yield
+    finally:
+      self.release_read()
+
+  @contextmanager
+  def write(self):
+    self.acquire_write()
+    try:
+      yield
+    finally:
+      self.release_write()
+
+
+@contextmanager
+def file_lock(path: Path):
+  """Exclusive `flock` on `path`, shared by all worker processes."""
+  if fcntl is None:
+    yield
+    return
+  path.parent.mkdir(parents=True, exist_ok=True)
+  fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+  try:
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+      yield
+    finally:
+      fcntl.flock(fd, fcntl.LOCK_UN)
+  finally:
+    os.close(fd)
+
+
+class LockManager:
+  """Hands out one RWLock per collection and, optionally, its file lock."""
+
+  def __init__(self, use_file_locks: bool = False):
+    self.use_file_locks = use_file_locks and fcntl is not None
+    self._guard = threading.Lock()
+    self._locks: dict[str, RWLock] = {}
+
+  def get(self, name: str) -> RWLock:
+    lock = self._locks.get(name)
+    if lock is None:
+      with self._guard:
+        lock = self._locks.setdefault(name, RWLock())
+    return lock
@@ -1,11 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from . import data_loader, thumbnails, workflow
+from .conditional import ConditionalGetMiddleware
+from .responses import FastJSONResponse
+from .uploads import UploadSizeLimitMiddleware
 
 from .routers import (
     archive,
     customers,
     dashboard,
     documents,
+    events,
     finance,
     jobs,
     planning,
@@ -21,14 +28,42 @@ app = FastAPI(
     title="MD Service",
     description="Modüler FastAPI backend; veri kaynağı md.data klasörü.",
     version="0.1.0",
+    default_response_class=FastJSONResponse,
 )
 
+# GET responses under these prefixes depend only on the listed collections
+# (and, for `dated`, on today's date); their ETag is derived from the
+# collections' change tokens. Added before CORS so 304 answers still carry
+# the CORS headers.
+app.add_middleware(
+    ConditionalGetMiddleware,
+    collections={
+        "/dashboard": ("dashboard.json", "jobs.json", "tasks.json", "stockItems.json"),
+        "/jobs": ("jobs.json",),
+        "/tasks": ("tasks.json",),
+        "/customers": ("customers.json", "jobs.json"),
+        "/planning": ("planningEvents.json", "jobs.json", "teams.json"),
+        "/stock": ("stockItems.json", "stockMovements.json", "reservations.json", "requests.json", "purchaseOrders.json"),
+        "/purchase": ("purchaseOrders.json", "suppliers.json", "requests.json"),
+        "/finance": ("invoices.json", "payments.json", "jobs.json"),
+        "/archive": ("archiveFiles.json",),
+        "/reports": ("reports.json",),
+        "/settings": ("settings.json",),
+        "/colors": ("colors.json",),
+        "/documents": ("documents.json",),
+    },
+    dated=("/planning", "/stock/reorder-suggestions"),
+)
+
+app.add_middleware(UploadSizeLimitMiddleware, paths=("/documents/upload",))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
 )
 
 app.include_router(dashboard.router)
@@ -44,6 +79,28 @@ app.include_router(reports.router)
 app.include_router(settings.router)
 app.include_router(colors.router)
 app.include_router(documents.router)
+app.include_router(events.router)
+
+
+@app.exception_handler(workflow.InvalidTransition)
+def invalid_transition_handler(request: Request, exc: workflow.InvalidTransition):
+  return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+@app.exception_handler(data_loader.VersionConflict)
+def version_conflict_handler(request: Request, exc: data_loader.VersionConflict):
+  return JSONResponse(status_code=409, content={"detail": "Kayıt başka bir istek tarafından değiştirildi, tekrar deneyin"})
+
+
+@app.on_event("startup")
+def start_background_work():
+  thumbnails.start()
+
+
+@app.on_event("shutdown")
+def shutdown_background_work():
+  data_loader.flush()
+  thumbnails.shutdown()
 
 
 @app.get("/health", tags=["meta"])
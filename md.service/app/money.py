@@ -0,0 +1,36 @@
+"""Money amounts as integer kuruş.
+
+Amounts stay lira numbers with at most two decimals in md.data and in API
+payloads; arithmetic on them is done in integer kuruş so sums of many
+partial payments are exact. Parsing goes through `Decimal(str(value))`, so
+a JSON 0.1 is 10 kuruş rather than the nearest binary float.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any
+
+_ONE = Decimal(1)
+
+
+def to_kurus(value: Any) -> int:
+  """Kuruş of a lira amount (number, numeric string or Decimal); empty is 0."""
+  if value is None or value == "":
+    return 0
+  if isinstance(value, bool):
+    raise ValueError(f"Geçersiz tutar: {value!r}")
+  try:
+    amount = value if isinstance(value, Decimal) else Decimal(str(value).strip())
+  except InvalidOperation:
+    raise ValueError(f"Geçersiz tutar: {value!r}") from None
+  if not amount.is_finite():
+    raise ValueError(f"Geçersiz tutar: {value!r}")
+  return int((amount * 100).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def to_lira(kurus: int) -> float:
+  """JSON number for an amount in kuruş (exact to two decimals)."""
+  return kurus / 100
+
+
+def format_lira(kurus: int) -> str:
+  return f"{to_lira(kurus):,.2f}₺"
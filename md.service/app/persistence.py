@@ -0,0 +1,175 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+DURABILITY_MODES = ("sync", "batched", "interval")
+
+
+def atomic_write_json(path: Path, data: Any) -> None:
+  """Write `data` to `path` via temp file + fsync + rename.
+
+  Readers either see the previous file or the complete new one, never a
+  half-written document.
+  """
+  path.parent.mkdir(parents=True, exist_ok=True)
+  fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+  try:
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+      json.dump(data, f, ensure_ascii=False, indent=2)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_name, path)
+  except BaseException:
+    try:
+      os.unlink(tmp_name)
+    except FileNotFoundError:
+      pass
+    raise
+  _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+  if os.name != "posix":
+    return
+  fd = os.open(directory, os.O_RDONLY)
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
+
+
+class WriteBehind:
+  """Coalescing write-behind queue for collection files.
+
+  - `sync`: every submit is written before returning.
+  - `batched`: writes are debounced; a burst of submits for the same file
+    is flushed once after `delay` seconds of quiet (at most `max_delay`).
+  - `interval`: dirty files are flushed every `interval` seconds.
+
+  Only the latest submitted document per file is kept, so N mutations in a
+  burst cost one serialize + write. `write_fn(key, data)` does the actual
+  storage write (a JSON file or a database transaction).
+  """
+
+  def __init__(
+      self,
+      write_fn: Callable[[str, Any], None],
+      mode: str = "batched",
+      delay: float = 0.05,
+      interval: float = 1.0,
+      on_written: Callable[[str, Any], None] | None = None,
+  ):
+    if mode not in DURABILITY_MODES:
+      raise ValueError(f"Unknown durability mode: {mode}")
+    self.mode = mode
+    self.delay = delay
+    self.max_delay = max(delay * 10, delay)
+    self.interval = interval
+    self.write_fn = write_fn
+    self.on_written = on_written
+    self._cond = threading.Condition()
+    self._io_lock = threading.Lock()
+    self._pending: dict[str, Any] = {}
+    self._inflight: set[str] = set()
+    self._first_submit = 0.0
+    self._last_submit = 0.0
+    self._thread: threading.Thread | None = None
+
+  def submit(self, key: str, data: Any) -> None:
+    if self.mode == "sync":
+      self.write(key, data)
+      return
+    with self._cond:
+      now = time.monotonic()
+      if not self._pending:
+        self._first_submit = now
+      self._last_submit = now
+      self._pending[key] = data
+      self._ensure_thread()
+      self._cond.notify()
+
+  def is_pending(self, key: str) -> bool:
+    """True while storage is behind the submitted data for `key`."""
+    with self._cond:
+      return key in self._pending or key in self._inflight
+
+  def flush(self, key: str | None = None) -> None:
+    """Write pending documents now (all of them when `key` is None)."""
+    with self._io_lock:
+      with self._cond:
+        if key is None:
+          batch = self._pending
+          self._pending = {}
+        elif key in self._pending:
+          batch = {key: self._pending.pop(key)}
+        else:
+          batch = {}
+        self._inflight.update(batch)
+      try:
+        for name, data in batch.items():
+          self._write_locked(name, data)
+      finally:
+        with self._cond:
+          self._inflight.difference_update(batch)
+
+  def write(self, key: str, data: Any) -> None:
+    """Write `data` now, superseding anything pending for `key`."""
+    with self._io_lock:
+      with self._cond:
+        self._pending.pop(key, None)
+      self._write_locked(key, data)
+
+  def _write_locked(self, key: str, data: Any) -> None:
+    self.write_fn(key, data)
+    if self.on_written:
+      self.on_written(key, data)
+
+  def _ensure_thread(self) -> None:
+    if self._thread is None or not self._thread.is_alive():
+      self._thread = threading.Thread(target=self._run, name="md-write-behind", daemon=True)
+      self._thread.start()
+
+  def _run(self) -> None:
+    while True:
+      with self._cond:
+        while not self._pending:
+          self._cond.wait()
+        if self.mode == "interval":
+          self._cond.wait(self.interval)
+        else:
+          while True:
+            now = time.monotonic()
+            quiet_until = self._last_submit + self.delay
+            hard_until = self._first_submit + self.max_delay
+            deadline = min(quiet_until, hard_until)
+            if now >= deadline:
+              break
+            self._cond.wait(deadline - now)
+      self.flush()
+
+
+def _env_float(name: str, default: float) -> float:
+  try:
+    return float(os.getenv(name, default))
+  except ValueError:
+    return default
+
+
+def writer_from_env(
+    write_fn: Callable[[str, Any], None],
+    on_written: Callable[[str, Any], None] | None = None,
+) -> WriteBehind:
+  writer = WriteBehind(
+      write_fn,
+      mode=os.getenv("DATA_DURABILITY", "batched").lower(),
+      delay=_env_float("DATA_FLUSH_DELAY", 0.05),
+      interval=_env_float("DATA_FLUSH_INTERVAL", 1.0),
+      on_written=on_written,
+  )
+  atexit.register(writer.flush)
+  return writer
@@ -0,0 +1,142 @@
+"""Shared pagination / filtering / sorting for list endpoints.
+
+List endpoints keep returning a plain JSON array so existing clients work
+unchanged; paging metadata travels in headers:
+
+- `X-Total-Count`: matches after filtering, before paging
+- `X-Next-Cursor`: pass back as `cursor=` to get the following page
+
+`fields=id,title,status` trims every returned record to those keys.
+"""
+
+import base64
+import json
+from typing import Any, Callable
+
+from fastapi import HTTPException, Query, Response
+
+from .data_loader import find_records, get_record, load_json
+
+MAX_LIMIT = 500
+
+
+class ListParams:
+  def __init__(
+      self,
+      limit: int | None = Query(None, ge=1, le=MAX_LIMIT, description="Sayfa boyutu; verilmezse tümü döner"),
+      offset: int = Query(0, ge=0),
+      cursor: str | None = Query(None, description="Önceki yanıtın X-Next-Cursor değeri"),
+      sort: str | None = Query(None, description="Sıralama alanı; azalan için '-' öneki (ör. -date)"),
+      date_from: str | None = Query(None, description="Tarih alanı >= (ISO)"),
+      date_to: str | None = Query(None, description="Tarih alanı <= (ISO)"),
+      fields: str | None = Query(None, description="Döndürülecek alanlar, virgülle ayrılmış (ör. id,title,status)"),
+  ):
+    self.limit = limit
+    self.offset = offset
+    self.cursor = cursor
+    self.sort = sort
+    self.date_from = date_from
+    self.date_to = date_to
+    self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+def _sort_key(value: Any) -> tuple:
+  if value is None:
+    return (2, "")
+  if isinstance(value, (int, float)) and not isinstance(value, bool):
+    return (0, value)
+  return (1, str(value))
+
+
+def _encode_cursor(record: dict, position: int) -> str:
+  raw = json.dumps({"after": record.get("id"), "pos": position}, separators=(",", ":"))
+  return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+  try:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+  except (ValueError, json.JSONDecodeError):
+    raise HTTPException(status_code=400, detail="Geçersiz cursor") from None
+
+
+def query_collection(
+    filename: str,
+    params: ListParams,
+    response: Response,
+    filters: dict[str, Any] | None = None,
+    date_field: str | None = None,
+    transform: Callable[[dict], dict] | None = None,
+    sort_transformed: bool = False,
+) -> list:
+  """Filter, sort and page a list collection.
+
+  The first non-empty equality filter is answered from the collection's
+  hash index; the remaining ones only look at those candidates. `transform`
+  maps each record of the returned page (e.g. to a precomputed summary)
+  before `fields` is applied. With `sort_transformed` a sorted request maps
+  every match first, so fields computed by `transform` can be sorted on.
+  """
+  active = {field: value for field, value in (filters or {}).items() if value is not None}
+  if active:
+    field, value = next(iter(active.items()))
+    items = find_records(filename, field, value)
+    rest = list(active.items())[1:]
+    if rest:
+      items = [r for r in items if all(r.get(f) == v for f, v in rest)]
+  else:
+    items = load_json(filename)
+
+  if date_field and (params.date_from or params.date_to):
+    low, high = params.date_from, params.date_to
+    # ISO dates compare correctly as strings; a bare date as upper bound
+    # includes the whole day
+    if high and len(high) == 10:
+      high += "\uffff"
+    items = [
+        r for r in items
+        if isinstance(r.get(date_field), str)
+        and (not low or r[date_field] >= low)
+        and (not high or r[date_field] <= high)
+    ]
+
+  if params.sort and transform is not None and sort_transformed:
+    items = [transform(r) for r in items]
+    transform = None
+
+  if params.sort:
+    field = params.sort.lstrip("-")
+    items = sorted(items, key=lambda r: _sort_key(r.get(field)), reverse=params.sort.startswith("-"))
+
+  total = len(items)
+  start = params.offset
+  if params.cursor:
+    state = _decode_cursor(params.cursor)
+    start = state.get("pos", 0)
+    after = get_record(filename, state.get("after")) if state.get("after") is not None else None
+    if after is not None:
+      # keyset: resume right after the last record of the previous page even
+      # if records were inserted or removed in front of it meanwhile
+      after_id = after.get("id")
+      start = next((i + 1 for i, r in enumerate(items) if r is after or r.get("id") == after_id), start)
+
+  response.headers["X-Total-Count"] = str(total)
+  if params.limit is None:
+    page = items[start:] if start else items
+  else:
+    page = items[start:start + params.limit]
+    end = start + len(page)
+    if page and end < total:
+      response.headers["X-Next-Cursor"] = _encode_cursor(page[-1], end)
+
+  if transform is not None:
+    page = [transform(r) for r in page]
+  if params.fields:
+    page = project(page, params.fields)
+  return page
+
+
+def project(items: list, fields: list[str]) -> list:
+  """Keep only `fields` of each record (missing keys are omitted)."""
+  return [{f: r[f] for f in fields if f in r} for r in items]
@@ -0,0 +1,243 @@
+"""Finance ledger: payment entries derived from job approval and close data.
+
+Each job contributes
+- a `charge` (the offer total, or the closed total) once approval started,
+- `prepayment` entries per method from `approval.paymentPlan`, dated at
+  the `approval.started` log,
+- `final` entries from `finance.finalPayments` and a `discount`, dated at
+  `finance.closedAt`,
+- its `afterDelivery` amount as outstanding while the job is not closed.
+
+Per-customer balances, overall totals and per-day cash/card/cheque totals
+are running sums: a job change subtracts the job's previous contribution
+and adds the new one, so reads are O(1) (customer, totals) or a bisect
+over the sorted day / entry keys (date ranges) instead of a walk over all
+jobs. Sums are kept in integer kuruş (`app.money`) so adding and removing
+contributions never drifts. Non-positive or unparsable amounts in payment
+plans are ignored.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any
+
+from .data_loader import load_json, subscribe
+from .money import to_kurus, to_lira
+
+JOBS = "jobs.json"
+
+METHODS = ("cash", "card", "cheque")
+CLOSED_STATUS = "KAPALI"
+
+
+def _amount(value: Any) -> int:
+  """Kuruş of a positive amount; anything else counts as 0."""
+  try:
+    amount = to_kurus(value)
+  except ValueError:
+    return 0
+  return amount if amount > 0 else 0
+
+
+def _log_date(job: dict, action: str) -> str | None:
+  for entry in reversed(job.get("logs") or []):
+    if entry.get("action") == action and entry.get("at"):
+      return entry["at"][:10]
+  return None
+
+
+def job_entries(job: dict) -> tuple[list[dict], int]:
+  """(ledger entries, outstanding afterDelivery in kuruş) of one job."""
+  approval = job.get("approval") or {}
+  if not approval:
+    return [], 0
+  finance = job.get("finance") or {}
+  closed = job.get("status") == CLOSED_STATUS
+  plan = approval.get("paymentPlan") or {}
+  base = {"jobId": job.get("id"), "customerId": job.get("customerId"), "customerName": job.get("customerName")}
+  approved_on = _log_date(job, "approval.started")
+  closed_on = (finance.get("closedAt") or "")[:10] or _log_date(job, "finance.closed")
+
+  entries = []
+
+  def add(kind: str, method: str | None, amount: int, day: str | None) -> None:
+    if amount > 0:
+      entries.append({
+          **base, "id": f"{job.get('id')}:{kind}:{method or '-'}", "date": day,
+          "kind": kind, "method": method, "amount": to_lira(amount), "kurus": amount,
+      })
+
+  total = finance.get("total") if closed and finance.get("total") is not None else (job.get("offer") or {}).get("total")
+  add("charge", None, _amount(total), approved_on)
+  for method in METHODS:
+    add("prepayment", method, _amount(plan.get(method)), approved_on)
+  if finance:
+    final = finance.get("finalPayments") or finance.get("payments") or {}
+    for method in METHODS:
+      add("final", method, _amount(final.get(method)), closed_on)
+    add("discount", None, _amount((finance.get("discount") or {}).get("amount")), closed_on)
+  return entries, 0 if closed else _amount(plan.get("afterDelivery"))
+
+
+def _empty_account(customer_id: str | None, name: str | None) -> dict:
+  return {
+      "customerId": customer_id,
+      "customerName": name,
+      "charged": 0,
+      "collected": 0,
+      "discount": 0,
+      "afterDelivery": 0,
+      "jobs": 0,
+  }
+
+
+class _Books:
+  def __init__(self):
+    self.contributions: dict[str, tuple[dict, list[dict], int]] = {}
+    self.outstanding: dict[str, dict] = {}
+    self.accounts: dict[Any, dict] = {}
+    self.totals = _empty_account(None, None)
+    self.days: dict[str, dict[str, int]] = {}
+    self.day_keys: list[str] = []
+    self.entry_keys: list[tuple] = []
+    self.entries: dict[tuple, dict] = {}
+
+  def apply(self, job_id: str, contribution: tuple[dict, list[dict], int], sign: int) -> None:
+    customer, entries, after_delivery = contribution
+    if not entries and not after_delivery:
+      return
+    account = self.accounts.get(customer["customerId"])
+    if account is None:
+      account = self.accounts[customer["customerId"]] = _empty_account(customer["customerId"], customer["customerName"])
+    if after_delivery and sign > 0:
+      self.outstanding[job_id] = {"jobId": job_id, **customer, "amount": after_delivery}
+    elif sign < 0:
+      self.outstanding.pop(job_id, None)
+    for target in (account, self.totals):
+      target["afterDelivery"] += sign * after_delivery
+      target["jobs"] += sign
+    for entry in entries:
+      field = {"charge": "charged", "discount": "discount"}.get(entry["kind"], "collected")
+      for target in (account, self.totals):
+        target[field] += sign * entry["kurus"]
+      if entry["method"] and entry["date"]:
+        day = self.days.get(entry["date"])
+        if day is None:
+          day = self.days[entry["date"]] = dict.fromkeys(METHODS, 0)
+          insort(self.day_keys, entry["date"])
+        day[entry["method"]] += sign * entry["kurus"]
+      key = (entry["date"] or "", job_id, entry["id"])
+      if sign > 0:
+        insort(self.entry_keys, key)
+        self.entries[key] = entry
+      else:
+        i = bisect_left(self.entry_keys, key)
+        if i < len(self.entry_keys) and self.entry_keys[i] == key:
+          del self.entry_keys[i]
+        self.entries.pop(key, None)
+    if account["jobs"] <= 0:
+      self.accounts.pop(account["customerId"], None)
+
+  def put(self, job: dict) -> None:
+    job_id = job.get("id")
+    self.remove(job_id)
+    customer = {"customerId": job.get("customerId"), "customerName": job.get("customerName")}
+    contribution = (customer, *job_entries(job))
+    self.contributions[job_id] = contribution
+    self.apply(job_id, contribution, +1)
+
+  def remove(self, job_id: str) -> None:
+    previous = self.contributions.pop(job_id, None)
+    if previous is not None:
+      self.apply(job_id, previous, -1)
+
+
+AMOUNT_FIELDS = ("charged", "collected", "discount", "afterDelivery")
+
+
+def _in_lira(account: dict) -> dict:
+  result = {k: to_lira(v) if k in AMOUNT_FIELDS else v for k, v in account.items()}
+  result["balance"] = to_lira(account["charged"] - account["collected"] - account["discount"])
+  return result
+
+
+class FinanceLedger:
+  """Running finance books over jobs.json, kept current from its change events."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._books: _Books | None = None
+    self._changes = 0
+    subscribe(JOBS, self._on_change)
+
+  def _ensure(self) -> _Books:
+    books = self._books
+    if books is None:
+      seen = self._changes
+      books = _Books()
+      for job in load_json(JOBS):
+        books.put(job)
+      with self._lock:
+        if self._books is None and self._changes == seen:
+          self._books = books
+    return books
+
+  def _on_change(self, _data: Any, events: list[dict] | None) -> None:
+    with self._lock:
+      self._changes += 1
+      books = self._books
+      if books is None:
+        return
+      if events is None:
+        self._books = None
+        return
+      for event in events:
+        if event.get("op") == "delete":
+          books.remove(event.get("id"))
+        else:
+          books.put(event["record"])
+
+  def totals(self) -> dict:
+    books = self._ensure()
+    totals = _in_lira(books.totals)
+    totals.pop("customerId")
+    totals.pop("customerName")
+    return totals
+
+  def account(self, customer_id: str) -> dict | None:
+    account = self._ensure().accounts.get(customer_id)
+    return _in_lira(account) if account is not None else None
+
+  def accounts(self) -> list[dict]:
+    return [_in_lira(a) for a in self._ensure().accounts.values()]
+
+  def daily(self, date_from: str | None = None, date_to: str | None = None) -> list[dict]:
+    """Collections per day and method within `[date_from, date_to]`."""
+    books = self._ensure()
+    start = bisect_left(books.day_keys, date_from) if date_from else 0
+    end = bisect_right(books.day_keys, date_to) if date_to else len(books.day_keys)
+    rows = []
+    for day in books.day_keys[start:end]:
+      amounts = books.days[day]
+      if any(amounts.values()):
+        rows.append({
+            "date": day,
+            **{method: to_lira(value) for method, value in amounts.items()},
+            "total": to_lira(sum(amounts.values())),
+        })
+    return rows
+
+  def entries(self, date_from: str | None = None, date_to: str | None = None) -> list[dict]:
+    """Ledger entries in date order; undated entries sort first."""
+    books = self._ensure()
+    start = bisect_left(books.entry_keys, (date_from,)) if date_from else 0
+    end = bisect_right(books.entry_keys, (date_to, "\uffff")) if date_to else len(books.entry_keys)
+    return [books.entries[key] for key in books.entry_keys[start:end]]
+
+  def after_delivery(self) -> list[dict]:
+    """Open jobs with an outstanding after-delivery payment."""
+    rows = [{**row, "amount": to_lira(row["amount"])} for row in self._ensure().outstanding.values()]
+    return sorted(rows, key=lambda r: -r["amount"])
+
+
+ledger = FinanceLedger()
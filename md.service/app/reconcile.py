@@ -0,0 +1,151 @@
+"""Batch re-check of closed jobs' finance balances.
+
+Every closed (`KAPALI`) job must satisfy, in integer kuruş,
+
+    offer total == pre-payments + final payments + discount
+
+and its stored `finance.total` / `finance.prePayments` must match the offer
+and the approval payment plan. The amounts of all closed jobs are read into
+columns once and the checks run column-wise (with numpy when installed), so
+a full re-check is a few array operations rather than per-job arithmetic.
+
+    python -m app.reconcile          # prints the mismatch report, exit 1 if any
+"""
+
+import json
+import sys
+
+from .data_loader import load_json
+from .money import to_kurus, to_lira
+
+try:
+  import numpy
+except ImportError:  # optional: plain Python columns are used instead
+  numpy = None
+
+METHODS = ("cash", "card", "cheque")
+CLOSED_STATUS = "KAPALI"
+
+COLUMNS = (
+    "offer", "stored", "discount",
+    *(f"{kind}_{m}" for kind in ("plan", "pre", "final") for m in METHODS),
+)
+
+
+def _get(record: dict, *path: str):
+  for key in path:
+    record = record.get(key) if isinstance(record, dict) else None
+  return record
+
+
+def _amounts(job: dict) -> dict:
+  """Raw amounts of one closed job, by column."""
+  finance = job.get("finance") or {}
+  # older closes stored the final payments as `payments`
+  final = finance.get("finalPayments") or finance.get("payments") or {}
+  row = {
+      "offer": _get(job, "offer", "total"),
+      "stored": finance.get("total"),
+      "discount": _get(finance, "discount", "amount"),
+  }
+  for m in METHODS:
+    row[f"plan_{m}"] = _get(job, "approval", "paymentPlan", m)
+    row[f"pre_{m}"] = _get(finance, "prePayments", m)
+    row[f"final_{m}"] = final.get(m)
+  return row
+
+
+def _kurus(value) -> int | None:
+  try:
+    return to_kurus(value)
+  except ValueError:
+    return None
+
+
+def _columns(jobs: list[dict]) -> tuple[dict[str, list[int]], list[tuple[int, str]]]:
+  """Amount columns in kuruş, plus (row, field) of values that do not parse."""
+  columns = {name: [] for name in COLUMNS}
+  invalid = []
+  for row, job in enumerate(jobs):
+    for name, raw in _amounts(job).items():
+      value = _kurus(raw)
+      if value is None:
+        invalid.append((row, name))
+        value = 0
+      columns[name].append(value)
+  return columns, invalid
+
+
+def _check(columns: dict[str, list[int]]) -> dict[str, list]:
+  """Per-row balance and mismatch flags, computed column-wise."""
+  if numpy is not None:
+    c = {name: numpy.asarray(values, dtype=numpy.int64) for name, values in columns.items()}
+    # legacy closes stored no prePayments: the payment plan is what was received
+    has_pre = sum(c[f"pre_{m}"] != 0 for m in METHODS) > 0
+    received = sum(numpy.where(has_pre, c[f"pre_{m}"], c[f"plan_{m}"]) for m in METHODS)
+    received = received + sum(c[f"final_{m}"] for m in METHODS) + c["discount"]
+    balance = c["offer"] - received
+    return {
+        "balance": balance.tolist(),
+        "total": (c["stored"] != c["offer"]).tolist(),
+        "pre": (has_pre & (sum(c[f"pre_{m}"] != c[f"plan_{m}"] for m in METHODS) > 0)).tolist(),
+    }
+
+  rows = range(len(columns["offer"]))
+  pre = [[columns[f"pre_{m}"][i] for m in METHODS] for i in rows]
+  plan = [[columns[f"plan_{m}"][i] for m in METHODS] for i in rows]
+  has_pre = [any(p) for p in pre]
+  balance = [
+      columns["offer"][i]
+      - sum(pre[i] if has_pre[i] else plan[i])
+      - sum(columns[f"final_{m}"][i] for m in METHODS)
+      - columns["discount"][i]
+      for i in rows
+  ]
+  return {
+      "balance": balance,
+      "total": [columns["stored"][i] != columns["offer"][i] for i in rows],
+      "pre": [has_pre[i] and pre[i] != plan[i] for i in rows],
+  }
+
+
+def reconcile(jobs: list[dict] | None = None) -> dict:
+  """Mismatch report over all closed jobs."""
+  closed = [job for job in (load_json("jobs.json") if jobs is None else jobs) if job.get("status") == CLOSED_STATUS]
+  columns, invalid = _columns(closed)
+  checks = _check(columns)
+
+  problems: dict[int, list[str]] = {}
+  for row, field in invalid:
+    problems.setdefault(row, []).append(f"invalid:{field}")
+  for row, balance in enumerate(checks["balance"]):
+    if balance:
+      problems.setdefault(row, []).append("balance")
+  for name in ("total", "pre"):
+    for row, flagged in enumerate(checks[name]):
+      if flagged:
+        problems.setdefault(row, []).append(name)
+
+  mismatches = [
+      {
+          "jobId": closed[row].get("id"),
+          "customerId": closed[row].get("customerId"),
+          "customerName": closed[row].get("customerName"),
+          "offerTotal": to_lira(columns["offer"][row]),
+          "storedTotal": to_lira(columns["stored"][row]),
+          "balance": to_lira(int(checks["balance"][row])),
+          "problems": reasons,
+      }
+      for row, reasons in sorted(problems.items())
+  ]
+  return {"checked": len(closed), "mismatchCount": len(mismatches), "mismatches": mismatches}
+
+
+def main(argv: list[str]) -> int:
+  report = reconcile()
+  print(json.dumps(report, ensure_ascii=False, indent=2))
+  return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
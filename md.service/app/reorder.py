@@ -0,0 +1,126 @@
+"""Reorder suggestions from stock levels, lead times and recent consumption.
+
+Consumption per item is the stock that left the warehouse (negative
+`onHandChange`) within a rolling window, read from the stock ledger with
+a binary-searched date range, so one pass over the items is enough even
+with thousands of SKUs and a long movement history. The per-item figures
+are gathered into columns and the due check, days until stockout and
+order quantities are computed column-wise (with numpy when installed).
+"""
+
+import math
+from datetime import date, timedelta
+
+from .ledger import ledger
+
+try:
+  import numpy
+except ImportError:  # optional: the same formulas are applied item by item
+  numpy = None
+
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_LEAD_TIME_DAYS = 7
+
+
+def _number(value, default: float = 0) -> float:
+  return value if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+
+def consumption(item_id: str, since: str, until: str) -> float:
+  """Quantity consumed (stock out) between two ISO dates, inclusive."""
+  return -sum(e["onHandChange"] for e in ledger.history(item_id, since, until) if e["onHandChange"] < 0)
+
+
+def _columns(items: list[dict], since: str, until: str, window_days: int) -> dict[str, list[float]]:
+  columns = {name: [] for name in ("available", "reorder_point", "lead_time", "daily", "min_qty")}
+  for item in items:
+    columns["available"].append(_number(item.get("onHand")) - _number(item.get("reserved")))
+    columns["reorder_point"].append(_number(item.get("reorderPoint"), _number(item.get("critical"))))
+    columns["lead_time"].append(_number(item.get("leadTimeDays"), DEFAULT_LEAD_TIME_DAYS))
+    columns["daily"].append(consumption(item["id"], since, until) / window_days)
+    columns["min_qty"].append(_number(item.get("minOrderQty")))
+  return columns
+
+
+def _plan(columns: dict[str, list[float]]) -> tuple[list[bool], list[float | None], list[float]]:
+  """(due flag, days until stockout or None, order quantity) per item."""
+  if numpy is not None:
+    c = {name: numpy.asarray(values, dtype=numpy.float64) for name, values in columns.items()}
+    consuming = c["daily"] > 0
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+      days_left = numpy.where(consuming, c["available"] / c["daily"], numpy.nan)
+    due = (c["available"] <= c["reorder_point"]) | (consuming & (days_left <= c["lead_time"]))
+    target = c["reorder_point"] + c["daily"] * c["lead_time"]
+    qty = numpy.maximum(numpy.maximum(numpy.ceil(target - c["available"]), c["min_qty"]), 1)
+    return due.tolist(), [None if math.isnan(d) else d for d in days_left.tolist()], qty.tolist()
+
+  rows = range(len(columns["available"]))
+  available, reorder_point, lead_time, daily = (
+      columns[name] for name in ("available", "reorder_point", "lead_time", "daily")
+  )
+  days_left = [available[i] / daily[i] if daily[i] > 0 else None for i in rows]
+  due = [available[i] <= reorder_point[i] or (days_left[i] is not None and days_left[i] <= lead_time[i]) for i in rows]
+  qty = [
+      max(math.ceil(reorder_point[i] + daily[i] * lead_time[i] - available[i]), columns["min_qty"][i], 1)
+      for i in rows
+  ]
+  return due, days_left, qty
+
+
+def _quantity(value: float) -> int | float:
+  return int(value) if float(value).is_integer() else value
+
+
+def suggest(items: list[dict], window_days: int = DEFAULT_WINDOW_DAYS, today: date | None = None) -> list[dict]:
+  """One suggestion per item that should be reordered, most urgent first.
+
+  An item is due when its available quantity (on hand − reserved) is at or
+  below its reorder point (`reorderPoint`, else `critical`), or when it
+  will run out within its lead time at the current consumption rate. The
+  suggested quantity brings it back to the reorder point plus the expected
+  consumption during the lead time, at least `minOrderQty`.
+  """
+  today = today or date.today()
+  since = (today - timedelta(days=window_days - 1)).isoformat()
+  until = today.isoformat()
+
+  columns = _columns(items, since, until, window_days)
+  due, days_until, quantities = _plan(columns)
+
+  suggestions = []
+  for row, item in enumerate(items):
+    if not due[row]:
+      continue
+    available = columns["available"][row]
+    daily = columns["daily"][row]
+    days_left = days_until[row]
+    qty = _quantity(quantities[row])
+    unit_cost = _number(item.get("unitCost"), None)
+    suggestions.append({
+        "itemId": item["id"],
+        "item": item.get("name"),
+        "sku": item.get("sku"),
+        "unit": item.get("unit"),
+        "supplier": item.get("supplier") or "Tedarikçi belirtilmemiş",
+        "available": available,
+        "reorderPoint": columns["reorder_point"][row],
+        "dailyConsumption": round(daily, 3),
+        "daysUntilStockout": None if days_left is None else round(days_left, 1),
+        "leadTimeDays": columns["lead_time"][row],
+        "suggestedQty": qty,
+        "estimatedCost": None if unit_cost is None else round(qty * unit_cost, 2),
+        "neededDate": (today + timedelta(days=max(0, math.floor(days_left or 0)))).isoformat(),
+    })
+
+  # already out / soonest stockout first
+  suggestions.sort(key=lambda s: (s["daysUntilStockout"] is None, s["daysUntilStockout"] or 0, s["available"] - s["reorderPoint"]))
+  return suggestions
+
+
+def group_by_supplier(suggestions: list[dict]) -> list[dict]:
+  groups: dict[str, dict] = {}
+  for suggestion in suggestions:
+    group = groups.setdefault(suggestion["supplier"], {"supplier": suggestion["supplier"], "lines": [], "estimatedTotal": 0})
+    group["lines"].append(suggestion)
+    group["estimatedTotal"] += suggestion["estimatedCost"] or 0
+  return list(groups.values())
@@ -0,0 +1,48 @@
+import json
+import threading
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+
+from .data_loader import collection_version, load_versioned
+
+try:
+  import orjson
+except ImportError:  # optional: stdlib json is used instead
+  orjson = None
+
+
+def dumps(content: Any) -> bytes:
+  if orjson is not None:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+  return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+  """JSON response rendered with orjson when it is installed."""
+
+  def render(self, content: Any) -> bytes:
+    return dumps(content)
+
+
+_encoded: dict[str, tuple[int, bytes]] = {}
+_encoded_lock = threading.Lock()
+
+
+def encoded_collection(filename: str) -> tuple[bytes, int]:
+  """Serialized bytes of a collection, re-encoded only when its version changes."""
+  version = collection_version(filename)
+  cached = _encoded.get(filename)
+  if cached is not None and cached[0] == version:
+    return cached[1], version
+  data, version = load_versioned(filename)
+  body = dumps(data)
+  with _encoded_lock:
+    _encoded[filename] = (version, body)
+  return body, version
+
+
+def collection_response(filename: str) -> Response:
+  """Serve a read-only collection from its cached pre-encoded bytes."""
+  body, _version = encoded_collection(filename)
+  return Response(content=body, media_type="application/json")
@@ -1,11 +1,11 @@
 from fastapi import APIRouter
 
-from ..data_loader import load_json
+from ..responses import collection_response
 
 router = APIRouter(prefix="/archive", tags=["archive"])
 
 
 @router.get("/files")
 def list_files():
-  return load_json("archiveFiles.json")
+  return collection_response("archiveFiles.json")
 
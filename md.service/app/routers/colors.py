@@ -2,7 +2,7 @@ import uuid
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import load_json, load_versioned, save_json
 
 router = APIRouter(prefix="/colors", tags=["colors"])
 
@@ -23,9 +23,16 @@ def list_colors():
     return data
 
 
+# Color edits are rare and cheap to retry, so they are saved optimistically:
+# a concurrent change in between load and save is answered with 409.
+def _load_colors() -> tuple[list, int]:
+  list_colors()
+  return load_versioned("colors.json")
+
+
 @router.post("/", status_code=201)
 def create_color(payload: ColorIn):
-  colors = list_colors()
+  colors, version = _load_colors()
   # Check duplicates
   if any(c["code"] == payload.code for c in colors):
     raise HTTPException(status_code=400, detail="Renk kodu zaten mevcut")
@@ -36,13 +43,13 @@ def create_color(payload: ColorIn):
       "code": payload.code
   }
   colors.append(new_color)
-  save_json("colors.json", colors)
+  save_json("colors.json", colors, expected_version=version)
   return new_color
 
 
 @router.put("/{color_id}")
 def update_color(color_id: str, payload: ColorIn):
-  colors = list_colors()
+  colors, version = _load_colors()
   for idx, c in enumerate(colors):
     if c["id"] == color_id:
       colors[idx] = {
@@ -50,14 +57,14 @@ def update_color(color_id: str, payload: ColorIn):
           "name": payload.name,
           "code": payload.code
       }
-      save_json("colors.json", colors)
+      save_json("colors.json", colors, expected_version=version)
       return colors[idx]
   raise HTTPException(status_code=404, detail="Renk bulunamadı")
 
 
 @router.delete("/{color_id}")
 def delete_color(color_id: str):
-  colors = list_colors()
+  colors, version = _load_colors()
   colors = [c for c in colors if c["id"] != color_id]
-  save_json("colors.json", colors)
+  save_json("colors.json", colors, expected_version=version)
   return {"success": True}
@@ -1,8 +1,10 @@
 import uuid
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel, Field
 
-from ..data_loader import load_json, save_json
+from ..customer_rollups import rollups
+from ..data_loader import find_records, get_record, locked, put_record
+from ..query import ListParams, query_collection
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
@@ -14,19 +16,42 @@ class CustomerIn(BaseModel):
   contact: str
 
 
+def _with_rollup(customer: dict) -> dict:
+  rollup = rollups.get(customer.get("id"))
+  # `jobs` used to be a stored counter that was never updated
+  return {
+      **customer,
+      "jobs": rollup["jobs"],
+      "openJobs": rollup["openJobs"],
+      "offerTotal": rollup["offerTotal"],
+      "outstanding": rollup["outstanding"],
+      "lastActivity": rollup["lastActivity"],
+  }
+
+
 @router.get("/")
-def list_customers():
-  return load_json("customers.json")
+def list_customers(response: Response, params: ListParams = Depends(), segment: str | None = None):
+  # rollup fields (jobs, openJobs, outstanding…) are sortable
+  return query_collection(
+      "customers.json", params, response, {"segment": segment}, transform=_with_rollup, sort_transformed=True
+  )
+
+
+@router.get("/{customer_id}/summary")
+def customer_summary(customer_id: str):
+  """Job counts by status, offer value, outstanding balance and last activity."""
+  item = get_record("customers.json", customer_id)
+  if item is None:
+    raise HTTPException(status_code=404, detail="Customer not found")
+  return {"id": customer_id, "name": item.get("name"), **rollups.get(customer_id)}
 
 
 @router.post("/", status_code=201)
+@locked("customers.json")
 def create_customer(payload: CustomerIn):
-  customers = load_json("customers.json")
   new_id = f"CST-{str(uuid.uuid4())[:8].upper()}"
   
   # Generate unique account code (Cari Kod) if not present
-  existing_codes = {c.get("accountCode") for c in customers if c.get("accountCode")}
-  
   # Simple strategy: C-{Year}-{Random4}
   import random
   from datetime import datetime
@@ -34,7 +59,7 @@ def create_customer(payload: CustomerIn):
   
   while True:
       code = f"C-{year}-{random.randint(1000, 9999)}"
-      if code not in existing_codes:
+      if not find_records("customers.json", "accountCode", code):
           break
 
   new_item = {
@@ -47,35 +72,30 @@ def create_customer(payload: CustomerIn):
       "deleted": False,
       "accountCode": code
   }
-  customers.append(new_item)
-  save_json("customers.json", customers)
-  return new_item
+  return put_record("customers.json", new_item, front=False)
 
 
 @router.put("/{customer_id}")
+@locked("customers.json")
 def update_customer(customer_id: str, payload: CustomerIn):
-  customers = load_json("customers.json")
-  for idx, item in enumerate(customers):
-    if item.get("id") == customer_id:
-      customers[idx] = {
-          **item,
-          "name": payload.name,
-          "segment": payload.segment,
-          "location": payload.location,
-          "contact": payload.contact,
-      }
-      save_json("customers.json", customers)
-      return customers[idx]
-  raise HTTPException(status_code=404, detail="Customer not found")
+  item = get_record("customers.json", customer_id)
+  if item is None:
+    raise HTTPException(status_code=404, detail="Customer not found")
+  return put_record("customers.json", {
+      **item,
+      "name": payload.name,
+      "segment": payload.segment,
+      "location": payload.location,
+      "contact": payload.contact,
+  })
 
 
 @router.delete("/{customer_id}")
+@locked("customers.json")
 def soft_delete_customer(customer_id: str):
-  customers = load_json("customers.json")
-  for idx, item in enumerate(customers):
-    if item.get("id") == customer_id:
-      customers[idx] = {**item, "deleted": True}
-      save_json("customers.json", customers)
-      return {"id": customer_id, "deleted": True}
-  raise HTTPException(status_code=404, detail="Customer not found")
+  item = get_record("customers.json", customer_id)
+  if item is None:
+    raise HTTPException(status_code=404, detail="Customer not found")
+  put_record("customers.json", {**item, "deleted": True})
+  return {"id": customer_id, "deleted": True}
 
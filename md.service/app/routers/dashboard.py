@@ -1,12 +1,35 @@
 from fastapi import APIRouter
 
 from ..data_loader import load_json
+from ..views import CountView
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+CLOSED_JOB_STATUS = "KAPALI"
+DONE_TASK_STATUS = "Tamamlandı"
+
+
+def _is_critical(item: dict) -> bool:
+  # same rule as the stock pages: available quantity at or below the critical level
+  available = (item.get("onHand") or 0) - (item.get("reserved") or 0)
+  return available <= (item.get("critical") or 0)
+
+
+# live counts, maintained incrementally from the collections' change events
+_counters = {
+    "activeJobs": CountView("jobs.json", lambda job: job.get("status") != CLOSED_JOB_STATUS),
+    "completedJobs": CountView("jobs.json", lambda job: job.get("status") == CLOSED_JOB_STATUS),
+    "pendingTasks": CountView("tasks.json", lambda task: task.get("status") != DONE_TASK_STATUS),
+    "criticalStock": CountView("stockItems.json", _is_critical),
+}
+
 
 @router.get("/summary")
 def dashboard_summary():
   data = load_json("dashboard.json")
+  stats = []
+  for stat in data.get("stats", []):
+    counter = _counters.get(stat.get("id"))
+    stats.append({**stat, "value": counter.count()} if counter else stat)
+  data["stats"] = stats
   return data
-
@@ -1,24 +1,29 @@
+import asyncio
 import os
 import uuid
-import shutil
 from datetime import datetime
-from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from ..data_loader import delete_record, find_records, get_record, locked, put_record
+from .. import thumbnails
+from ..docstore import BLOB_DIR, DOCS_ROOT, release_blob, store_blob
+from ..query import ListParams, query_collection
+from ..uploads import receive_upload
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
-# Base paths
-BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
-DOCS_DIR = BASE_DIR / "md.docs" / "documents"
+DOC_TYPES = ["olcu", "teknik", "sozlesme", "teklif", "diger"]
 
-# Ensure directories exist
-DOCS_DIR.mkdir(parents=True, exist_ok=True)
-for subdir in ["olcu", "teknik", "sozlesme", "teklif", "diger"]:
-    (DOCS_DIR / subdir).mkdir(exist_ok=True)
+# file content behind a document never changes; clients may reuse it for an
+# hour and revalidate cheaply afterwards
+DOWNLOAD_CACHE_CONTROL = "private, max-age=3600"
+
+# how long a thumbnail request waits for a render that is still running
+THUMBNAIL_WAIT_SECONDS = 10
 
 ALLOWED_TYPES = {
     "image/jpeg": ".jpg",
@@ -37,47 +42,128 @@ class DocumentMeta(BaseModel):
 
 
 @router.get("/")
-def list_documents(job_id: str | None = None, doc_type: str | None = None):
+def list_documents(
+    response: Response,
+    params: ListParams = Depends(),
+    job_id: str | None = None,
+    doc_type: str | None = None,
+):
     """List all documents, optionally filtered by jobId or type"""
-    docs = load_json("documents.json")
-    if job_id:
-        docs = [d for d in docs if d.get("jobId") == job_id]
-    if doc_type:
-        docs = [d for d in docs if d.get("type") == doc_type]
-    return docs
+    return query_collection(
+        "documents.json", params, response, {"jobId": job_id, "type": doc_type}, date_field="uploadedAt"
+    )
 
 
 @router.get("/{doc_id}")
 def get_document(doc_id: str):
     """Get document metadata by ID"""
-    docs = load_json("documents.json")
-    for doc in docs:
-        if doc.get("id") == doc_id:
-            return doc
+    doc = get_record("documents.json", doc_id)
+    if doc:
+        return doc
     raise HTTPException(status_code=404, detail="Döküman bulunamadı")
 
 
-@router.get("/{doc_id}/download")
-def download_document(doc_id: str):
-    """Download a document file"""
-    docs = load_json("documents.json")
-    doc = None
-    for d in docs:
-        if d.get("id") == doc_id:
-            doc = d
-            break
-    
+class DocumentFileResponse(FileResponse):
+    """FileResponse whose `If-Range` also accepts the ETag it was given."""
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        return http_if_range == self.headers.get("etag") or super()._should_use_range(http_if_range, stat_result)
+
+    async def __call__(self, scope, receive, send):
+        # Starlette answers 416 with `Content-Range: */<size>`; RFC 9110 wants the unit
+        async def send_with_range_unit(message):
+            if message["type"] == "http.response.start" and message["status"] == 416:
+                message["headers"] = [
+                    (k, b"bytes " + v if k == b"content-range" and v.startswith(b"*/") else v)
+                    for k, v in message["headers"]
+                ]
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_range_unit)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.api_route("/{doc_id}/download", methods=["GET", "HEAD"])
+def download_document(doc_id: str, request: Request):
+    """Download a document file.
+
+    Supports `Range` (206, resumable/seekable downloads) and conditional
+    requests: the ETag is the content hash, so `If-None-Match` /
+    `If-Modified-Since` revalidations are answered with 304.
+    """
+    doc = get_record("documents.json", doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Döküman bulunamadı")
     
-    file_path = BASE_DIR / "md.docs" / doc["path"]
-    if not file_path.exists():
+    file_path = DOCS_ROOT / doc["path"]
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dosya bulunamadı")
     
-    return FileResponse(
+    # documents stored before hashing fall back to FileResponse's mtime/size ETag
+    headers = {"Cache-Control": DOWNLOAD_CACHE_CONTROL}
+    if doc.get("sha256"):
+        headers["ETag"] = f'"{doc["sha256"]}"'
+    response = DocumentFileResponse(
         path=str(file_path),
         filename=doc.get("originalName", doc["filename"]),
-        media_type=doc.get("mimeType", "application/octet-stream")
+        media_type=doc.get("mimeType", "application/octet-stream"),
+        headers=headers,
+        stat_result=stat_result,
+    )
+    if _not_modified(request, response.headers["etag"], stat_result.st_mtime):
+        return Response(status_code=304, headers={
+            "ETag": response.headers["etag"],
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "Cache-Control": DOWNLOAD_CACHE_CONTROL,
+        })
+    return response
+
+
+@router.get("/{doc_id}/thumbnail")
+async def get_thumbnail(doc_id: str, request: Request):
+    """Downscaled JPEG preview (images, first page of PDFs).
+
+    Rendered in the background after upload; a request that arrives before
+    the render finished waits for it briefly. 404 if no preview can be made.
+    """
+    doc = await run_in_threadpool(get_record, "documents.json", doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Döküman bulunamadı")
+    
+    target = thumbnails.thumbnail_path(doc)
+    if target is None or not target.exists():
+        future = await run_in_threadpool(thumbnails.schedule, doc)
+        if future is None:
+            raise HTTPException(status_code=404, detail="Önizleme yok")
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(future), THUMBNAIL_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return Response(status_code=202, headers={"Retry-After": "2"})
+        except Exception:
+            raise HTTPException(status_code=404, detail="Önizleme oluşturulamadı")
+    
+    etag = f'"{doc["sha256"]}-thumb"'
+    if _not_modified(request, etag, target.stat().st_mtime):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": DOWNLOAD_CACHE_CONTROL})
+    return FileResponse(
+        path=str(target),
+        media_type="image/jpeg",
+        headers={"ETag": etag, "Cache-Control": DOWNLOAD_CACHE_CONTROL},
     )
 
 
@@ -93,35 +179,36 @@ async def upload_document(
     docType: olcu, teknik, sozlesme, teklif, diger
     """
     # Validate type
-    if docType not in ["olcu", "teknik", "sozlesme", "teklif", "diger"]:
+    if docType not in DOC_TYPES:
         raise HTTPException(status_code=400, detail="Geçersiz döküman tipi")
     
-    # Validate file type
-    content_type = file.content_type or ""
+    # Stream to a temp file (size limit, sha256, magic-byte type detection)
+    try:
+        stored = await receive_upload(file, BLOB_DIR)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Dosya kaydedilemedi: {str(e)}")
+    
+    # Validate file type from its content, not the client-declared type
+    content_type = stored.mime_type
     if content_type not in ALLOWED_TYPES:
+        stored.path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Desteklenmeyen dosya tipi: {content_type or 'tanınmadı'}. Desteklenen: JPEG, PNG, GIF, PDF, DOC, DOCX"
+        )
+    # a supported declared type must match the content (e.g. a PNG renamed to .pdf)
+    if file.content_type in ALLOWED_TYPES and file.content_type != content_type:
+        stored.path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=400,
-            detail=f"Desteklenmeyen dosya tipi: {content_type}. Desteklenen: JPEG, PNG, GIF, PDF, DOC, DOCX"
+            detail=f"Dosya içeriği {content_type}, bildirilen tip {file.content_type} ile uyuşmuyor"
         )
     
     # Generate unique filename
-    ext = ALLOWED_TYPES.get(content_type, ".bin")
+    ext = ALLOWED_TYPES[content_type]
     doc_id = f"DOC-{str(uuid.uuid4())[:8].upper()}"
     safe_name = f"{doc_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{ext}"
     
-    # Save file
-    target_dir = DOCS_DIR / docType
-    target_path = target_dir / safe_name
-    
-    try:
-        with open(target_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Dosya kaydedilemedi: {str(e)}")
-    
-    # Get file size
-    file_size = target_path.stat().st_size
-    
     # Create metadata
     doc_meta = {
         "id": doc_id,
@@ -129,49 +216,40 @@ async def upload_document(
         "type": docType,
         "filename": safe_name,
         "originalName": file.filename,
-        "path": f"documents/{docType}/{safe_name}",
+        "path": None,  # set once the blob is in place
         "mimeType": content_type,
-        "size": file_size,
+        "size": stored.size,
+        "sha256": stored.sha256,
         "uploadedBy": "Kullanıcı",
         "uploadedAt": datetime.utcnow().isoformat() + "Z",
         "description": description
     }
     
-    # Save to database
-    docs = load_json("documents.json")
-    docs.insert(0, doc_meta)
-    save_json("documents.json", docs)
-    
+    # Store the file once per content hash and save the metadata
+    doc_meta = await run_in_threadpool(_save_upload, stored, ext, doc_meta)
+    await run_in_threadpool(thumbnails.schedule, doc_meta)
     return doc_meta
 
 
+@locked("documents.json")
+def _save_upload(stored, ext: str, doc_meta: dict) -> dict:
+    # under the lock so a concurrent delete cannot release the blob in between
+    doc_meta["path"] = store_blob(stored.path, stored.sha256, ext)
+    return put_record("documents.json", doc_meta)
+
+
 @router.delete("/{doc_id}")
+@locked("documents.json")
 def delete_document(doc_id: str):
     """Delete a document and its file"""
-    docs = load_json("documents.json")
-    doc = None
-    doc_idx = -1
-    
-    for idx, d in enumerate(docs):
-        if d.get("id") == doc_id:
-            doc = d
-            doc_idx = idx
-            break
-    
+    doc = get_record("documents.json", doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Döküman bulunamadı")
     
-    # Delete file
-    file_path = BASE_DIR / "md.docs" / doc["path"]
-    if file_path.exists():
-        try:
-            file_path.unlink()
-        except Exception:
-            pass  # File deletion is best effort
-    
-    # Remove from database
-    docs.pop(doc_idx)
-    save_json("documents.json", docs)
+    # Remove from database, then the file if no other document shares it
+    delete_record("documents.json", doc_id)
+    if release_blob(doc):
+        thumbnails.discard(doc)
     
     return {"success": True, "id": doc_id}
 
@@ -179,6 +257,5 @@ def delete_document(doc_id: str):
 @router.get("/job/{job_id}")
 def get_job_documents(job_id: str):
     """Get all documents for a specific job"""
-    docs = load_json("documents.json")
-    return [d for d in docs if d.get("jobId") == job_id]
+    return find_records("documents.json", "jobId", job_id)
 
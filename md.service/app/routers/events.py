@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..changefeed import feed
+from ..responses import dumps
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+KEEPALIVE_SECONDS = 15
+
+
+def _resume_point(last_event_id: str | None) -> int | None:
+  """Sequence to resume after, or None when the id is unusable here."""
+  epoch, _, seq = (last_event_id or "").partition(":")
+  if epoch != feed.epoch or not seq.isdigit():
+    return None
+  return int(seq)
+
+
+def _message(event: str, data: dict, seq: int) -> bytes:
+  return f"id: {feed.epoch}:{seq}\nevent: {event}\ndata: ".encode() + dumps(data) + b"\n\n"
+
+
+@router.get("/stream")
+async def change_stream(
+    request: Request,
+    collections: str | None = Query(None, description="Virgülle ayrılmış koleksiyonlar (ör. jobs,stockMovements); boşsa tümü"),
+    last_event_id: str | None = Header(None),
+    since: str | None = Query(None, description="Son alınan olay id'si; Last-Event-ID başlığı yoksa kullanılır"),
+):
+  """Server-sent events with per-record changes.
+
+  Each `change` event carries `{seq, collection, op, id, record?}`. A
+  `reset` event means changes were missed (or the service restarted) and
+  the client should refetch the collections it shows.
+  """
+  wanted = {c.strip() for c in collections.split(",") if c.strip()} if collections else None
+  resume = last_event_id or since
+
+  async def stream():
+    yield b"retry: 3000\n\n"
+    seq = _resume_point(resume) if resume else feed.last_seq
+    if seq is None:
+      seq = feed.last_seq
+      yield _message("reset", {"op": "reset"}, seq)
+    while not await request.is_disconnected():
+      head = feed.last_seq
+      changes = feed.since(seq, wanted)
+      if changes is None:
+        seq = head
+        yield _message("reset", {"op": "reset"}, seq)
+        continue
+      for change in changes:
+        yield _message("change", change, change["seq"])
+      seq = max([head] + [c["seq"] for c in changes])
+      if not changes:
+        await feed.wait(seq, KEEPALIVE_SECONDS)
+        if feed.last_seq == seq:
+          yield b": ping\n\n"
+
+  return StreamingResponse(
+      stream(),
+      media_type="text/event-stream",
+      headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
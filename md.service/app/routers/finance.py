@@ -1,16 +1,82 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
 from ..data_loader import load_json
+from ..query import ListParams, query_collection
+from ..reconcile import reconcile
+from ..receivables import ledger
 
 router = APIRouter(prefix="/finance", tags=["finance"])
 
 
 @router.get("/invoices")
-def list_invoices():
-  return load_json("invoices.json")
+def list_invoices(
+    response: Response,
+    params: ListParams = Depends(),
+    status: str | None = None,
+    customer: str | None = None,
+):
+  return query_collection("invoices.json", params, response, {"status": status, "customer": customer}, date_field="date")
 
 
 @router.get("/payments")
 def list_payments():
   return load_json("payments.json")
 
+
+@router.get("/summary")
+def finance_summary():
+  """Totals over all approved jobs: charged, collected, discounts, receivable balance, open afterDelivery."""
+  return ledger.totals()
+
+
+@router.get("/balances")
+def customer_balances(open_only: bool = False):
+  """Running balance per customer, highest first."""
+  accounts = ledger.accounts()
+  if open_only:
+    accounts = [a for a in accounts if a["balance"] > 0]
+  return sorted(accounts, key=lambda a: -a["balance"])
+
+
+@router.get("/balances/{customer_id}")
+def customer_balance(customer_id: str):
+  account = ledger.account(customer_id)
+  if account is None:
+    raise HTTPException(status_code=404, detail="Müşteriye ait finans kaydı yok")
+  return account
+
+
+@router.get("/after-delivery")
+def after_delivery_outstanding():
+  """Open jobs with an after-delivery payment still to collect."""
+  return ledger.after_delivery()
+
+
+@router.get("/daily")
+def daily_collections(date_from: str | None = None, date_to: str | None = None):
+  """Collections per day split into cash / card / cheque."""
+  return ledger.daily(date_from, date_to)
+
+
+@router.get("/reconcile")
+def reconcile_closed_jobs():
+  """Re-check every closed job's balance in kuruş; lists the jobs that do not add up."""
+  return reconcile()
+
+
+@router.get("/ledger")
+def ledger_entries(
+    response: Response,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    customerId: str | None = None,
+    limit: int | None = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+  """Charges, payments and discounts derived from jobs, in date order."""
+  entries = ledger.entries(date_from, date_to)
+  if customerId:
+    entries = [e for e in entries if e["customerId"] == customerId]
+  response.headers["X-Total-Count"] = str(len(entries))
+  return entries[offset:offset + limit] if limit is not None else entries[offset:]
+
@@ -1,24 +1,37 @@
 from copy import deepcopy
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 import uuid
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
-from ..data_loader import load_json, save_json
+from .. import allocation, scheduling, workflow
+from ..data_loader import get_record, load_json, locked, put_record, save_changes, use_journal
+from ..money import format_lira, to_kurus, to_lira
+from ..query import ListParams, query_collection
+from ..views import RecordView
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# job transitions are appended to md.data/jobs.events.jsonl instead of
+# rewriting jobs.json; the snapshot is compacted periodically
+use_journal("jobs.json")
+
 
 def _now_iso() -> str:
   return datetime.utcnow().isoformat()
 
 
-def _jobs():
-  return load_json("jobs.json")
-
-
-def _save_jobs(data):
-  save_json("jobs.json", data)
+def _save_job(job):
+  last = (job.get("logs") or [{}])[-1]
+  put_record(
+      "jobs.json",
+      job,
+      at=last.get("at") or _now_iso(),
+      action=last.get("action"),
+      note=last.get("note"),
+  )
 
 
 class JobCreate(BaseModel):
@@ -31,23 +44,42 @@ class JobCreate(BaseModel):
 class MeasureUpdate(BaseModel):
   measurements: dict
   appointment: dict | None = None
+  # OLCU_ASAMASI saves the measurement without moving on to pricing
+  status: str = Field("FIYATLANDIRMA", pattern="^(OLCU_ASAMASI|FIYATLANDIRMA)$")
 
 
 class OfferUpdate(BaseModel):
   lines: list
-  total: float
-  status: str = "TEKLIF_TASLAK"
+  total: Decimal = Field(..., ge=0, max_digits=15, decimal_places=2)
+  status: str = Field("TEKLIF_TASLAK", pattern="^(TEKLIF_TASLAK|TEKLIF_HAZIR)$")
+
+
+class StockNeed(BaseModel):
+  # md.web sends the stock line as is (`id`, name, sku, ...); extra fields are kept
+  model_config = ConfigDict(extra="allow")
+
+  itemId: str | None = None
+  id: str | None = None
+  qty: float = Field(..., gt=0)
+
+  @model_validator(mode="after")
+  def _has_item(self):
+    if not (self.itemId or self.id):
+      raise ValueError("itemId veya id gerekli")
+    return self
 
 
 class ApprovalStart(BaseModel):
   paymentPlan: dict
   contractUrl: str | None = None
-  stockNeeds: list = []
+  stockNeeds: list[StockNeed] = []
 
 
 class StockStatus(BaseModel):
-  ready: bool
+  # ignored once the job has reservations; readiness then follows the allocation
+  ready: bool = False
   purchaseNotes: str | None = None
+  stockNeeds: list[StockNeed] = []
 
 
 class ProductionStatus(BaseModel):
@@ -60,6 +92,7 @@ class AssemblySchedule(BaseModel):
   date: str
   note: str | None = None
   team: str | None = None
+  days: int = Field(1, ge=1, le=30)
 
 
 class AssemblyComplete(BaseModel):
@@ -70,18 +103,33 @@ class AssemblyComplete(BaseModel):
   proof: dict | None = None
 
 
+class StatusChange(BaseModel):
+  status: str
+  note: str | None = None
+
+
+# one production day's batch; keeps the single write bounded
+MAX_BULK_JOBS = 500
+
+
+class BulkStatusChange(StatusChange):
+  jobIds: list[str] = Field(..., min_length=1, max_length=MAX_BULK_JOBS)
+
+
 class FinanceClose(BaseModel):
-  total: float
+  total: Decimal
   payments: dict
   discount: dict | None = None  # {"amount": float, "note": str}
 
 
+PAYMENT_METHODS = ("cash", "card", "cheque")
+
+
 def _find_job(job_id: str):
-  data = _jobs()
-  for idx, job in enumerate(data):
-    if job.get("id") == job_id:
-      return data, idx, job
-  raise HTTPException(status_code=404, detail="Job not found")
+  job = get_record("jobs.json", job_id)
+  if job is None:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return job
 
 
 def _log(job: dict, action: str, note: str | None = None):
@@ -90,22 +138,62 @@ def _log(job: dict, action: str, note: str | None = None):
   job["logs"] = logs
 
 
+def _check_manual_status(job: dict, target: str) -> None:
+  """Validate a plain status change (`PUT /{id}/status`, `PATCH /status`)."""
+  if target in workflow.ENDPOINT_ONLY and target != job.get("status"):
+    raise workflow.InvalidTransition(
+        f"{target} durumuna /jobs/{{id}}{workflow.ENDPOINT_ONLY[target]} ile geçilir"
+    )
+  workflow.check(job, target)
+
+
+def _summarize(job: dict) -> dict:
+  """Compact list representation: no measure/offer lines/approval/logs."""
+  logs = job.get("logs") or []
+  schedule = (job.get("assembly") or {}).get("schedule") or {}
+  return {
+      "id": job.get("id"),
+      "title": job.get("title"),
+      "customerId": job.get("customerId"),
+      "customerName": job.get("customerName"),
+      "status": job.get("status"),
+      "startType": job.get("startType"),
+      "roles": [{"id": r.get("id"), "name": r.get("name")} for r in job.get("roles") or [] if isinstance(r, dict)],
+      "offerTotal": (job.get("offer") or {}).get("total"),
+      "assemblyDate": schedule.get("date"),
+      "updatedAt": logs[-1].get("at") if logs else None,
+  }
+
+
+# maintained per job from the store's change events
+_summaries = RecordView("jobs.json", _summarize)
+
+
 @router.get("/")
-def list_jobs():
-  return _jobs()
+def list_jobs(
+    response: Response,
+    params: ListParams = Depends(),
+    status: str | None = None,
+    customerId: str | None = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+):
+  transform = (lambda job: _summaries.get(job["id"]) or _summarize(job)) if view == "summary" else None
+  return query_collection(
+      "jobs.json", params, response, {"status": status, "customerId": customerId}, transform=transform
+  )
 
 
 @router.get("/{job_id}")
 def get_job(job_id: str):
-  for job in _jobs():
-    if job.get("id") == job_id:
-      return job
+  job = get_record("jobs.json", job_id)
+  if job:
+    return job
   raise HTTPException(status_code=404, detail="Job not found")
 
 
 @router.post("/", status_code=201)
+@locked("jobs.json")
 def create_job(payload: JobCreate):
-  data = _jobs()
   new_id = f"JOB-{str(uuid.uuid4())[:8].upper()}"
   status = "OLCU_ASAMASI" if payload.startType == "OLCU" else "FIYATLANDIRMA"
   job = {
@@ -125,94 +213,130 @@ def create_job(payload: JobCreate):
       "logs": [],
   }
   _log(job, "created", f"startType={payload.startType}")
-  data.insert(0, job)
-  _save_jobs(data)
+  _save_job(job)
   return job
 
 
 @router.put("/{job_id}/measure")
+@locked("jobs.json")
 def update_measure(job_id: str, payload: MeasureUpdate):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-  job["measure"] = payload.model_dump()
-  job["status"] = "FIYATLANDIRMA"
+  job = deepcopy(_find_job(job_id))
+  job["measure"] = payload.model_dump(exclude={"status"})
+  workflow.transition(job, payload.status)
   _log(job, "measure.updated")
-  data[idx] = job
-  _save_jobs(data)
+  _save_job(job)
   return job
 
 
 @router.put("/{job_id}/offer")
+@locked("jobs.json")
 def update_offer(job_id: str, payload: OfferUpdate):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = deepcopy(_find_job(job_id))
   job["offer"] = payload.model_dump()
-  job["status"] = payload.status or "TEKLIF_TASLAK"
+  job["offer"]["total"] = to_lira(to_kurus(payload.total))
+  workflow.transition(job, payload.status or "TEKLIF_TASLAK")
   _log(job, "offer.updated")
-  data[idx] = job
-  _save_jobs(data)
+  _save_job(job)
   return job
 
 
 @router.post("/{job_id}/approval/start")
+@locked(*allocation.COLLECTIONS)
 def start_approval(job_id: str, payload: ApprovalStart):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = deepcopy(_find_job(job_id))
   job["approval"] = payload.model_dump()
-  job["status"] = "ONAY_BEKLIYOR"
+  workflow.transition(job, "ONAY_BEKLIYOR")
   _log(job, "approval.started")
-  data[idx] = job
-  _save_jobs(data)
-  return job
+  if not payload.stockNeeds:
+    _save_job(job)
+    return job
+  # reserve the needs now; the job becomes URETIME_HAZIR or STOK_BEKLIYOR
+  return allocation.allocate(job, _stock_needs(payload.stockNeeds))
+
+
+def _stock_needs(needs: list[StockNeed]) -> list[dict]:
+  needs = [need.model_dump(exclude_none=True) for need in needs]
+  unknown = [
+      allocation.need_item_id(need) for need in needs
+      if get_record("stockItems.json", allocation.need_item_id(need)) is None
+  ]
+  if unknown:
+    raise HTTPException(status_code=400, detail=f"Stok kalemi bulunamadı: {', '.join(unknown)}")
+  return needs
 
 
 @router.put("/{job_id}/stock")
+@locked(*allocation.COLLECTIONS)
 def update_stock(job_id: str, payload: StockStatus):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = deepcopy(_find_job(job_id))
   stock = job.get("stock", {})
-  stock["ready"] = payload.ready
   stock["purchaseNotes"] = payload.purchaseNotes
   job["stock"] = stock
-  job["status"] = "URETIME_HAZIR" if payload.ready else "STOK_BEKLIYOR"
-  _log(job, "stock.updated", f"ready={payload.ready}")
-  data[idx] = job
-  _save_jobs(data)
+  if payload.stockNeeds:
+    _log(job, "stock.updated", payload.purchaseNotes)
+    return allocation.allocate(job, _stock_needs(payload.stockNeeds))
+  # with reservations the allocation decides readiness, not the caller
+  ready = stock.get("ready", False) if stock.get("reservations") else payload.ready
+  stock["ready"] = ready
+  workflow.transition(job, "URETIME_HAZIR" if ready else "STOK_BEKLIYOR")
+  _log(job, "stock.updated", f"ready={ready}")
+  _save_job(job)
   return job
 
 
 @router.put("/{job_id}/production")
+@locked("jobs.json")
 def production_status(job_id: str, payload: ProductionStatus):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = deepcopy(_find_job(job_id))
   prod_data = {"status": payload.status, "note": payload.note}
   if payload.agreementDate:
     prod_data["agreementDate"] = payload.agreementDate
   job["production"] = prod_data
-  job["status"] = payload.status
+  workflow.transition(job, payload.status)
   _log(job, "production.updated", payload.status)
-  data[idx] = job
-  _save_jobs(data)
+  _save_job(job)
   return job
 
 
 @router.put("/{job_id}/assembly/schedule")
+@locked("jobs.json")
 def assembly_schedule(job_id: str, payload: AssemblySchedule):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = deepcopy(_find_job(job_id))
+  workflow.check(job, "MONTAJ_TERMIN")
+  day = scheduling.parse_day(payload.date)
+  if day is None:
+    raise HTTPException(status_code=400, detail="Geçersiz montaj tarihi")
+  schedule = scheduling.scheduler.current()
+  span = scheduling.workdays(day.toordinal(), payload.days)
+  team = schedule.team(payload.team)
+  if payload.team and team is None:
+    known = ", ".join(t["name"] for t in schedule.teams_of(scheduling.ASSEMBLY))
+    raise HTTPException(status_code=400, detail=f"Bilinmeyen montaj ekibi: {payload.team} (tanımlı ekipler: {known})")
+  candidates = [team] if team is not None else schedule.teams_of(scheduling.ASSEMBLY)
+  # only fixed bookings count (proposals are re-planned around this one),
+  # and not the job's own when it is rescheduled
+  chosen = next((t for t in candidates if schedule.fits(t, span, exclude=job_id, proposed=False)), None)
+  if chosen is None and candidates:
+    slot = schedule.earliest(scheduling.ASSEMBLY, day, payload.days, team=team, exclude=job_id, proposed=False)
+    hint = f"; ilk uygun: {date.fromordinal(slot[1][0]).isoformat()} ({slot[0]['name']})" if slot else ""
+    raise HTTPException(
+        status_code=409,
+        detail=f"{payload.team or 'Montaj ekipleri'} {day.isoformat()} tarihinde dolu{hint}",
+    )
   job["assembly"] = job.get("assembly", {})
   job["assembly"]["schedule"] = payload.model_dump()
-  job["status"] = "MONTAJ_TERMIN"
+  if chosen is not None:
+    job["assembly"]["schedule"]["team"] = chosen["name"]
+  workflow.transition(job, "MONTAJ_TERMIN")
   _log(job, "assembly.scheduled")
-  data[idx] = job
-  _save_jobs(data)
+  _save_job(job)
   return job
 
 
 @router.put("/{job_id}/assembly/complete")
+@locked("jobs.json")
 def assembly_complete(job_id: str, payload: AssemblyComplete):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
+  job = deepcopy(_find_job(job_id))
   job["assembly"] = job.get("assembly", {})
   job["assembly"]["schedule"] = job["assembly"].get("schedule", {})
   if payload.date:
@@ -222,56 +346,104 @@ def assembly_complete(job_id: str, payload: AssemblyComplete):
   if payload.team:
     job["assembly"]["schedule"]["team"] = payload.team
   job["assembly"]["complete"] = {"at": _now_iso(), "proof": payload.proof}
-  job["status"] = "MUHASEBE_BEKLIYOR"
+  workflow.transition(job, "MUHASEBE_BEKLIYOR")
   _log(job, "assembly.complete", f"team={payload.team}")
-  data[idx] = job
-  _save_jobs(data)
+  _save_job(job)
   return job
 
 
 @router.put("/{job_id}/finance/close")
+@locked("jobs.json")
 def finance_close(job_id: str, payload: FinanceClose):
-  data, idx, job = _find_job(job_id)
-  job = deepcopy(job)
-
-  offer_total = float(job.get("offer", {}).get("total", 0))
-  approval_plan = job.get("approval", {}).get("paymentPlan", {})
-  
-  # Pre-received amounts
-  pre_cash = float(approval_plan.get("cash", 0))
-  pre_card = float(approval_plan.get("card", 0))
-  pre_cheque = float(approval_plan.get("cheque", 0))
-  after_delivery = float(approval_plan.get("afterDelivery", 0))
-  pre_total = pre_cash + pre_card + pre_cheque
-
-  # Final payments
-  payments = payload.payments or {}
-  final_cash = float(payments.get("cash", 0))
-  final_card = float(payments.get("card", 0))
-  final_cheque = float(payments.get("cheque", 0))
-  final_total = final_cash + final_card + final_cheque
-  
-  discount_amt = float(payload.discount.get("amount", 0)) if payload.discount else 0
-  
+  job = deepcopy(_find_job(job_id))
+  workflow.check(job, "KAPALI")
+
+  # all amounts in integer kuruş: the balance has to be exactly zero
+  try:
+    offer_total = to_kurus(job.get("offer", {}).get("total", 0))
+    approval_plan = job.get("approval", {}).get("paymentPlan", {})
+    pre = {method: to_kurus(approval_plan.get(method, 0)) for method in PAYMENT_METHODS}
+    payments = payload.payments or {}
+    final = {method: to_kurus(payments.get(method, 0)) for method in PAYMENT_METHODS}
+    discount_amt = to_kurus(payload.discount.get("amount", 0)) if payload.discount else 0
+  except ValueError as exc:
+    raise HTTPException(status_code=400, detail=str(exc)) from None
+
   # Total received = pre + final + discount
-  total_received = pre_total + final_total + discount_amt
-  balance = round(offer_total - total_received, 2)
-  
-  if abs(balance) > 0.01:  # Allow small float differences
-    raise HTTPException(status_code=400, detail=f"Bakiye 0 olmalı. Fark: {balance}₺")
+  total_received = sum(pre.values()) + sum(final.values()) + discount_amt
+  balance = offer_total - total_received
+
+  if balance != 0:
+    raise HTTPException(status_code=400, detail=f"Bakiye 0 olmalı. Fark: {format_lira(balance)}")
   if discount_amt > 0 and not payload.discount.get("note"):
     raise HTTPException(status_code=400, detail="İskonto notu zorunlu")
 
+  discount = payload.discount
+  if discount:
+    discount = {**discount, "amount": to_lira(discount_amt)}
   job["finance"] = {
-    "total": offer_total,
-    "prePayments": {"cash": pre_cash, "card": pre_card, "cheque": pre_cheque},
-    "finalPayments": {"cash": final_cash, "card": final_card, "cheque": final_cheque},
-    "discount": payload.discount,
+    "total": to_lira(offer_total),
+    "prePayments": {method: to_lira(amount) for method, amount in pre.items()},
+    "finalPayments": {method: to_lira(amount) for method, amount in final.items()},
+    "discount": discount,
     "closedAt": _now_iso()
   }
-  job["status"] = "KAPALI"
-  _log(job, "finance.closed", f"balance={balance}")
-  data[idx] = job
-  _save_jobs(data)
+  workflow.transition(job, "KAPALI")
+  _log(job, "finance.closed", f"balance={to_lira(balance)}")
+  _save_job(job)
+  return job
+
+
+
+@router.put("/{job_id}/status")
+@locked("jobs.json")
+def change_status(job_id: str, payload: StatusChange):
+  """Move a job along the workflow without stage data (see `app.workflow`)."""
+  job = deepcopy(_find_job(job_id))
+  previous = job.get("status")
+  _check_manual_status(job, payload.status)
+  workflow.transition(job, payload.status)
+  _log(job, "status.changed", payload.note or f"{previous} → {payload.status}")
+  _save_job(job)
   return job
 
+
+@router.patch("/status")
+@locked("jobs.json")
+def change_status_bulk(payload: BulkStatusChange):
+  """Move many jobs to one status; all or nothing, persisted in one write."""
+  job_ids = list(dict.fromkeys(payload.jobIds))
+  results = []
+  changed = []
+  for job_id in job_ids:
+    current = get_record("jobs.json", job_id)
+    if current is None:
+      results.append({"id": job_id, "ok": False, "error": "Job not found"})
+      continue
+    try:
+      _check_manual_status(current, payload.status)
+    except workflow.InvalidTransition as exc:
+      results.append({"id": job_id, "ok": False, "status": current.get("status"), "error": str(exc)})
+      continue
+    job = deepcopy(current)
+    previous = job.get("status")
+    workflow.transition(job, payload.status)
+    _log(job, "status.changed", payload.note or f"{previous} → {payload.status}")
+    changed.append(job)
+    results.append({"id": job_id, "ok": True, "status": payload.status, "previous": previous})
+
+  if len(changed) < len(job_ids):
+    return JSONResponse(
+        status_code=422,
+        content={"detail": "Durum güncellenmedi; geçersiz işleri çıkarın", "results": results},
+    )
+
+  jobs = load_json("jobs.json")
+  positions = {job.get("id"): i for i, job in enumerate(jobs)}
+  events = []
+  for job in changed:
+    jobs[positions[job["id"]]] = job
+    last = job["logs"][-1]
+    events.append({"op": "put", "id": job["id"], "at": last["at"], "action": last["action"], "note": last["note"], "record": job})
+  save_changes({"jobs.json": (jobs, events)})
+  return {"updated": len(changed), "results": results}
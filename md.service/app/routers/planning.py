@@ -1,11 +1,63 @@
-from fastapi import APIRouter
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
 
 from ..data_loader import load_json
+from ..scheduling import ASSEMBLY, PRODUCTION, scheduler
 
 router = APIRouter(prefix="/planning", tags=["planning"])
 
 
+def _window(date_from: date | None, date_to: date | None) -> None:
+  if date_from and date_to and date_to < date_from:
+    raise HTTPException(status_code=400, detail="date_to, date_from tarihinden önce olamaz")
+
+
 @router.get("/events")
-def list_events():
-  return load_json("planningEvents.json")
+def list_events(date_from: date | None = None, date_to: date | None = None):
+  """Calendar entries overlapping the window: assembly/production slots, measurements and manual events."""
+  _window(date_from, date_to)
+  return scheduler.current().events(date_from, date_to)
+
+
+@router.get("/schedule")
+def get_schedule(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    kind: str | None = Query(None, pattern=f"^({PRODUCTION}|{ASSEMBLY})$"),
+):
+  """Fixed and proposed production/assembly bookings plus double-booked team days."""
+  _window(date_from, date_to)
+  schedule = scheduler.current()
+  return {
+      "generatedFor": schedule.today.isoformat(),
+      "bookings": schedule.in_range(date_from, date_to, kind),
+      "conflicts": schedule.conflicts(),
+  }
+
+
+@router.get("/teams")
+def list_teams():
+  return load_json("teams.json")
+
 
+@router.get("/slots")
+def earliest_slots(
+    kind: str = Query(ASSEMBLY, pattern=f"^({PRODUCTION}|{ASSEMBLY})$"),
+    days: int = Query(1, ge=1, le=60),
+    after: date | None = None,
+):
+  """Earliest free slot of each team of `kind` for a job of `days` workdays."""
+  schedule = scheduler.current()
+  after = max(after or schedule.today, schedule.today)
+  slots = []
+  for team in schedule.teams_of(kind):
+    slot = schedule.earliest(kind, after, days, team=team)
+    if slot is not None:
+      slots.append({
+          "teamId": team["id"],
+          "team": team.get("name"),
+          "start": date.fromordinal(slot[1][0]).isoformat(),
+          "end": date.fromordinal(slot[1][-1]).isoformat(),
+      })
+  return sorted(slots, key=lambda s: (s["start"], s["teamId"]))
@@ -1,21 +1,21 @@
 from fastapi import APIRouter
 
-from ..data_loader import load_json
+from ..responses import collection_response
 
 router = APIRouter(prefix="/purchase", tags=["purchase"])
 
 
 @router.get("/orders")
 def list_orders():
-  return load_json("purchaseOrders.json")
+  return collection_response("purchaseOrders.json")
 
 
 @router.get("/suppliers")
 def list_suppliers():
-  return load_json("suppliers.json")
+  return collection_response("suppliers.json")
 
 
 @router.get("/requests")
 def list_requests():
-  return load_json("requests.json")
+  return collection_response("requests.json")
 
@@ -1,11 +1,11 @@
 from fastapi import APIRouter
 
-from ..data_loader import load_json
+from ..responses import collection_response
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
 @router.get("/")
 def list_reports():
-  return load_json("reports.json")
+  return collection_response("reports.json")
 
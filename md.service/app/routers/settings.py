@@ -1,11 +1,11 @@
 from fastapi import APIRouter
 
-from ..data_loader import load_json
+from ..responses import collection_response
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
 
 @router.get("/")
 def list_settings():
-  return load_json("settings.json")
+  return collection_response("settings.json")
 
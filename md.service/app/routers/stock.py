@@ -1,9 +1,15 @@
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from ..data_loader import load_json, save_json
+from .. import allocation
+from ..data_loader import delete_record, get_record, load_json, locked, put_record, save_changes
+from ..inventory import apply_movement
+from ..ledger import ledger
+from ..reorder import DEFAULT_WINDOW_DAYS, group_by_supplier, suggest
+from ..query import ListParams, query_collection
 
 router = APIRouter(prefix="/stock", tags=["stock"])
 
@@ -44,8 +50,8 @@ def list_items():
 
 
 @router.post("/items", status_code=201)
+@locked("stockItems.json")
 def create_item(payload: StockItemIn):
-  items = load_json("stockItems.json")
   new_id = f"STK-{str(uuid.uuid4())[:8].upper()}"
   new_item = {
       "id": new_id,
@@ -53,92 +59,272 @@ def create_item(payload: StockItemIn):
       "lastUpdated": datetime.utcnow().isoformat()[:10]
   }
   
-  items.insert(0, new_item)
-  save_json("stockItems.json", items)
-  return new_item
+  return put_record("stockItems.json", new_item)
 
 
 @router.put("/items/{item_id}")
+@locked(*allocation.COLLECTIONS)
 def update_item(item_id: str, payload: StockItemIn):
-  items = load_json("stockItems.json")
-  for idx, item in enumerate(items):
-    if item.get("id") == item_id:
-      updated = {**item, **payload.model_dump()}
-      updated["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-      items[idx] = updated
-      save_json("stockItems.json", items)
-      return updated
-  raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+  item = get_record("stockItems.json", item_id)
+  if item is None:
+    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+  updated = {**item, **payload.model_dump()}
+  updated["lastUpdated"] = datetime.utcnow().isoformat()[:10]
+  put_record("stockItems.json", updated)
+  allocation.replan([item_id])
+  return get_record("stockItems.json", item_id)
 
 
 @router.delete("/items/{item_id}")
+@locked("stockItems.json")
 def delete_item(item_id: str):
-  items = load_json("stockItems.json")
-  items = [i for i in items if i.get("id") != item_id]
-  save_json("stockItems.json", items)
+  delete_record("stockItems.json", item_id)
   return {"success": True, "id": item_id}
 
 
 @router.get("/movements")
-def list_movements():
-  return load_json("stockMovements.json")
+def list_movements(response: Response, params: ListParams = Depends(), itemId: str | None = None):
+  return query_collection("stockMovements.json", params, response, {"itemId": itemId}, date_field="date")
+
+
+MOVEMENT_TYPES = ("stockIn", "stockOut", "reserve", "release")
+MAX_BATCH_LINES = 500
+
+
+class MovementBatchIn(BaseModel):
+  movements: list[MovementIn]
+
+
+def _apply_movement(item: dict, payload: MovementIn, now: str) -> tuple[dict, dict]:
+  """Return the updated item and the movement record for one movement."""
+  return apply_movement(
+      item,
+      payload.type,
+      payload.qty,
+      now,
+      reason=payload.reason,
+      operator=payload.operator,
+      reference=payload.reference,
+      location=payload.location,
+  )
+
+
+def _batch_error(item: dict | None, payload: MovementIn) -> str | None:
+  if item is None:
+    return "Stok kalemi bulunamadı"
+  if payload.type not in MOVEMENT_TYPES:
+    return f"Geçersiz hareket tipi: {payload.type}"
+  if payload.qty <= 0:
+    return "Miktar sıfırdan büyük olmalı"
+  if payload.type == "stockOut" and payload.qty > (item.get("onHand") or 0):
+    return f"Yetersiz stok: eldeki {item.get('onHand') or 0}"
+  if payload.type == "release" and payload.qty > (item.get("reserved") or 0):
+    return f"Serbest bırakılacak rezerv yok: rezerve {item.get('reserved') or 0}"
+  return None
+
+
+# movements that free stock let waiting reservations catch up
+RELEASING_TYPES = ("stockIn", "release")
 
 
 @router.post("/movements", status_code=201)
+@locked(*allocation.COLLECTIONS)
 def create_movement(payload: MovementIn):
+  item = get_record("stockItems.json", payload.itemId)
+  if item is None:
+    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+  
+  target, movement = _apply_movement(item, payload, datetime.utcnow().isoformat())
   items = load_json("stockItems.json")
+  items[items.index(item)] = target
+  
   movements = load_json("stockMovements.json")
+  movements.insert(0, movement)
   
-  # Find item
-  target = None
-  target_idx = -1
-  for idx, item in enumerate(items):
-    if item.get("id") == payload.itemId:
-      target = item
-      target_idx = idx
-      break
+  save_changes({
+      "stockItems.json": (items, [{"op": "put", "id": target["id"], "record": target}]),
+      "stockMovements.json": (movements, [{"op": "put", "id": movement["id"], "record": movement}]),
+  })
   
-  if not target:
-    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+  ready_jobs = allocation.replan([payload.itemId]) if payload.type in RELEASING_TYPES else []
+  return {"item": get_record("stockItems.json", payload.itemId), "movement": movement, "readyJobs": ready_jobs}
+
+
+@router.post("/movements/batch", status_code=201)
+@locked(*allocation.COLLECTIONS)
+def create_movements_batch(payload: MovementBatchIn):
+  """Apply several movements at once, all or nothing.
+
+  Lines are validated and applied in order against the running item
+  balances (a later line sees the effect of earlier ones). If any line
+  fails nothing is saved and the response (422) lists every line's
+  outcome; otherwise both collections are persisted in one write.
+  """
+  if not payload.movements:
+    raise HTTPException(status_code=400, detail="Hareket listesi boş")
+  if len(payload.movements) > MAX_BATCH_LINES:
+    raise HTTPException(status_code=400, detail=f"En fazla {MAX_BATCH_LINES} satır gönderilebilir")
   
-  qty = payload.qty
+  now = datetime.utcnow().isoformat()
+  originals: dict[str, dict] = {}
+  working: dict[str, dict] = {}
+  results = []
+  new_movements = []
+  failed = False
+  for line, movement_in in enumerate(payload.movements):
+    item_id = movement_in.itemId
+    if item_id not in working:
+      item = get_record("stockItems.json", item_id)
+      if item is not None:
+        originals[item_id] = item
+        working[item_id] = item
+    error = _batch_error(working.get(item_id), movement_in)
+    if error:
+      failed = True
+      results.append({"line": line, "itemId": item_id, "ok": False, "error": error})
+      continue
+    target, movement = _apply_movement(working[item_id], movement_in, now)
+    working[item_id] = target
+    new_movements.append(movement)
+    results.append({"line": line, "itemId": item_id, "ok": True, "movementId": movement["id"], "balanceAfter": movement["balanceAfter"]})
   
-  # Apply movement
-  if payload.type == "stockIn":
-    target["onHand"] = (target.get("onHand") or 0) + qty
-  elif payload.type == "stockOut":
-    target["onHand"] = max(0, (target.get("onHand") or 0) - qty)
-  elif payload.type == "reserve":
-    target["reserved"] = (target.get("reserved") or 0) + qty
-  elif payload.type == "release":
-    target["reserved"] = max(0, (target.get("reserved") or 0) - qty)
+  if failed:
+    # valid lines were not booked either: no movement ids to report
+    for result in results:
+      result.pop("movementId", None)
+    return JSONResponse(
+        status_code=422,
+        content={"detail": "Toplu hareket uygulanmadı; hatalı satırları düzeltin", "results": results},
+    )
   
-  target["lastUpdated"] = datetime.utcnow().isoformat()[:10]
-  items[target_idx] = target
+  items = load_json("stockItems.json")
+  for item_id, original in originals.items():
+    items[items.index(original)] = working[item_id]
+  movements = load_json("stockMovements.json")
+  movements[:0] = reversed(new_movements)  # newest first, like single movements
   
-  # Create movement record
-  change = qty if payload.type in ("stockIn", "reserve") else -qty
-  movement = {
-      "id": f"MOV-{str(uuid.uuid4())[:8].upper()}",
-      "date": datetime.utcnow().isoformat()[:10],
-      "item": target.get("name"),
-      "itemId": payload.itemId,
-      "change": change,
-      "reason": payload.reason or payload.type,
-      "operator": payload.operator or "Sistem",
-      "reference": payload.reference,
-      "location": payload.location or target.get("warehouse") or "Ana Depo",
-  }
+  save_changes({
+      "stockItems.json": (items, [{"op": "put", "id": item_id, "record": working[item_id]} for item_id in originals]),
+      "stockMovements.json": (movements, [{"op": "put", "id": m["id"], "record": m} for m in new_movements]),
+  })
   
-  movements.insert(0, movement)
+  ready_jobs = allocation.replan(
+      list(dict.fromkeys(m.itemId for m in payload.movements if m.type in RELEASING_TYPES))
+  )
+  return {
+      "results": results,
+      "items": [get_record("stockItems.json", item_id) for item_id in originals],
+      "readyJobs": ready_jobs,
+  }
+
+
+@router.get("/items/{item_id}/balance")
+def item_balance(item_id: str, at: str = Query(..., description="Tarih (YYYY-MM-DD, gün sonu) veya ISO zaman")):
+  """On-hand / reserved quantity of an item as of `at`, from the stock ledger."""
+  item = get_record("stockItems.json", item_id)
+  balance = ledger.balance_at(item_id, at)
+  if balance is None:
+    if item is None:
+      raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+    # no movements recorded: the balance never changed
+    balance = {"onHand": item.get("onHand") or 0, "reserved": item.get("reserved") or 0, "movementId": None}
+  return {"itemId": item_id, "at": at, **balance}
+
+
+@router.get("/items/{item_id}/ledger")
+def item_ledger(
+    item_id: str,
+    response: Response,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    limit: int | None = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+  """Movements of an item in chronological order with the running balance after each."""
+  if ledger.item(item_id) is None and get_record("stockItems.json", item_id) is None:
+    raise HTTPException(status_code=404, detail="Stok kalemi bulunamadı")
+  entries = ledger.history(item_id, date_from, date_to)
+  response.headers["X-Total-Count"] = str(len(entries))
+  return entries[offset:offset + limit] if limit is not None else entries[offset:]
+
+
+@router.get("/reorder-suggestions")
+def reorder_suggestions(window_days: int = Query(DEFAULT_WINDOW_DAYS, ge=1, le=365)):
+  """Items to reorder, grouped by supplier (see `app.reorder.suggest`)."""
+  suggestions = suggest(load_json("stockItems.json"), window_days)
+  return {
+      "generatedAt": datetime.utcnow().isoformat() + "Z",
+      "windowDays": window_days,
+      "count": len(suggestions),
+      "suppliers": group_by_supplier(suggestions),
+  }
+
+
+class ReorderApplyIn(BaseModel):
+  itemIds: list[str] | None = None  # default: every current suggestion
+  windowDays: int = DEFAULT_WINDOW_DAYS
+  requester: str = "Stok (otomatik)"
+
+
+OPEN_REQUEST_STATUSES = ("Onay bekliyor", "Onaylandı")
+
+
+@router.post("/reorder-suggestions/apply", status_code=201)
+@locked("stockItems.json", "requests.json", "purchaseOrders.json")
+def apply_reorder_suggestions(payload: ReorderApplyIn):
+  """Turn suggestions into purchase requests and one draft order per supplier.
+
+  Items that already have an open request are skipped.
+  """
+  requests = load_json("requests.json")
+  open_items = {r.get("itemId") for r in requests if r.get("status") in OPEN_REQUEST_STATUSES}
+  suggestions = [
+      s for s in suggest(load_json("stockItems.json"), payload.windowDays)
+      if s["itemId"] not in open_items and (payload.itemIds is None or s["itemId"] in payload.itemIds)
+  ]
+  if not suggestions:
+    return {"requests": [], "orders": []}
   
-  save_json("stockItems.json", items)
-  save_json("stockMovements.json", movements)
+  new_requests = []
+  new_orders = []
+  for group in group_by_supplier(suggestions):
+    order_id = f"PO-{str(uuid.uuid4())[:8].upper()}"
+    for line in group["lines"]:
+      new_requests.append({
+          "id": f"REQ-{str(uuid.uuid4())[:8].upper()}",
+          "requester": payload.requester,
+          "item": line["item"],
+          "itemId": line["itemId"],
+          "qty": line["suggestedQty"],
+          "status": "Onay bekliyor",
+          "neededDate": line["neededDate"],
+          "purchaseOrderId": order_id,
+      })
+    new_orders.append({
+        "id": order_id,
+        "supplier": group["supplier"],
+        "total": f"₺{group['estimatedTotal']:,.0f}",
+        "status": "Taslak",
+        "expectedDate": max(line["neededDate"] for line in group["lines"]),
+        "lines": [{"itemId": l["itemId"], "item": l["item"], "qty": l["suggestedQty"]} for l in group["lines"]],
+    })
   
-  return {"item": target, "movement": movement}
+  orders = load_json("purchaseOrders.json")
+  save_changes({
+      "requests.json": (new_requests + requests, [{"op": "put", "id": r["id"], "record": r} for r in new_requests]),
+      "purchaseOrders.json": (new_orders + orders, [{"op": "put", "id": o["id"], "record": o} for o in new_orders]),
+  })
+  return {"requests": new_requests, "orders": new_orders}
 
 
 @router.get("/reservations")
 def list_reservations():
   return load_json("reservations.json")
 
+
+@router.post("/reservations/replan")
+@locked(*allocation.COLLECTIONS)
+def replan_reservations():
+  """Top up every waiting reservation from free stock; returns jobs that became ready."""
+  return {"readyJobs": allocation.replan()}
+
@@ -0,0 +1,355 @@
+"""Production and assembly scheduling from job states and team capacity.
+
+Teams come from teams.json: `kind` is "production" or "assembly" and
+`capacity` is how many jobs the team can work on per day. Assembly dates
+already set on jobs (`assembly.schedule`) are fixed bookings; every job in
+`URETIME_HAZIR` / `URETIMDE` / `MONTAJA_HAZIR` without one gets a proposed
+production and/or assembly slot at the earliest workday(s) where a team
+still has capacity, jobs already in production first.
+
+Bookings are kept per team in an `IntervalIndex` (day ordinals), so a
+team's load on a day, double bookings and calendar windows are bisects over
+the sorted intervals rather than scans of every job. The schedule is
+derived from jobs.json / teams.json and rebuilt after they change (job
+saves that leave every field the plan reads untouched, such as notes,
+payments or documents, do not count); the planning calendar (bookings, measurement appointments and the manual
+entries of planningEvents.json) is indexed the same way for date windows.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Any
+
+from .data_loader import load_json, subscribe
+
+JOBS = "jobs.json"
+TEAMS = "teams.json"
+EVENTS = "planningEvents.json"
+
+PRODUCTION = "production"
+ASSEMBLY = "assembly"
+
+PRODUCTION_STATUSES = ("URETIME_HAZIR", "URETIMDE")
+ASSEMBLY_STATUSES = ("MONTAJA_HAZIR", "MONTAJ_TERMIN")
+
+DEFAULT_DAYS = {PRODUCTION: 3, ASSEMBLY: 1}
+# Monday–Saturday
+WORKDAYS = {0, 1, 2, 3, 4, 5}
+HORIZON_DAYS = 180
+
+EVENT_TYPES = {PRODUCTION: "Üretim", ASSEMBLY: "Montaj"}
+
+
+class IntervalIndex:
+  """Half-open integer intervals `[start, end)` kept sorted by start.
+
+  An interval can only reach into a query range if it starts less than the
+  longest stored interval before it, so overlap queries bisect the start
+  list and only look at that window.
+  """
+
+  def __init__(self):
+    self._starts: list[int] = []
+    self._items: list[tuple[int, int, Any]] = []
+    self._longest = 1
+
+  def __len__(self) -> int:
+    return len(self._items)
+
+  def add(self, start: int, end: int, value: Any) -> None:
+    end = max(end, start + 1)
+    i = bisect_right(self._starts, start)
+    self._starts.insert(i, start)
+    self._items.insert(i, (start, end, value))
+    self._longest = max(self._longest, end - start)
+
+  def overlapping(self, start: int, end: int) -> list[tuple[int, int, Any]]:
+    lo = bisect_left(self._starts, start - self._longest + 1)
+    hi = bisect_left(self._starts, end)
+    return [item for item in self._items[lo:hi] if item[1] > start]
+
+
+def parse_day(value: Any) -> date | None:
+  """Date part of an ISO date/timestamp; None for empty or invalid values."""
+  if not isinstance(value, str) or len(value) < 10:
+    return None
+  try:
+    return date.fromisoformat(value[:10])
+  except ValueError:
+    return None
+
+
+def workdays(start: int, count: int) -> list[int]:
+  """Ordinals of the first `count` workdays on or after `start`."""
+  days = []
+  day = start
+  while len(days) < max(count, 1):
+    if date.fromordinal(day).weekday() in WORKDAYS:
+      days.append(day)
+    day += 1
+  return days
+
+
+def _duration(value: Any, kind: str) -> int:
+  return value if isinstance(value, int) and value > 0 else DEFAULT_DAYS[kind]
+
+
+class Schedule:
+  """Bookings of one day's plan; see the module docstring."""
+
+  def __init__(self, teams: list[dict], today: date):
+    self.today = today
+    self.teams: dict[str, dict] = {}
+    self._names: dict[str, str] = {}
+    self._index: dict[str, IntervalIndex] = {}
+    self.bookings: list[dict] = []
+    self.calendar = IntervalIndex()
+    for team in teams:
+      self._add_team(team)
+
+  def _add_team(self, team: dict) -> dict:
+    team = {"capacity": 1, **team}
+    self.teams[team["id"]] = team
+    self._index[team["id"]] = IntervalIndex()
+    for name in (team["id"], team.get("name"), *(team.get("aliases") or [])):
+      if name:
+        self._names[name.casefold()] = team["id"]
+    return team
+
+  def team(self, name: str | None) -> dict | None:
+    """Team by id, name or alias; None for empty or unknown names."""
+    if not name:
+      return None
+    team_id = self._names.get(name.strip().casefold())
+    return self.teams[team_id] if team_id is not None else None
+
+  def adhoc_team(self, name: str | None, kind: str = ASSEMBLY) -> dict | None:
+    """Like `team`, but turns a free-text name from job data into a single-crew team.
+
+    Only for `build`: a schedule is not changed once it is shared.
+    """
+    if not name:
+      return None
+    return self.team(name) or self._add_team({"id": name.strip(), "name": name.strip(), "kind": kind, "adhoc": True})
+
+  def teams_of(self, kind: str) -> list[dict]:
+    return [t for t in self.teams.values() if t.get("kind") == kind and not t.get("adhoc")]
+
+  def load(self, team_id: str, day: int, exclude: str | None = None, proposed: bool = True) -> int:
+    """Jobs booked on `team_id` for the day ordinal `day`.
+
+    `exclude` leaves out one job (when it is being rescheduled) and
+    `proposed=False` counts fixed bookings only.
+    """
+    return sum(
+        1 for _s, _e, b in self._index[team_id].overlapping(day, day + 1)
+        if b["jobId"] != exclude and (proposed or not b["proposed"])
+    )
+
+  def fits(self, team: dict, days: list[int], exclude: str | None = None, proposed: bool = True) -> bool:
+    return all(self.load(team["id"], day, exclude, proposed) < team["capacity"] for day in days)
+
+  def earliest(
+      self, kind: str, after: date, days: int, team: dict | None = None,
+      exclude: str | None = None, proposed: bool = True,
+  ) -> tuple[dict, list[int]] | None:
+    """First (team, workday ordinals) with room for `days` workdays from `after` on."""
+    candidates = [team] if team is not None else self.teams_of(kind)
+    start = after.toordinal()
+    for day in range(start, start + HORIZON_DAYS):
+      if date.fromordinal(day).weekday() not in WORKDAYS:
+        continue
+      span = workdays(day, days)
+      for candidate in candidates:
+        if self.fits(candidate, span, exclude, proposed):
+          return candidate, span
+    return None
+
+  def book(self, job: dict, kind: str, team: dict, days: list[int], proposed: bool) -> dict:
+    booking = {
+        "jobId": job["id"],
+        "title": job.get("title"),
+        "customerName": job.get("customerName"),
+        "status": job.get("status"),
+        "kind": kind,
+        "teamId": team["id"],
+        "team": team.get("name"),
+        "start": date.fromordinal(days[0]).isoformat(),
+        "end": date.fromordinal(days[-1]).isoformat(),
+        "days": len(days),
+        "proposed": proposed,
+    }
+    self._index[team["id"]].add(days[0], days[-1] + 1, booking)
+    self.bookings.append(booking)
+    self.add_event({
+        "id": f"{job['id']}-{kind}",
+        "title": f"{EVENT_TYPES[kind]} - {job.get('customerName') or job.get('title')}",
+        "date": booking["start"],
+        "end": booking["end"],
+        "type": EVENT_TYPES[kind],
+        "owner": team.get("name"),
+        "location": job.get("location"),
+        "jobId": job["id"],
+        "proposed": proposed,
+    })
+    return booking
+
+  def add_event(self, event: dict) -> None:
+    start = parse_day(event.get("date"))
+    if start is None:
+      return
+    end = parse_day(event.get("end")) or start
+    self.calendar.add(start.toordinal(), end.toordinal() + 1, event)
+
+  def events(self, date_from: date | None, date_to: date | None) -> list[dict]:
+    """Calendar entries overlapping `[date_from, date_to]`, in date order."""
+    start = date_from.toordinal() if date_from else -(1 << 62)
+    end = date_to.toordinal() + 1 if date_to else 1 << 62
+    return [event for _s, _e, event in self.calendar.overlapping(start, end)]
+
+  def conflicts(self) -> list[dict]:
+    """Days on which a team has more fixed bookings than its capacity."""
+    found = {}
+    for team_id, index in self._index.items():
+      team = self.teams[team_id]
+      for start, end, _booking in index.overlapping(-(1 << 62), 1 << 62):
+        for day in range(start, end):
+          if (team_id, day) in found or date.fromordinal(day).weekday() not in WORKDAYS:
+            continue
+          booked = [b for _s, _e, b in index.overlapping(day, day + 1) if not b["proposed"]]
+          if len(booked) > team["capacity"]:
+            found[(team_id, day)] = {
+                "teamId": team_id,
+                "team": team.get("name"),
+                "date": date.fromordinal(day).isoformat(),
+                "capacity": team["capacity"],
+                "jobIds": [b["jobId"] for b in booked],
+            }
+    return sorted(found.values(), key=lambda c: (c["date"], c["teamId"]))
+
+  def in_range(self, date_from: date | None, date_to: date | None, kind: str | None = None) -> list[dict]:
+    start = date_from.toordinal() if date_from else -(1 << 62)
+    end = date_to.toordinal() + 1 if date_to else 1 << 62
+    rows = [b for index in self._index.values() for _s, _e, b in index.overlapping(start, end)]
+    if kind:
+      rows = [b for b in rows if b["kind"] == kind]
+    return sorted(rows, key=lambda b: (b["start"], b["teamId"], b["jobId"]))
+
+
+def planning_key(job: dict) -> tuple | None:
+  """Everything `build` reads from a job; None if the job is not on the plan."""
+  status = job.get("status")
+  appointment = ((job.get("measure") or {}).get("appointment") or {}).get("date")
+  if status not in PRODUCTION_STATUSES + ASSEMBLY_STATUSES + ("MONTAJA_HAZIR",) and parse_day(appointment) is None:
+    return None
+  assembly = job.get("assembly") or {}
+  return (
+      status, appointment, job.get("title"), job.get("customerName"), job.get("location"),
+      repr(assembly.get("schedule")), bool(assembly.get("complete")),
+      repr((job.get("production") or {}).get("days")), _priority(job),
+  )
+
+
+def _priority(job: dict) -> tuple:
+  logs = job.get("logs") or [{}]
+  return (job.get("status") != "URETIMDE", logs[0].get("at") or "", job.get("id") or "")
+
+
+def build(jobs: list[dict], teams: list[dict], events: list[dict], today: date) -> Schedule:
+  schedule = Schedule(teams, today)
+  for event in events:
+    schedule.add_event(event)
+
+  pending = []
+  for job in jobs:
+    status = job.get("status")
+    appointment = ((job.get("measure") or {}).get("appointment") or {}).get("date")
+    if parse_day(appointment) is not None:
+      schedule.add_event({
+          "id": f"{job['id']}-measure",
+          "title": f"Keşif - {job.get('customerName') or job.get('title')}",
+          "date": appointment[:10],
+          "time": appointment[11:16] or None,
+          "type": "Keşif",
+          "owner": None,
+          "location": job.get("location"),
+          "jobId": job["id"],
+      })
+    assembly = job.get("assembly") or {}
+    planned = assembly.get("schedule") or {}
+    day = parse_day(planned.get("date"))
+    if status in ASSEMBLY_STATUSES and day is not None and not assembly.get("complete"):
+      team = schedule.adhoc_team(planned.get("team")) or (schedule.teams_of(ASSEMBLY) or [None])[0]
+      if team is not None:
+        days = workdays(day.toordinal(), _duration(planned.get("days"), ASSEMBLY))
+        schedule.book(job, ASSEMBLY, team, days, proposed=False)
+    elif status in PRODUCTION_STATUSES or status == "MONTAJA_HAZIR":
+      pending.append(job)
+
+  for job in sorted(pending, key=_priority):
+    after = today
+    if job.get("status") in PRODUCTION_STATUSES:
+      days = _duration((job.get("production") or {}).get("days"), PRODUCTION)
+      slot = schedule.earliest(PRODUCTION, after, days)
+      if slot is None:
+        continue
+      booking = schedule.book(job, PRODUCTION, *slot, proposed=True)
+      after = date.fromisoformat(booking["end"]) + timedelta(days=1)
+    days = _duration(((job.get("assembly") or {}).get("schedule") or {}).get("days"), ASSEMBLY)
+    slot = schedule.earliest(ASSEMBLY, after, days)
+    if slot is not None:
+      schedule.book(job, ASSEMBLY, *slot, proposed=True)
+  return schedule
+
+
+class Scheduler:
+  """The current `Schedule`, rebuilt lazily after jobs or teams change."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._schedule: Schedule | None = None
+    # planning_key of every job the current schedule was built from
+    self._keys: dict[str, tuple | None] = {}
+    self._changes = 0
+    subscribe(JOBS, self._on_jobs)
+    subscribe(TEAMS, self._on_change)
+    subscribe(EVENTS, self._on_change)
+
+  def _on_jobs(self, _data: Any, events: list[dict] | None) -> None:
+    with self._lock:
+      if self._schedule is not None and events is not None and all(map(self._unchanged, events)):
+        return
+    self._on_change(_data, events)
+
+  def _unchanged(self, event: dict) -> bool:
+    before = self._keys.get(event.get("id"))
+    if event.get("op") == "put":
+      return planning_key(event.get("record") or {}) == before
+    return before is None
+
+  def _on_change(self, _data: Any, _events: list[dict] | None) -> None:
+    with self._lock:
+      self._changes += 1
+      self._schedule = None
+
+  def current(self) -> Schedule:
+    schedule = self._schedule
+    today = date.today()
+    if schedule is None or schedule.today != today:
+      for _attempt in range(2):
+        # a first load from storage notifies us too; read again once it did
+        seen = self._changes
+        jobs, teams, events = load_json(JOBS), load_json(TEAMS), load_json(EVENTS)
+        if self._changes == seen:
+          break
+      schedule = build(jobs, teams, events, today)
+      keys = {job.get("id"): planning_key(job) for job in jobs}
+      with self._lock:
+        if self._changes == seen:
+          self._schedule = schedule
+          self._keys = keys
+    return schedule
+
+
+scheduler = Scheduler()
@@ -0,0 +1,338 @@
+"""Storage backends behind `data_loader`.
+
+`STORAGE_BACKEND=json` (default) keeps one JSON file per collection in
+`DATA_DIR`; `STORAGE_BACKEND=sqlite` keeps every collection in a single
+SQLite database (`SQLITE_PATH`, default `DATA_DIR/md.sqlite3`) in WAL mode,
+one row per record with indexed `id`, `jobId`, `customerId`, `status` and
+`itemId` columns.
+
+Import the existing md.data files once with:
+
+    python -m app.storage import [--force]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+from .indexes import inserted_runs
+from .journal import EventJournal, replay
+from .persistence import atomic_write_json
+
+ENCODINGS = ("utf-8", "utf-8-sig", "utf-16", "latin-1")
+INDEXED_FIELDS = ("jobId", "customerId", "status", "itemId")
+
+
+class JsonBackend:
+  """One JSON document per collection, optionally with an event journal."""
+
+  name = "json"
+  supports_queries = False
+
+  def __init__(self, data_dir: Path, fsync_journal: bool = False):
+    self.data_dir = data_dir
+    self.fsync_journal = fsync_journal
+    self._encodings: dict[str, str] = {}
+    self._journals: dict[str, EventJournal] = {}
+
+  def path(self, filename: str) -> Path:
+    return self.data_dir / filename
+
+  def use_journal(self, filename: str) -> EventJournal:
+    journal = self._journals.get(filename)
+    if journal is None:
+      path = self.data_dir / f"{Path(filename).stem}.events.jsonl"
+      journal = self._journals[filename] = EventJournal(path, fsync=self.fsync_journal)
+    return journal
+
+  def journaled(self, filename: str) -> bool:
+    return filename in self._journals
+
+  def signature(self, filename: str) -> tuple:
+    path = self.path(filename)
+    try:
+      st = path.stat()
+    except FileNotFoundError:
+      raise FileNotFoundError(f"Data file not found: {path}") from None
+    signature: tuple = (st.st_ino, st.st_mtime_ns, st.st_size)
+    journal = self._journals.get(filename)
+    if journal is not None:
+      signature += (journal.signature(),)
+    return signature
+
+  def read(self, filename: str) -> Any:
+    path = self.path(filename)
+    known = self._encodings.get(filename)
+    encodings = (known,) + tuple(e for e in ENCODINGS if e != known) if known else ENCODINGS
+    for encoding in encodings:
+      try:
+        with path.open(encoding=encoding) as f:
+          data = json.load(f)
+      except FileNotFoundError:
+        raise FileNotFoundError(f"Data file not found: {path}") from None
+      except (UnicodeDecodeError, json.JSONDecodeError):
+        continue
+      self._encodings[filename] = encoding
+      journal = self._journals.get(filename)
+      if journal is not None:
+        data = replay(data, journal.read())
+      return data
+
+    # If all encodings fail, raise error
+    raise ValueError(f"Cannot decode JSON file: {path}")
+
+  def write(self, filename: str, data: Any) -> None:
+    # for journaled collections this is the compaction step: snapshot first,
+    # then drop the events it contains (a crash in between only replays them)
+    atomic_write_json(self.path(filename), data)
+    self._encodings[filename] = "utf-8"
+    journal = self._journals.get(filename)
+    if journal is not None:
+      journal.truncate()
+
+  def write_many(self, docs: dict[str, Any]) -> None:
+    for filename, data in docs.items():
+      self.write(filename, data)
+
+  def append_events(self, filename: str, events: Iterable[dict]) -> int:
+    """Append to the journal; returns the number of events since compaction."""
+    journal = self._journals[filename]
+    for event in events:
+      journal.append(event)
+    return journal.count
+
+
+class SqliteBackend:
+  """All collections in one SQLite database, one row per list record."""
+
+  name = "sqlite"
+  supports_queries = True
+
+  def __init__(self, db_path: Path):
+    self.db_path = db_path
+    self._local = threading.local()
+    with self._conn() as conn:
+      conn.executescript(
+          """
+          CREATE TABLE IF NOT EXISTS collections (
+            name TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            doc TEXT,
+            version INTEGER NOT NULL DEFAULT 0
+          );
+          CREATE TABLE IF NOT EXISTS records (
+            collection TEXT NOT NULL,
+            pos INTEGER NOT NULL,
+            id TEXT,
+            jobId TEXT,
+            customerId TEXT,
+            status TEXT,
+            itemId TEXT,
+            body TEXT NOT NULL,
+            PRIMARY KEY (collection, pos)
+          );
+          CREATE INDEX IF NOT EXISTS records_id ON records (collection, id);
+          CREATE INDEX IF NOT EXISTS records_jobId ON records (collection, jobId);
+          CREATE INDEX IF NOT EXISTS records_customerId ON records (collection, customerId);
+          CREATE INDEX IF NOT EXISTS records_status ON records (collection, status);
+          CREATE INDEX IF NOT EXISTS records_itemId ON records (collection, itemId);
+          """
+      )
+
+  def _conn(self) -> sqlite3.Connection:
+    conn = getattr(self._local, "conn", None)
+    if conn is None:
+      self.db_path.parent.mkdir(parents=True, exist_ok=True)
+      conn = sqlite3.connect(self.db_path, timeout=30)
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.execute("PRAGMA synchronous=NORMAL")
+      self._local.conn = conn
+    return conn
+
+  def journaled(self, filename: str) -> bool:
+    return False
+
+  def signature(self, filename: str) -> tuple:
+    row = self._conn().execute("SELECT version FROM collections WHERE name = ?", (filename,)).fetchone()
+    if row is None:
+      raise FileNotFoundError(f"Collection not found in {self.db_path}: {filename}")
+    return (row[0],)
+
+  def read(self, filename: str) -> Any:
+    conn = self._conn()
+    row = conn.execute("SELECT kind, doc FROM collections WHERE name = ?", (filename,)).fetchone()
+    if row is None:
+      raise FileNotFoundError(f"Collection not found in {self.db_path}: {filename}")
+    kind, doc = row
+    if kind != "list":
+      return json.loads(doc)
+    rows = conn.execute("SELECT body FROM records WHERE collection = ? ORDER BY pos", (filename,))
+    return [json.loads(body) for (body,) in rows]
+
+  def write(self, filename: str, data: Any) -> None:
+    self.write_many({filename: data})
+
+  def write_many(self, docs: dict[str, Any]) -> None:
+    """Replace several collections in one transaction."""
+    with self._conn() as conn:
+      for filename, data in docs.items():
+        if isinstance(data, list):
+          self._replace_records(conn, filename, data)
+          self._bump(conn, filename, "list", None)
+        else:
+          conn.execute("DELETE FROM records WHERE collection = ?", (filename,))
+          self._bump(conn, filename, "doc", json.dumps(data, ensure_ascii=False))
+
+  @staticmethod
+  def _replace_records(conn: sqlite3.Connection, filename: str, data: list) -> None:
+    conn.execute("DELETE FROM records WHERE collection = ?", (filename,))
+    conn.executemany(
+        "INSERT INTO records (collection, pos, id, jobId, customerId, status, itemId, body) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (_row(filename, pos, record) for pos, record in enumerate(data)),
+    )
+
+  def append_events(self, filename: str, events: Iterable[dict]) -> int:
+    self.apply_events({filename: (None, events)})
+    return 0
+
+  def apply_events(self, changes: dict[str, tuple[list | None, Iterable[dict]]]) -> None:
+    """Apply record-level put/delete events to several collections atomically.
+
+    `changes` maps a filename to `(new_data, events)`. New rows get their
+    position from `new_data`: the front and back runs of new records are
+    numbered below the first / above the last row, in list order, so the
+    table reads back in the same order as the saved list. Without
+    `new_data` new rows go in front.
+    """
+    with self._conn() as conn:
+      for filename, (data, events) in changes.items():
+        added = {}
+        for event in events:
+          if event.get("op") == "delete":
+            conn.execute("DELETE FROM records WHERE collection = ? AND id = ?", (filename, event["id"]))
+            added.pop(event["id"], None)
+            continue
+          record = event["record"]
+          row = conn.execute(
+              "SELECT pos FROM records WHERE collection = ? AND id = ?", (filename, record.get("id"))
+          ).fetchone()
+          if row is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO records (collection, pos, id, jobId, customerId, status, itemId, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                _row(filename, row[0], record),
+            )
+          else:
+            added[record.get("id")] = record
+        if added:
+          self._insert_records(conn, filename, data, added)
+        self._bump(conn, filename, "list", None)
+
+  def _insert_records(self, conn: sqlite3.Connection, filename: str, data: list | None, added: dict) -> None:
+    first, last = conn.execute(
+        "SELECT COALESCE(MIN(pos), 0), COALESCE(MAX(pos), -1) FROM records WHERE collection = ?", (filename,)
+    ).fetchone()
+    if data is None:
+      rows = [(first - len(added) + i, record) for i, record in enumerate(reversed(added.values()))]
+    else:
+      runs = inserted_runs(data, set(added))
+      if runs is None:
+        # inserted in the middle of the list: renumber the collection
+        self._replace_records(conn, filename, data)
+        return
+      front, back = runs
+      rows = [(first - front + i, data[i]) for i in range(front)]
+      rows += [(last + 1 + i, data[len(data) - back + i]) for i in range(back)]
+    conn.executemany(
+        "INSERT INTO records (collection, pos, id, jobId, customerId, status, itemId, body) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (_row(filename, pos, record) for pos, record in rows),
+    )
+
+  def get_record(self, filename: str, record_id: str) -> dict | None:
+    row = self._conn().execute(
+        "SELECT body FROM records WHERE collection = ? AND id = ?", (filename, record_id)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+  def find_records(self, filename: str, field: str, value: Any) -> list[dict]:
+    if field not in INDEXED_FIELDS and field != "id":
+      raise ValueError(f"Field is not indexed: {field}")
+    rows = self._conn().execute(
+        f"SELECT body FROM records WHERE collection = ? AND {field} = ? ORDER BY pos", (filename, value)
+    )
+    return [json.loads(body) for (body,) in rows]
+
+  @staticmethod
+  def _bump(conn: sqlite3.Connection, filename: str, kind: str, doc: str | None) -> None:
+    conn.execute(
+        "INSERT INTO collections (name, kind, doc, version) VALUES (?, ?, ?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET kind = excluded.kind, doc = excluded.doc, version = version + 1",
+        (filename, kind, doc),
+    )
+
+
+def _row(filename: str, pos: int, record: Any) -> tuple:
+  get = record.get if isinstance(record, dict) else (lambda _key: None)
+  return (
+      filename,
+      pos,
+      _key(get("id")),
+      *(_key(get(field)) for field in INDEXED_FIELDS),
+      json.dumps(record, ensure_ascii=False),
+  )
+
+
+def _key(value: Any) -> Any:
+  return value if value is None or isinstance(value, (str, int, float)) else json.dumps(value)
+
+
+def backend_from_env(data_dir: Path, fsync: bool = False) -> JsonBackend | SqliteBackend:
+  kind = os.getenv("STORAGE_BACKEND", "json").lower()
+  if kind == "json":
+    return JsonBackend(data_dir, fsync_journal=fsync)
+  if kind == "sqlite":
+    return SqliteBackend(Path(os.getenv("SQLITE_PATH") or data_dir / "md.sqlite3").resolve())
+  raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
+
+
+def import_json(source: JsonBackend, target: SqliteBackend, force: bool = False) -> list[str]:
+  """Copy every `*.json` collection (plus its journal) into SQLite in one transaction."""
+  docs = {}
+  for path in sorted(source.data_dir.glob("*.json")):
+    filename = path.name
+    if not force:
+      try:
+        target.signature(filename)
+        continue
+      except FileNotFoundError:
+        pass
+    if (source.data_dir / f"{path.stem}.events.jsonl").exists():
+      source.use_journal(filename)
+    docs[filename] = source.read(filename)
+  target.write_many(docs)
+  return list(docs)
+
+
+def main(argv: list[str]) -> int:
+  if not argv or argv[0] != "import":
+    print("usage: python -m app.storage import [--force]", file=sys.stderr)
+    return 2
+  from .data_loader import get_data_dir
+
+  data_dir = get_data_dir()
+  target = SqliteBackend(Path(os.getenv("SQLITE_PATH") or data_dir / "md.sqlite3").resolve())
+  imported = import_json(JsonBackend(data_dir), target, force="--force" in argv)
+  print(f"{len(imported)} koleksiyon aktarıldı -> {target.db_path}")
+  for filename in imported:
+    print(f"  {filename}")
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+"""Background thumbnail / preview generation for uploaded documents.
+
+Thumbnails are cached next to the blobs as `md.docs/thumbs/<sha[:2]>/<sha>.jpg`,
+so documents sharing a file share its thumbnail too. Rendering runs on a
+process pool (`THUMBNAIL_WORKERS`, default 2) so decoding large scans and
+PDFs never competes with request handling for the GIL.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from . import imaging
+from .docstore import DOCS_ROOT
+
+THUMB_DIR = DOCS_ROOT / "thumbs"
+THUMB_SIZE = 320
+
+
+def _env_int(name: str, default: int) -> int:
+  try:
+    return int(os.getenv(name, default))
+  except ValueError:
+    return default
+
+
+_workers = _env_int("THUMBNAIL_WORKERS", 2)
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pending: dict[str, Future] = {}
+
+
+def _executor(replace: bool = False) -> ProcessPoolExecutor:
+  global _pool
+  if _pool is None or replace:
+    # spawn: forking a process that runs threads (write-behind, uvicorn) is unsafe
+    _pool = ProcessPoolExecutor(max_workers=_workers, mp_context=multiprocessing.get_context("spawn"))
+  return _pool
+
+
+def start() -> None:
+  """Create the render pool at startup rather than inside a request."""
+  if _workers > 0:
+    with _lock:
+      _executor()
+
+
+def thumbnail_path(doc: dict) -> Path | None:
+  sha256 = doc.get("sha256")
+  if not sha256:
+    return None
+  return THUMB_DIR / sha256[:2] / f"{sha256}.jpg"
+
+
+def supported(doc: dict) -> bool:
+  return _workers > 0 and bool(doc.get("sha256")) and imaging.can_render(doc.get("mimeType"))
+
+
+def schedule(doc: dict) -> Future | None:
+  """Queue thumbnail generation for `doc`; returns None if there is nothing to do.
+
+  Requests for the same file while one is running share its future.
+  Submitting may start (or replace) worker processes, so async callers
+  run it in the threadpool.
+  """
+  if not supported(doc):
+    return None
+  target = thumbnail_path(doc)
+  if target.exists():
+    return None
+  sha256 = doc["sha256"]
+  with _lock:
+    future = _pending.get(sha256)
+    if future is not None:
+      return future
+    target.parent.mkdir(parents=True, exist_ok=True)
+    args = (imaging.render_thumbnail, str(DOCS_ROOT / doc["path"]), doc["mimeType"], str(target), THUMB_SIZE)
+    try:
+      future = _executor().submit(*args)
+    except BrokenProcessPool:
+      # a worker died (e.g. a crashing decoder); start a fresh pool
+      future = _executor(replace=True).submit(*args)
+    _pending[sha256] = future
+  future.add_done_callback(lambda _f: _forget(sha256))
+  return future
+
+
+def _forget(sha256: str) -> None:
+  with _lock:
+    _pending.pop(sha256, None)
+
+
+def discard(doc: dict) -> None:
+  """Remove the cached thumbnail of a file that is no longer stored."""
+  target = thumbnail_path(doc)
+  if target is not None:
+    target.unlink(missing_ok=True)
+
+
+def shutdown() -> None:
+  with _lock:
+    if _pool is not None:
+      _pool.shutdown(wait=False, cancel_futures=True)
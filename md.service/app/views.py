@@ -0,0 +1,101 @@
+import threading
+from typing import Any, Callable
+
+from .data_loader import load_json, subscribe
+
+
+class RecordView:
+  """Per-record derived values of one collection, kept in memory.
+
+  Built from the collection on first use, then updated from the store's
+  change events one record at a time; a wholesale replacement or reload
+  just drops it so the next read rebuilds it.
+  """
+
+  def __init__(self, filename: str, derive: Callable[[dict], Any]):
+    self.filename = filename
+    self.derive = derive
+    self._lock = threading.Lock()
+    self._values: dict[Any, Any] | None = None
+    self._changes = 0
+    subscribe(filename, self._on_change)
+
+  def get(self, record_id: Any) -> Any:
+    return self._ensure().get(record_id)
+
+  def values(self) -> dict[Any, Any]:
+    return self._ensure()
+
+  def _ensure(self) -> dict[Any, Any]:
+    values = self._values
+    if values is None:
+      seen = self._changes
+      records = load_json(self.filename)
+      values = {r.get("id"): self.derive(r) for r in records}
+      with self._lock:
+        # only publish if no change slipped in while building
+        if self._values is None and self._changes == seen:
+          self._values = values
+    return values
+
+  def _on_change(self, _data: Any, events: list[dict] | None) -> None:
+    with self._lock:
+      self._changes += 1
+      values = self._values
+      if values is None:
+        return
+      if events is None:
+        self._values = None
+        return
+      for event in events:
+        if event.get("op") == "delete":
+          values.pop(event.get("id"), None)
+        else:
+          values[event.get("id")] = self.derive(event["record"])
+
+
+class CountView:
+  """Number of records of one collection matching `predicate`.
+
+  Kept like `RecordView`: built on first use, then adjusted by each put or
+  delete event instead of rescanning the collection, so reading it is O(1).
+  """
+
+  def __init__(self, filename: str, predicate: Callable[[dict], bool]):
+    self.filename = filename
+    self.predicate = predicate
+    self._lock = threading.Lock()
+    self._matches: dict[Any, bool] | None = None
+    self._count = 0
+    self._changes = 0
+    subscribe(filename, self._on_change)
+
+  def count(self) -> int:
+    with self._lock:
+      if self._matches is not None:
+        return self._count
+      seen = self._changes
+    records = load_json(self.filename)
+    matches = {r.get("id"): bool(self.predicate(r)) for r in records}
+    count = sum(matches.values())
+    with self._lock:
+      if self._matches is None and self._changes == seen:
+        self._matches = matches
+        self._count = count
+    return count
+
+  def _on_change(self, _data: Any, events: list[dict] | None) -> None:
+    with self._lock:
+      self._changes += 1
+      matches = self._matches
+      if matches is None:
+        return
+      if events is None:
+        self._matches = None
+        return
+      for event in events:
+        before = matches.pop(event.get("id"), False)
+        after = event.get("op") != "delete" and bool(self.predicate(event["record"]))
+        if after:
+          matches[event.get("id")] = True
+        self._count += after - before
@@ -0,0 +1,66 @@
+"""Job workflow: the statuses a job can be in and the moves between them.
+
+`TRANSITIONS` is the single source of truth; every endpoint that changes a
+job's status goes through `transition`, so e.g. a closed (`KAPALI`) job
+cannot be re-opened by saving its measurement again. Staying in the same
+status (re-saving a stage) is allowed everywhere except in final statuses.
+"""
+
+TRANSITIONS: dict[str, tuple[str, ...]] = {
+    "OLCU_ASAMASI": ("FIYATLANDIRMA",),
+    "FIYATLANDIRMA": ("OLCU_ASAMASI", "TEKLIF_TASLAK", "TEKLIF_HAZIR"),
+    "TEKLIF_TASLAK": ("FIYATLANDIRMA", "TEKLIF_HAZIR", "ONAY_BEKLIYOR"),
+    "TEKLIF_HAZIR": ("FIYATLANDIRMA", "TEKLIF_TASLAK", "ONAY_BEKLIYOR"),
+    "ONAY_BEKLIYOR": ("TEKLIF_TASLAK", "TEKLIF_HAZIR", "STOK_BEKLIYOR", "URETIME_HAZIR"),
+    "STOK_BEKLIYOR": ("ONAY_BEKLIYOR", "URETIME_HAZIR"),
+    "URETIME_HAZIR": ("ONAY_BEKLIYOR", "STOK_BEKLIYOR", "URETIMDE", "ANLASMADA", "MONTAJA_HAZIR"),
+    "URETIMDE": ("ANLASMADA", "MONTAJA_HAZIR"),
+    "ANLASMADA": ("URETIMDE", "MONTAJA_HAZIR"),
+    "MONTAJA_HAZIR": ("URETIMDE", "MONTAJ_TERMIN", "MUHASEBE_BEKLIYOR"),
+    "MONTAJ_TERMIN": ("MONTAJA_HAZIR", "MUHASEBE_BEKLIYOR"),
+    "MUHASEBE_BEKLIYOR": ("KAPALI",),
+    "KAPALI": (),
+}
+
+STATUSES = tuple(TRANSITIONS)
+FINAL = frozenset(status for status, targets in TRANSITIONS.items() if not targets)
+
+# statuses that carry data of their own and are only reachable through
+# their endpoint, not through a plain status change
+ENDPOINT_ONLY = {
+    "ONAY_BEKLIYOR": "/approval/start",
+    "MONTAJ_TERMIN": "/assembly/schedule",
+    "MUHASEBE_BEKLIYOR": "/assembly/complete",
+    "KAPALI": "/finance/close",
+}
+
+
+class InvalidTransition(ValueError):
+  """A job cannot move from its current status to the requested one."""
+
+
+def allowed(current: str | None, target: str) -> bool:
+  if target not in TRANSITIONS:
+    return False
+  if current not in TRANSITIONS:
+    # legacy / unknown status: let it join the workflow anywhere
+    return True
+  if current == target:
+    return current not in FINAL
+  return target in TRANSITIONS[current]
+
+
+def check(job: dict, target: str) -> None:
+  """Raise `InvalidTransition` unless `job` may move to `target`."""
+  current = job.get("status")
+  if target not in TRANSITIONS:
+    raise InvalidTransition(f"Bilinmeyen iş durumu: {target}")
+  if not allowed(current, target):
+    raise InvalidTransition(f"Geçersiz durum geçişi: {current} → {target}")
+
+
+def transition(job: dict, target: str) -> dict:
+  """Set `job["status"]` to `target` after checking the transition table."""
+  check(job, target)
+  job["status"] = target
+  return job
@@ -0,0 +1,38 @@
+"""Run the service against a scratch copy of md.data and an empty md.docs.
+
+`DATA_DIR` / `DOCS_DIR` are read when the app modules are imported, so they
+are set here, before any test module imports the app.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DATA = SERVICE_DIR.parent / "md.data"
+
+
+def copy_data(target: Path) -> Path:
+  data_dir = target / "md.data"
+  shutil.copytree(SOURCE_DATA, data_dir, ignore=shutil.ignore_patterns(".locks", "*.tmp"))
+  return data_dir
+
+
+_scratch = Path(tempfile.mkdtemp(prefix="md-service-tests-"))
+os.environ["DATA_DIR"] = str(copy_data(_scratch))
+os.environ["DOCS_DIR"] = str(_scratch / "md.docs")
+sys.path.insert(0, str(SERVICE_DIR))
+
+
+@pytest.fixture(scope="session")
+def client():
+  from fastapi.testclient import TestClient
+
+  from app.main import app
+
+  with TestClient(app) as test_client:
+    yield test_client
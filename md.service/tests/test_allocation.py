@@ -0,0 +1,85 @@
+"""Stock needs of an approved job are reserved, and topped up on goods receipt."""
+
+import pytest
+
+PAYMENT_PLAN = {"cash": 100, "card": 0, "cheque": 0, "afterDelivery": 0, "cheques": []}
+
+
+def _item(client, on_hand):
+  response = client.post("/stock/items", json={
+      "name": "Test Profil", "sku": "TST-1", "unit": "adet", "supplier": "Test",
+      "onHand": on_hand, "reserved": 0, "critical": 0,
+  })
+  assert response.status_code == 201, response.text
+  return response.json()["id"]
+
+
+def _offered_job(client):
+  job = client.post("/jobs/", json={
+      "customerId": "CST-12", "customerName": "Test Müşteri", "title": "Test", "startType": "FIYATLANDIRMA",
+  }).json()
+  response = client.put(f"/jobs/{job['id']}/offer", json={"lines": [], "total": 100, "status": "TEKLIF_HAZIR"})
+  assert response.status_code == 200, response.text
+  return job["id"]
+
+
+def _approve(client, job_id, needs):
+  return client.post(f"/jobs/{job_id}/approval/start", json={"paymentPlan": PAYMENT_PLAN, "stockNeeds": needs})
+
+
+def _reservations(client, job_id):
+  return [r for r in client.get("/stock/reservations").json() if r.get("jobId") == job_id and r["status"] != "İptal"]
+
+
+def test_full_allocation(client):
+  item_id = _item(client, 10)
+  job_id = _offered_job(client)
+
+  job = _approve(client, job_id, [{"id": item_id, "qty": 4}]).json()
+
+  assert job["status"] == "URETIME_HAZIR"
+  assert job["stock"]["ready"] is True and job["stock"]["shortages"] == []
+  [reservation] = _reservations(client, job_id)
+  assert (reservation["qty"], reservation["shortage"], reservation["status"]) == (4, 0, "Ayrıldı")
+
+
+def test_partial_shortage_is_replanned_on_goods_receipt(client):
+  item_id = _item(client, 3)
+  job_id = _offered_job(client)
+
+  job = _approve(client, job_id, [{"itemId": item_id, "qty": 5}]).json()
+  assert job["status"] == "STOK_BEKLIYOR"
+  assert job["stock"]["shortages"] == [{"itemId": item_id, "item": "Test Profil", "shortage": 2}]
+  [reservation] = _reservations(client, job_id)
+  assert (reservation["qty"], reservation["shortage"], reservation["status"]) == (3, 2, "Beklemede")
+
+  response = client.post("/stock/movements", json={"itemId": item_id, "qty": 2, "type": "stockIn"})
+  assert response.status_code == 201, response.text
+
+  job = client.get(f"/jobs/{job_id}").json()
+  assert job["status"] == "URETIME_HAZIR" and job["stock"]["ready"] is True
+  [reservation] = _reservations(client, job_id)
+  assert (reservation["qty"], reservation["shortage"], reservation["status"]) == (5, 0, "Ayrıldı")
+
+
+def test_stock_update_cannot_contradict_reservations(client):
+  item_id = _item(client, 1)
+  job_id = _offered_job(client)
+  _approve(client, job_id, [{"id": item_id, "qty": 2}])
+
+  job = client.put(f"/jobs/{job_id}/stock", json={"ready": True, "purchaseNotes": "elle"}).json()
+
+  assert job["status"] == "STOK_BEKLIYOR" and job["stock"]["ready"] is False
+
+
+@pytest.mark.parametrize("needs", [["STK-101"], [{"itemId": "STK-101", "qty": "abc"}], [{"itemId": "STK-101", "qty": 0}], [{"qty": 1}]])
+def test_malformed_stock_needs_are_rejected(client, needs):
+  job_id = _offered_job(client)
+  assert _approve(client, job_id, needs).status_code == 422
+
+
+def test_unknown_stock_item(client):
+  job_id = _offered_job(client)
+  response = _approve(client, job_id, [{"itemId": "STK-YOK", "qty": 1}])
+  assert response.status_code == 400
+  assert "STK-YOK" in response.json()["detail"]
@@ -0,0 +1,95 @@
+"""Concurrent stock movements must not lose updates (threads and workers)."""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import SERVICE_DIR, copy_data
+
+ITEM = "STK-101"
+
+
+def _post_movements(client, count: int) -> None:
+  def post(_):
+    response = client.post("/stock/movements", json={"itemId": ITEM, "qty": 1, "type": "stockIn"})
+    assert response.status_code == 201, response.text
+
+  with ThreadPoolExecutor(8) as pool:
+    list(pool.map(post, range(count)))
+
+
+def _state(client) -> tuple[int, int]:
+  item = next(i for i in client.get("/stock/items").json() if i["id"] == ITEM)
+  movements = client.get("/stock/movements", params={"itemId": ITEM, "limit": 1})
+  return item["onHand"], int(movements.headers["X-Total-Count"])
+
+
+def test_threads_do_not_lose_movements(client):
+  on_hand, count = _state(client)
+  _post_movements(client, 100)
+  assert _state(client) == (on_hand + 100, count + 100)
+
+
+WORKER = textwrap.dedent("""
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    def post(_):
+      response = client.post("/stock/movements", json={"itemId": sys.argv[1], "qty": 1, "type": "stockIn"})
+      assert response.status_code == 201, response.text
+    with ThreadPoolExecutor(4) as pool:
+      list(pool.map(post, range(int(sys.argv[2]))))
+""")
+
+STATE = textwrap.dedent("""
+    import json, sys
+    from app.data_loader import get_record, find_records
+    print(json.dumps([get_record("stockItems.json", sys.argv[1])["onHand"],
+                      len(find_records("stockMovements.json", "itemId", sys.argv[1]))]))
+""")
+
+
+def _run(code: str, env: dict, *args: str) -> str:
+  result = subprocess.run(
+      [sys.executable, "-c", code, *args], cwd=SERVICE_DIR, env=env,
+      capture_output=True, text=True, timeout=300,
+  )
+  assert result.returncode == 0, result.stderr
+  return result.stdout
+
+
+def test_workers_with_file_locks_do_not_lose_movements(tmp_path):
+  env = {**os.environ, "DATA_DIR": str(copy_data(tmp_path)), "DATA_FILE_LOCKS": "1"}
+  on_hand, count = json.loads(_run(STATE, env, ITEM))
+
+  workers, per_worker = 4, 25
+  procs = [
+      subprocess.Popen([sys.executable, "-c", WORKER, ITEM, str(per_worker)], cwd=SERVICE_DIR, env=env,
+                       stderr=subprocess.PIPE, text=True)
+      for _ in range(workers)
+  ]
+  for proc in procs:
+    _out, err = proc.communicate(timeout=300)
+    assert proc.returncode == 0, err
+
+  total = workers * per_worker
+  assert json.loads(_run(STATE, env, ITEM)) == [on_hand + total, count + total]
+
+
+def test_stale_optimistic_save_conflicts(client):
+  from app.data_loader import VersionConflict, load_versioned, save_json
+
+  client.get("/colors/")
+  colors, version = load_versioned("colors.json")
+  response = client.post("/colors/", json={"name": "Test", "code": "TST-1"})
+  assert response.status_code == 201, response.text
+  with pytest.raises(VersionConflict):
+    save_json("colors.json", colors, expected_version=version)
@@ -0,0 +1,32 @@
+"""Collection-derived ETags: 304 on a match, and date-relative paths roll over daily."""
+
+from datetime import date
+
+from app import conditional
+from app.data_loader import put_record
+
+
+def test_unchanged_collection_answers_304(client):
+  first = client.get("/jobs/")
+  assert first.status_code == 200
+  again = client.get("/jobs/", headers={"If-None-Match": first.headers["etag"]})
+  assert again.status_code == 304
+
+
+def test_dated_paths_change_etag_with_the_day(client, monkeypatch):
+  etag = client.get("/planning/schedule").headers["etag"]
+  assert client.get("/planning/schedule", headers={"If-None-Match": etag}).status_code == 304
+
+  class Tomorrow(date):
+    @classmethod
+    def today(cls):
+      return date.fromordinal(date.today().toordinal() + 1)
+
+  monkeypatch.setattr(conditional, "date", Tomorrow)
+  assert client.get("/planning/schedule", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_purchase_orders_invalidate_stock_etags(client):
+  etag = client.get("/stock/reorder-suggestions").headers["etag"]
+  put_record("purchaseOrders.json", {"id": "PO-ETAG-TEST", "supplier": "Test", "status": "Taslak", "items": []})
+  assert client.get("/stock/reorder-suggestions", headers={"If-None-Match": etag}).status_code == 200
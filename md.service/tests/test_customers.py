@@ -0,0 +1,7 @@
+"""Customer list sorts on the live rollup values it shows."""
+
+
+def test_sort_by_rollup_fields(client):
+  for field in ("jobs", "openJobs"):
+    shown = [c[field] for c in client.get("/customers/", params={"sort": f"-{field}"}).json()]
+    assert shown == sorted(shown, reverse=True)
@@ -0,0 +1,25 @@
+"""Identical uploads share one blob until the last document is deleted."""
+
+import uuid
+
+from app.docstore import DOCS_ROOT
+from test_documents import DOC_MAGIC, upload
+
+
+def test_blob_is_shared_and_released_with_the_last_document(client):
+  content = DOC_MAGIC + uuid.uuid4().hex.encode()
+  first = upload(client, content, "ilk.doc").json()
+  second = upload(client, content, "kopya.doc").json()
+
+  assert first["id"] != second["id"]
+  assert first["path"] == second["path"]
+  blob = DOCS_ROOT / first["path"]
+  assert blob.read_bytes() == content
+  assert len(list(blob.parent.glob(f"{first['sha256']}*"))) == 1
+
+  assert client.delete(f"/documents/{first['id']}").status_code == 200
+  assert blob.exists()
+  assert client.get(f"/documents/{second['id']}/download").content == content
+
+  assert client.delete(f"/documents/{second['id']}").status_code == 200
+  assert not blob.exists()
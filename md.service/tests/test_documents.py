@@ -0,0 +1,50 @@
+"""Document downloads: conditional requests and byte ranges."""
+
+import uuid
+
+import pytest
+
+# magic bytes of a legacy Word file: accepted, but never thumbnailed
+DOC_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def upload(client, content: bytes, name: str = "test.doc"):
+  return client.post(
+      "/documents/upload",
+      data={"jobId": "JOB-TEST", "docType": "diger"},
+      files={"file": (name, content, "application/octet-stream")},
+  )
+
+
+@pytest.fixture
+def document(client):
+  content = DOC_MAGIC + uuid.uuid4().hex.encode() * 4
+  response = upload(client, content)
+  assert response.status_code == 200, response.text
+  return response.json(), content
+
+
+def test_if_none_match_returns_304(client, document):
+  doc, _content = document
+  first = client.get(f"/documents/{doc['id']}/download")
+  assert first.status_code == 200
+  assert first.headers["etag"] == f'"{doc["sha256"]}"'
+
+  again = client.get(f"/documents/{doc['id']}/download", headers={"If-None-Match": first.headers["etag"]})
+  assert again.status_code == 304
+  assert again.content == b""
+
+
+def test_range_returns_206(client, document):
+  doc, content = document
+  response = client.get(f"/documents/{doc['id']}/download", headers={"Range": "bytes=0-9"})
+  assert response.status_code == 206
+  assert response.headers["content-range"] == f"bytes 0-9/{len(content)}"
+  assert response.content == content[:10]
+
+
+def test_unsatisfiable_range_returns_416(client, document):
+  doc, content = document
+  response = client.get(f"/documents/{doc['id']}/download", headers={"Range": f"bytes={len(content) + 10}-"})
+  assert response.status_code == 416
+  assert response.headers["content-range"] == f"bytes */{len(content)}"
@@ -0,0 +1,59 @@
+"""Change stream resume: Last-Event-ID replays what was missed, or resets."""
+
+import asyncio
+
+from app.changefeed import ChangeFeed
+from app.routers import events
+
+CUSTOMER = {"name": "Test Müşteri", "segment": "B2C", "location": "x", "contact": "y"}
+
+
+class _Request:
+  """Stays connected for one pass of the stream loop."""
+
+  def __init__(self):
+    self.polls = 0
+
+  async def is_disconnected(self):
+    self.polls += 1
+    return self.polls > 1
+
+
+def _messages(last_event_id: str | None) -> list[dict]:
+  async def read():
+    response = await events.change_stream(_Request(), "customers", last_event_id, None)
+    return b"".join([chunk async for chunk in response.body_iterator]).decode()
+
+  messages = []
+  for block in asyncio.run(read()).split("\n\n"):
+    fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+    if "event" in fields:
+      messages.append(fields)
+  return messages
+
+
+def _touch_customer(client, times: int) -> None:
+  for _ in range(times):
+    assert client.put("/customers/CST-12", json=CUSTOMER).status_code == 200
+
+
+def test_resume_replays_only_missed_changes(client):
+  _touch_customer(client, 1)
+  seen = events.feed.last_seq
+  _touch_customer(client, 3)
+
+  messages = _messages(f"{events.feed.epoch}:{seen + 1}")
+
+  assert [m["event"] for m in messages] == ["change", "change"]
+  assert [m["id"] for m in messages] == [f"{events.feed.epoch}:{seen + 2}", f"{events.feed.epoch}:{seen + 3}"]
+
+
+def test_resume_outside_buffer_resets(client, monkeypatch):
+  small = ChangeFeed({"customers.json": "customers"}, size=2)
+  monkeypatch.setattr(events, "feed", small)
+  monkeypatch.setattr(events, "KEEPALIVE_SECONDS", 0)
+  _touch_customer(client, 4)
+
+  assert [m["event"] for m in _messages(f"{small.epoch}:1")] == ["reset"]
+  # an id from another process (or an earlier start) resets as well
+  assert [m["event"] for m in _messages(f"other:{small.last_seq}")] == ["reset"]
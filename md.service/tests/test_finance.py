@@ -0,0 +1,46 @@
+"""Finance close sums payments in kuruş, so fractional lira balance exactly."""
+
+from app.data_loader import get_record, put_record
+from test_allocation import _offered_job
+
+
+def _awaiting_accounting(client, total: float, plan: dict) -> str:
+  job_id = _offered_job(client)
+  job = get_record("jobs.json", job_id)
+  put_record("jobs.json", {
+      **job,
+      "status": "MUHASEBE_BEKLIYOR",
+      "offer": {**job["offer"], "total": total},
+      "approval": {"paymentPlan": plan},
+  })
+  return job_id
+
+
+def test_mixed_fractional_payments_balance_to_zero(client):
+  job_id = _awaiting_accounting(client, 99.4, {"cash": 0.1, "card": 0.2, "cheque": 0.3})
+  # summed as binary floats these payments miss the total
+  assert 0.1 + 0.2 + 0.3 + 33.33 + 33.33 + 31.94 + 0.2 != 99.4
+
+  response = client.put(f"/jobs/{job_id}/finance/close", json={
+      "total": 99.4,
+      "payments": {"cash": 33.33, "card": "33.33", "cheque": 31.94},
+      "discount": {"amount": 0.2, "note": "Yuvarlama"},
+  })
+
+  assert response.status_code == 200, response.text
+  job = response.json()
+  assert job["status"] == "KAPALI"
+  assert job["logs"][-1]["note"] == "balance=0.0"
+  assert job["finance"]["prePayments"] == {"cash": 0.1, "card": 0.2, "cheque": 0.3}
+  assert job["finance"]["finalPayments"] == {"cash": 33.33, "card": 33.33, "cheque": 31.94}
+  assert job["finance"]["discount"]["amount"] == 0.2
+
+
+def test_one_kurus_short_is_refused(client):
+  job_id = _awaiting_accounting(client, 100.5, {"cash": 0.1, "card": 0.2})
+
+  response = client.put(f"/jobs/{job_id}/finance/close", json={"total": 100.5, "payments": {"cash": 100.19}})
+
+  assert response.status_code == 400
+  assert "0.01₺" in response.json()["detail"]
+  assert client.get(f"/jobs/{job_id}").json()["status"] == "MUHASEBE_BEKLIYOR"
@@ -0,0 +1,40 @@
+"""Secondary index lookups keep collection order after multi-record inserts."""
+
+from app.indexes import RecordIndex
+
+ITEM = "STK-103"
+
+
+def _put(record: dict) -> dict:
+  return {"op": "put", "id": record["id"], "record": record}
+
+
+def test_front_and_back_inserts_keep_list_order():
+  records = [{"id": f"r{i}", "kind": "x"} for i in range(3)]
+  index = RecordIndex(records)
+  assert [r["id"] for r in index.find("kind", "x")] == ["r0", "r1", "r2"]
+
+  front = [{"id": f"f{i}", "kind": "x"} for i in range(3)]
+  back = [{"id": f"b{i}", "kind": "x"} for i in range(2)]
+  records = front + records + back
+  # events in creation order, front run stored newest first
+  index.apply([_put(r) for r in reversed(front)] + [_put(r) for r in back], records)
+  assert index.find("kind", "x") == records
+
+  middle = {"id": "m", "kind": "x"}
+  records.insert(4, middle)
+  index.apply([_put(middle)], records)
+  assert index.find("kind", "x") == records
+
+
+def test_filtered_movements_follow_full_list_after_batch(client):
+  # build the itemId index before the batch so it is updated incrementally
+  client.get("/stock/movements", params={"itemId": ITEM})
+  lines = [{"itemId": ITEM, "qty": 1, "type": "stockIn", "reason": f"line-{i}"} for i in range(3)]
+  response = client.post("/stock/movements/batch", json={"movements": lines})
+  assert response.status_code == 201, response.text
+
+  filtered = client.get("/stock/movements", params={"itemId": ITEM}).json()
+  full = [m for m in client.get("/stock/movements").json() if m.get("itemId") == ITEM]
+  assert [m["id"] for m in filtered] == [m["id"] for m in full]
+  assert [m["reason"] for m in filtered[:3]] == ["line-2", "line-1", "line-0"]
@@ -0,0 +1,26 @@
+"""Point-in-time stock balances from the movement ledger."""
+
+from test_allocation import _item
+
+
+def test_balance_at_follows_each_movement(client):
+  item_id = _item(client, 10)
+  moves = []
+  for movement_type, qty in (("stockIn", 5), ("reserve", 3), ("stockOut", 4), ("release", 1)):
+    response = client.post("/stock/movements", json={"itemId": item_id, "qty": qty, "type": movement_type})
+    assert response.status_code == 201, response.text
+    moves.append(response.json()["movement"])
+
+  def balance(at):
+    body = client.get(f"/stock/items/{item_id}/balance", params={"at": at}).json()
+    return body["onHand"], body["reserved"], body["movementId"]
+
+  assert balance("2000-01-01") == (10, 0, None)
+  expected = [(15, 0), (15, 3), (11, 3), (11, 2)]
+  for movement, (on_hand, reserved) in zip(moves, expected):
+    assert balance(movement["at"]) == (on_hand, reserved, movement["id"])
+  # a bare date means the end of that day
+  assert balance(moves[-1]["date"]) == (11, 2, moves[-1]["id"])
+
+  entries = client.get(f"/stock/items/{item_id}/ledger").json()
+  assert [(e["onHand"], e["reserved"]) for e in entries] == expected
@@ -0,0 +1,28 @@
+"""Write-behind coalescing of record-level saves."""
+
+from collections import Counter
+
+from app import data_loader
+
+
+def test_burst_of_movements_is_coalesced(client, monkeypatch):
+  writes = Counter()
+  write_fn = data_loader.writer.write_fn
+
+  def counting_write(key, data):
+    writes[key] += 1
+    write_fn(key, data)
+
+  data_loader.flush()
+  monkeypatch.setattr(data_loader.writer, "write_fn", counting_write)
+  for _ in range(20):
+    response = client.post("/stock/movements", json={"itemId": "STK-101", "qty": 1, "type": "stockIn"})
+    assert response.status_code == 201, response.text
+  for _ in range(20):
+    response = client.put("/customers/CST-12", json={"name": "Test Müşteri", "segment": "B2C", "location": "x", "contact": "y"})
+    assert response.status_code == 200, response.text
+  data_loader.flush()
+
+  # the debounce may split a burst, but not into one write per request
+  for name in ("stockItems.json", "stockMovements.json", "customers.json"):
+    assert 1 <= writes[name] <= 5, writes
@@ -0,0 +1,31 @@
+"""Reorder suggestions: the numpy and plain-Python paths agree."""
+
+from datetime import date
+
+import pytest
+
+from app import reorder
+
+ITEMS = [
+    {"id": "A", "onHand": 5, "reserved": 1, "reorderPoint": 10, "minOrderQty": 20, "unitCost": 2.5, "supplier": "S1"},
+    {"id": "B", "onHand": 100, "critical": 5, "leadTimeDays": 14},
+    {"id": "C", "onHand": 100, "reorderPoint": 5, "leadTimeDays": 3},
+    {"id": "D", "onHand": 0, "reorderPoint": 0},
+    {"id": "E", "onHand": 7.5, "reorderPoint": 2, "minOrderQty": 2.5},
+]
+CONSUMED = {"A": 30, "B": 300, "C": 30, "D": 0, "E": 60}
+
+
+@pytest.fixture
+def consumption(monkeypatch):
+  monkeypatch.setattr(reorder, "consumption", lambda item_id, since, until: CONSUMED[item_id])
+
+
+def test_numpy_and_plain_paths_agree(consumption, monkeypatch):
+  pytest.importorskip("numpy")
+  vectorized = reorder.suggest(ITEMS, 30, date(2026, 1, 31))
+  monkeypatch.setattr(reorder, "numpy", None)
+  plain = reorder.suggest(ITEMS, 30, date(2026, 1, 31))
+  assert vectorized == plain
+  assert [s["itemId"] for s in plain] == ["E", "A", "B", "D"]
+  assert plain[1]["suggestedQty"] == 20 and isinstance(plain[1]["suggestedQty"], int)
@@ -0,0 +1,57 @@
+"""Team bookings: double-booked days and when the schedule is rebuilt."""
+
+from datetime import date
+
+from app import scheduling
+from app.data_loader import load_json, put_record
+
+TEAMS = [{"id": "TEAM-MNT-1", "name": "Ekip 1", "kind": "assembly", "capacity": 1, "aliases": ["Ekip-1"]}]
+MONDAY = date(2030, 1, 7)
+
+
+def _assembly_job(job_id: str, day: str, team: str, days: int = 1) -> dict:
+  return {
+      "id": job_id, "title": job_id, "customerName": "Test", "status": "MONTAJ_TERMIN",
+      "assembly": {"schedule": {"date": day, "team": team, "days": days}},
+  }
+
+
+def test_overlapping_fixed_bookings_are_conflicts():
+  jobs = [
+      _assembly_job("JOB-A", "2030-01-07", "Ekip 1", days=2),
+      _assembly_job("JOB-B", "2030-01-08", "Ekip-1"),
+      _assembly_job("JOB-C", "2030-01-09", "Ekip 1"),
+  ]
+  schedule = scheduling.build(jobs, TEAMS, [], MONDAY)
+
+  assert schedule.conflicts() == [{
+      "teamId": "TEAM-MNT-1", "team": "Ekip 1", "date": "2030-01-08", "capacity": 1, "jobIds": ["JOB-A", "JOB-B"],
+  }]
+
+
+def test_conflicts_are_reported_by_the_planning_endpoint(client):
+  # the API refuses double bookings, so they can only come from stored data
+  ids = []
+  for _ in range(2):
+    job = client.post("/jobs/", json={
+        "customerId": "CST-12", "customerName": "Test", "title": "Çakışma", "startType": "FIYATLANDIRMA",
+    }).json()
+    put_record("jobs.json", {**job, **_assembly_job(job["id"], "2030-01-08", "Ekip 1"), "logs": job["logs"]})
+    ids.append(job["id"])
+
+  conflicts = client.get("/planning/schedule").json()["conflicts"]
+
+  assert {"teamId": "TEAM-MNT-1", "team": "Ekip 1", "date": "2030-01-08", "capacity": 1, "jobIds": sorted(ids)} in [
+      {**c, "jobIds": sorted(c["jobIds"])} for c in conflicts
+  ]
+
+
+def test_only_planning_changes_rebuild_the_schedule(client):
+  job = next(j for j in load_json("jobs.json") if scheduling.planning_key(j))
+  before = scheduling.scheduler.current()
+
+  put_record("jobs.json", {**job, "notes": "ödeme hatırlatıldı"})
+  assert scheduling.scheduler.current() is before
+
+  put_record("jobs.json", {**job, "location": "Yeni adres"})
+  assert scheduling.scheduler.current() is not before
@@ -0,0 +1,27 @@
+"""SQLite backend keeps the saved list order for record-level changes."""
+
+from app.storage import SqliteBackend
+
+
+def _put(record: dict) -> dict:
+  return {"op": "put", "id": record["id"], "record": record}
+
+
+def test_apply_events_keeps_front_and_back_positions(tmp_path):
+  backend = SqliteBackend(tmp_path / "md.sqlite3")
+  records = [{"id": f"r{i}"} for i in range(3)]
+  backend.write("customers.json", records)
+
+  front = [{"id": f"f{i}"} for i in range(3)]
+  appended = {"id": "b0"}
+  records = front + records + [appended]
+  backend.apply_events({"customers.json": (records, [_put(r) for r in reversed(front)] + [_put(appended)])})
+  assert backend.read("customers.json") == records
+
+  middle = {"id": "m"}
+  records.insert(2, middle)
+  updated = {**records[0], "name": "x"}
+  records[0] = updated
+  backend.apply_events({"customers.json": (records, [_put(middle), _put(updated)])})
+  assert backend.read("customers.json") == records
+  assert [r["id"] for r in backend.find_records("customers.json", "id", "m")] == ["m"]
@@ -0,0 +1,43 @@
+"""Thumbnails render in the background: 202 while pending, then the JPEG."""
+
+import io
+import time
+import uuid
+
+from PIL import Image
+
+from app.routers import documents
+
+
+def _png() -> bytes:
+  out = io.BytesIO()
+  # unique pixels so the content hash (and thumbnail cache key) is new
+  Image.frombytes("RGB", (64, 64), uuid.uuid4().bytes * (64 * 64 * 3 // 16)).save(out, "PNG")
+  return out.getvalue()
+
+
+def test_thumbnail_is_accepted_then_served(client, monkeypatch):
+  response = client.post(
+      "/documents/upload",
+      data={"jobId": "JOB-TEST", "docType": "olcu"},
+      files={"file": ("olcu.png", _png(), "image/png")},
+  )
+  assert response.status_code == 200, response.text
+  doc = response.json()
+
+  monkeypatch.setattr(documents, "THUMBNAIL_WAIT_SECONDS", 0)
+  first = client.get(f"/documents/{doc['id']}/thumbnail")
+  assert first.status_code == 202
+  assert first.headers["retry-after"] == "2"
+
+  deadline = time.monotonic() + 60
+  while (response := client.get(f"/documents/{doc['id']}/thumbnail")).status_code == 202:
+    assert time.monotonic() < deadline
+    time.sleep(0.1)
+  assert response.status_code == 200
+  assert response.headers["content-type"] == "image/jpeg"
+  assert response.content.startswith(b"\xff\xd8\xff")
+  assert Image.open(io.BytesIO(response.content)).size == (64, 64)
+
+  cached = client.get(f"/documents/{doc['id']}/thumbnail", headers={"If-None-Match": response.headers["etag"]})
+  assert cached.status_code == 304
@@ -0,0 +1,48 @@
+"""Upload limits and content-based type detection."""
+
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.uploads import MAX_UPLOAD_BYTES, receive_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def test_oversized_upload_is_rejected_from_content_length(client):
+  response = client.post(
+      "/documents/upload",
+      data={"jobId": "JOB-TEST", "docType": "diger"},
+      files={"file": ("big.pdf", b"%PDF-" + b"0" * (MAX_UPLOAD_BYTES + 64 * 1024), "application/pdf")},
+  )
+  assert response.status_code == 413
+
+
+def test_streamed_upload_stops_at_the_limit(tmp_path):
+  file = UploadFile(io.BytesIO(b"%PDF-" + b"0" * 100), filename="big.pdf")
+  with pytest.raises(HTTPException) as exc:
+    asyncio.run(receive_upload(file, tmp_path, max_bytes=50))
+  assert exc.value.status_code == 413
+  assert list(tmp_path.iterdir()) == []
+
+
+def test_declared_type_must_match_content(client):
+  response = client.post(
+      "/documents/upload",
+      data={"jobId": "JOB-TEST", "docType": "teknik"},
+      files={"file": ("cizim.pdf", PNG, "application/pdf")},
+  )
+  assert response.status_code == 400
+  assert "image/png" in response.json()["detail"]
+
+
+def test_unrecognised_content_is_rejected(client):
+  response = client.post(
+      "/documents/upload",
+      data={"jobId": "JOB-TEST", "docType": "diger"},
+      files={"file": ("notlar.pdf", b"just text", "application/pdf")},
+  )
+  assert response.status_code == 400
+  assert "tanınmadı" in response.json()["detail"]
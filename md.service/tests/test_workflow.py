@@ -0,0 +1,29 @@
+"""Illegal job status changes are refused with 409 and leave the job as it was."""
+
+from test_allocation import _offered_job
+
+
+def test_direct_jump_to_closed_is_refused(client):
+  job_id = _offered_job(client)
+
+  for path, body in (
+      (f"/jobs/{job_id}/status", {"status": "KAPALI"}),
+      (f"/jobs/{job_id}/status", {"status": "URETIMDE"}),
+      (f"/jobs/{job_id}/finance/close", {"total": 100, "payments": {"cash": 100}}),
+  ):
+    response = client.put(path, json=body)
+    assert response.status_code == 409, (path, body, response.text)
+    assert response.json()["detail"]
+
+  assert client.get(f"/jobs/{job_id}").json()["status"] == "TEKLIF_HAZIR"
+
+
+def test_bulk_change_is_all_or_nothing(client):
+  movable, stuck = _offered_job(client), _offered_job(client)
+  client.put(f"/jobs/{movable}/status", json={"status": "FIYATLANDIRMA"})
+
+  response = client.patch("/jobs/status", json={"jobIds": [movable, stuck], "status": "OLCU_ASAMASI"})
+
+  assert response.status_code == 422
+  assert [r["ok"] for r in response.json()["results"]] == [True, False]
+  assert client.get(f"/jobs/{movable}").json()["status"] == "FIYATLANDIRMA"
@@ -2,7 +2,7 @@ import { useEffect, useState, useMemo } from 'react';
 import Loader from '../components/Loader';
 import Modal from '../components/Modal';
 import PageHeader from '../components/PageHeader';
-import { getDocuments, getJobs, deleteDocument, getDocumentDownloadUrl } from '../services/dataService';
+import { getDocuments, getJobSummaries, deleteDocument, getDocumentDownloadUrl } from '../services/dataService';
 
 const DOCUMENT_TYPES = {
   olcu: { label: 'Ölçü Taslağı', icon: '📏', color: '#3b82f6' },
@@ -51,12 +51,12 @@ const Arsiv = () => {
       try {
         setLoading(true);
         setError('');
-        const [docsPayload, jobsPayload] = await Promise.all([
+        const [docsPayload, jobsPage] = await Promise.all([
           getDocuments(),
-          getJobs(),
+          getJobSummaries(),
         ]);
         setDocuments(docsPayload);
-        setJobs(jobsPayload);
+        setJobs(jobsPage.items);
       } catch (err) {
         setError(err.message || 'Arşiv alınamadı');
       } finally {
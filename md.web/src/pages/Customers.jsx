@@ -238,8 +238,23 @@ const Customers = () => {
                   </div>
                   <div className="metric-row">
                     <span className="metric-label">Toplam İş</span>
-                    <span className="metric-value">{customer.jobs ?? 0}</span>
+                    <span className="metric-value">
+                      {customer.jobs ?? 0}
+                      {customer.openJobs ? ` (${customer.openJobs} açık)` : ''}
+                    </span>
                   </div>
+                  {customer.outstanding ? (
+                    <div className="metric-row">
+                      <span className="metric-label">Açık Bakiye</span>
+                      <span className="metric-value">₺{Number(customer.outstanding).toLocaleString('tr-TR')}</span>
+                    </div>
+                  ) : null}
+                  {customer.lastActivity ? (
+                    <div className="metric-row">
+                      <span className="metric-label">Son İşlem</span>
+                      <span className="metric-value">{new Date(customer.lastActivity).toLocaleDateString('tr-TR')}</span>
+                    </div>
+                  ) : null}
                   <div className="metric-row">
                     <span className="metric-label">İletişim</span>
                     <span className="metric-value">{customer.contact}</span>
@@ -1,11 +1,16 @@
 import { useEffect, useState } from 'react';
 import DataTable from '../components/DataTable';
 import PageHeader from '../components/PageHeader';
-import { getInvoices } from '../services/dataService';
+import { getInvoices, getInvoicesPage } from '../services/dataService';
+
+const PAGE_SIZE = 50;
 
 const EvrakIrsaliyeFatura = () => {
   const [rows, setRows] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
   useEffect(() => {
@@ -13,10 +18,19 @@ const EvrakIrsaliyeFatura = () => {
       try {
         setLoading(true);
         setError('');
-        const payload = await getInvoices();
-        setRows(payload);
+        const page = await getInvoicesPage({ limit: PAGE_SIZE });
+        setRows(page.items);
+        setTotal(page.total);
+        setNextCursor(page.nextCursor);
       } catch (err) {
-        setError(err.message || 'Evraklar alınamadı');
+        try {
+          const payload = await getInvoices();
+          setRows(payload);
+          setTotal(payload.length);
+          setNextCursor(null);
+        } catch (fallbackErr) {
+          setError(fallbackErr.message || err.message || 'Evraklar alınamadı');
+        }
       } finally {
         setLoading(false);
       }
@@ -25,6 +39,21 @@ const EvrakIrsaliyeFatura = () => {
     load();
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await getInvoicesPage({ limit: PAGE_SIZE, cursor: nextCursor });
+      setRows((prev) => [...prev, ...page.items]);
+      setTotal(page.total);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err.message || 'Evraklar alınamadı');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <div>
       <PageHeader title="İrsaliye & Fatura" subtitle="Kesilmiş veya taslak evraklar" />
@@ -49,6 +78,14 @@ const EvrakIrsaliyeFatura = () => {
           rows={rows}
         />
       )}
+
+      {!loading && !error && nextCursor ? (
+        <div style={{ display: 'flex', justifyContent: 'center', marginTop: 16 }}>
+          <button type="button" className="btn btn-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Yükleniyor...' : `Daha fazla yükle (${rows.length}/${total})`}
+          </button>
+        </div>
+      ) : null}
     </div>
   );
 };
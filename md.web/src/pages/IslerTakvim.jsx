@@ -3,7 +3,21 @@ import DataTable from '../components/DataTable';
 import PageHeader from '../components/PageHeader';
 import { getPlanningEvents } from '../services/dataService';
 
+const toIso = (d) => `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+
+const monthWindow = (offset) => {
+  const now = new Date();
+  const first = new Date(now.getFullYear(), now.getMonth() + offset, 1);
+  const last = new Date(now.getFullYear(), now.getMonth() + offset + 1, 0);
+  return {
+    dateFrom: toIso(first),
+    dateTo: toIso(last),
+    label: first.toLocaleDateString('tr-TR', { month: 'long', year: 'numeric' }),
+  };
+};
+
 const IslerTakvim = () => {
+  const [monthOffset, setMonthOffset] = useState(0);
   const [events, setEvents] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
@@ -13,7 +27,8 @@ const IslerTakvim = () => {
       try {
         setLoading(true);
         setError('');
-        const payload = await getPlanningEvents();
+        const { dateFrom, dateTo } = monthWindow(monthOffset);
+        const payload = await getPlanningEvents({ dateFrom, dateTo });
         setEvents(payload);
       } catch (err) {
         setError(err.message || 'Takvim verisi alınamadı');
@@ -23,11 +38,27 @@ const IslerTakvim = () => {
     };
 
     load();
-  }, []);
+  }, [monthOffset]);
 
   return (
     <div>
-      <PageHeader title="Keşif / Ölçü Takvimi" subtitle="İşlere ait keşif, montaj ve teslim planları" />
+      <PageHeader
+        title="Keşif / Ölçü Takvimi"
+        subtitle={`İşlere ait keşif, montaj ve teslim planları — ${monthWindow(monthOffset).label}`}
+        actions={
+          <div className="btn-group" style={{ gap: 8 }}>
+            <button type="button" className="btn btn-secondary" onClick={() => setMonthOffset((m) => m - 1)}>
+              ‹ Önceki Ay
+            </button>
+            <button type="button" className="btn btn-secondary" onClick={() => setMonthOffset(0)}>
+              Bu Ay
+            </button>
+            <button type="button" className="btn btn-secondary" onClick={() => setMonthOffset((m) => m + 1)}>
+              Sonraki Ay ›
+            </button>
+          </div>
+        }
+      />
 
       {loading ? (
         <div className="card subtle-card">Takvim yükleniyor...</div>
@@ -41,7 +72,7 @@ const IslerTakvim = () => {
           columns={[
             { label: 'Başlık', accessor: 'title' },
             { label: 'Tarih', accessor: 'date' },
-            { label: 'Tür', accessor: 'type' },
+            { label: 'Tür', accessor: 'type', render: (value, row) => (row.proposed ? `${value} (öneri)` : value) },
             { label: 'Sorumlu', accessor: 'owner' },
             { label: 'Lokasyon', accessor: 'location' },
           ]}
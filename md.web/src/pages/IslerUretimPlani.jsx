@@ -1,10 +1,15 @@
 import { useEffect, useState } from 'react';
 import DataTable from '../components/DataTable';
 import PageHeader from '../components/PageHeader';
-import { getJobs } from '../services/dataService';
+import { getPlanningSchedule } from '../services/dataService';
+
+const WINDOW_DAYS = 28;
+
+const toIso = (d) => `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
 
 const IslerUretimPlani = () => {
-  const [jobs, setJobs] = useState([]);
+  const [bookings, setBookings] = useState([]);
+  const [conflicts, setConflicts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -13,8 +18,11 @@ const IslerUretimPlani = () => {
       try {
         setLoading(true);
         setError('');
-        const payload = await getJobs();
-        setJobs(payload);
+        const from = new Date();
+        const to = new Date(from.getFullYear(), from.getMonth(), from.getDate() + WINDOW_DAYS);
+        const payload = await getPlanningSchedule({ dateFrom: toIso(from), dateTo: toIso(to) });
+        setBookings(payload.bookings || []);
+        setConflicts(payload.conflicts || []);
       } catch (err) {
         setError(err.message || 'Üretim planı alınamadı');
       } finally {
@@ -27,7 +35,7 @@ const IslerUretimPlani = () => {
 
   return (
     <div>
-      <PageHeader title="Üretim Planı" subtitle="Termin ve duruma göre üretim işleri" />
+      <PageHeader title="Üretim Planı" subtitle={`Ekip kapasitesine göre önümüzdeki ${WINDOW_DAYS} günün üretim ve montaj slotları`} />
 
       {loading ? (
         <div className="card subtle-card">Üretim planı yükleniyor...</div>
@@ -37,16 +45,29 @@ const IslerUretimPlani = () => {
           <div className="error-message">{error}</div>
         </div>
       ) : (
-        <DataTable
-          columns={[
-            { label: 'İş', accessor: 'name' },
-            { label: 'Müşteri', accessor: 'customer' },
-            { label: 'Durum', accessor: 'status' },
-            { label: 'Termin', accessor: 'dueDate' },
-            { label: 'Sorumlu', accessor: 'owner' },
-          ]}
-          rows={jobs}
-        />
+        <>
+          {conflicts.length > 0 ? (
+            <div className="card error-card">
+              <div className="error-title">Çakışan ekip günleri</div>
+              <div className="error-message">
+                {conflicts.map((c) => `${c.date} ${c.team} (kapasite ${c.capacity}): ${c.jobIds.join(', ')}`).join(' · ')}
+              </div>
+            </div>
+          ) : null}
+          <DataTable
+            columns={[
+              { label: 'İş', accessor: 'title' },
+              { label: 'Müşteri', accessor: 'customerName' },
+              { label: 'Aşama', accessor: 'kind', render: (value) => (value === 'production' ? 'Üretim' : 'Montaj') },
+              { label: 'Ekip', accessor: 'team' },
+              { label: 'Başlangıç', accessor: 'start' },
+              { label: 'Bitiş', accessor: 'end' },
+              { label: 'Durum', accessor: 'proposed', render: (value, row) => (value ? `Öneri · ${row.status}` : row.status) },
+            ]}
+            rows={bookings}
+            getKey={(row) => `${row.jobId}-${row.kind}`}
+          />
+        </>
       )}
     </div>
   );
@@ -9,7 +9,7 @@ import {
   createJob,
   getCustomers,
   getJob,
-  getJobs,
+  getJobSummaries,
   scheduleAssembly,
   startJobApproval,
   updateJobMeasure,
@@ -29,6 +29,9 @@ import {
   getJobDocuments,
   deleteDocument,
   getDocumentDownloadUrl,
+  getDocumentThumbnailUrl,
+  hasDocumentThumbnail,
+  getPlanningTeams,
 } from '../services/dataService';
 
 const normalizeJob = (job) => ({
@@ -41,6 +44,17 @@ const normalizeJob = (job) => ({
   pendingPO: job?.pendingPO || [],
 });
 
+// liste satırı: özet görünümündeki alanlar; tam iş yalnızca detay açılınca çekilir
+const toListRow = (job) => ({
+  id: job.id,
+  title: job.title,
+  customerId: job.customerId,
+  customerName: job.customerName,
+  status: job.status,
+  startType: job.startType,
+  roles: Array.isArray(job?.roles) ? job.roles : [],
+});
+
 const toMessage = (err) => {
   if (!err) return 'Bilinmeyen hata';
   if (typeof err === 'string') return err;
@@ -97,8 +111,8 @@ const JobsList = () => {
       try {
         setLoading(true);
         setError('');
-        const [jobsPayload, customersPayload] = await Promise.all([getJobs(), getCustomers()]);
-        setJobs(jobsPayload.map(normalizeJob));
+        const [jobsPage, customersPayload] = await Promise.all([getJobSummaries(), getCustomers()]);
+        setJobs(jobsPage.items.map(toListRow));
         setCustomers(customersPayload.filter((c) => !c.deleted));
         const rolesPayload = await getJobRoles();
         setJobRoles(rolesPayload);
@@ -316,7 +330,7 @@ const JobsList = () => {
                 startType: form.startType,
                 roles: form.roles,
               });
-              setJobs((prev) => [normalizeJob(job), ...prev]);
+              setJobs((prev) => [toListRow(job), ...prev]);
               setForm((prev) => ({
                 ...prev,
                 roles: [],
@@ -555,7 +569,7 @@ const JobsList = () => {
             job={selectedJob}
             onUpdated={async (updated) => {
               setSelectedJob(updated);
-              setJobs((prev) => prev.map((j) => (j.id === updated.id ? updated : j)));
+              setJobs((prev) => prev.map((j) => (j.id === updated.id ? toListRow(updated) : j)));
             }}
           />
         ) : null}
@@ -637,7 +651,6 @@ const JobStepper = ({ job, onUpdated }) => {
     payCheque: '',
     payAfter: '',
     chequeLines: [],
-    stockReady: true,
     stockNote: '',
     productionStatus: 'URETIMDE',
     agreementDate: '',
@@ -653,6 +666,15 @@ const JobStepper = ({ job, onUpdated }) => {
     discountNote: '',
   });
 
+  // montaj ekibi alanı yalnızca tanımlı ekipleri kabul eder
+  const [assemblyTeams, setAssemblyTeams] = useState([]);
+
+  useEffect(() => {
+    getPlanningTeams()
+      .then((teams) => setAssemblyTeams(teams.filter((t) => t.kind === 'assembly')))
+      .catch(() => setAssemblyTeams([]));
+  }, []);
+
   // Document upload state
   const [uploadingDoc, setUploadingDoc] = useState(false);
   const [jobDocuments, setJobDocuments] = useState([]);
@@ -1207,6 +1229,19 @@ const JobStepper = ({ job, onUpdated }) => {
                             rel="noopener noreferrer"
                             className="text-primary"
                           >
+                            {hasDocumentThumbnail(doc) && (
+                              <img
+                                src={getDocumentThumbnailUrl(doc.id)}
+                                alt=""
+                                loading="lazy"
+                                width={40}
+                                height={40}
+                                style={{ objectFit: 'cover', borderRadius: 4, marginRight: 8, verticalAlign: 'middle' }}
+                                onError={(e) => {
+                                  e.currentTarget.style.display = 'none';
+                                }}
+                              />
+                            )}
                             📎 {doc.originalName}
                           </a>
                           <button
@@ -1255,6 +1290,19 @@ const JobStepper = ({ job, onUpdated }) => {
                             rel="noopener noreferrer"
                             className="text-primary"
                           >
+                            {hasDocumentThumbnail(doc) && (
+                              <img
+                                src={getDocumentThumbnailUrl(doc.id)}
+                                alt=""
+                                loading="lazy"
+                                width={40}
+                                height={40}
+                                style={{ objectFit: 'cover', borderRadius: 4, marginRight: 8, verticalAlign: 'middle' }}
+                                onError={(e) => {
+                                  e.currentTarget.style.display = 'none';
+                                }}
+                              />
+                            )}
                             📎 {doc.originalName}
                           </a>
                           <button
@@ -1560,7 +1608,7 @@ const JobStepper = ({ job, onUpdated }) => {
                         cheques: inputs.chequeLines,
                     },
                     contractUrl: null,
-                    stockNeeds: [],
+                    stockNeeds: reservedLines.map((l) => ({ itemId: l.id, qty: l.qty })),
                     };
                     const res = await startJobApproval(job.id, payload);
                     applyLocalJobPatch(job.id, {
@@ -1662,14 +1710,6 @@ const JobStepper = ({ job, onUpdated }) => {
               />
             </div>
 
-            <label className="form-label">
-              <input
-                type="checkbox"
-                checked={inputs.stockReady}
-                onChange={(e) => setInputs((p) => ({ ...p, stockReady: e.target.checked }))}
-              />{' '}
-              Stok hazır (rezerv edildi)
-            </label>
             {reservedLines.some((l) => l.qty > l.available) ? (
               <div className="card error-card">
                 <div className="error-title">Eksik Stok</div>
@@ -1700,21 +1740,22 @@ const JobStepper = ({ job, onUpdated }) => {
               onClick={() =>
                 act(async () => {
                   const payload = {
-                    ready: inputs.stockReady,
                     purchaseNotes:
                       inputs.stockNote ||
                       reservedLines
                         .map((l) => `${l.name} (${l.sku}) - ${l.qty} ${l.unit || ''} (mevcut ${l.available})`)
                         .join(' | '),
-                    items: reservedLines,
+                    stockNeeds: reservedLines.map((l) => ({ itemId: l.id, qty: l.qty })),
                     pending: reservedLines
                       .filter((l) => l.qty > l.available)
                       .map((l) => ({ ...l, missing: l.qty - l.available })),
                   };
                   const result = await updateStockStatus(job.id, payload);
+                  // hazır bilgisi sunucudaki rezervasyondan gelir
+                  const ready = Boolean(result?.stock?.ready);
                   // Mock/local veri tutarlılığı için stokları güncelle
                   applyLocalStockReservation(reservedLines, {
-                    ready: inputs.stockReady,
+                    ready,
                     note: payload.purchaseNotes,
                     jobId: job.id,
                   });
@@ -1735,11 +1776,8 @@ const JobStepper = ({ job, onUpdated }) => {
                       const line = reservedLines.find((l) => l.id === item.id);
                       if (!line) return item;
                       const next = { ...item };
-                      if (inputs.stockReady) {
-                        next.onHand = Math.max(0, (next.onHand || 0) - line.qty);
-                      } else {
-                        next.reserved = (next.reserved || 0) + line.qty;
-                      }
+                      // sunucu serbest miktar kadar rezerve eder, eksik kısım beklemede kalır
+                      next.reserved = (next.reserved || 0) + Math.min(line.qty, item.available ?? line.qty);
                       next.available = Math.max(0, (next.onHand || 0) - (next.reserved || 0));
                       return next;
                     })
@@ -2039,9 +2077,15 @@ const JobStepper = ({ job, onUpdated }) => {
                 <input
                   className="form-input"
                   placeholder="Montaj ekibi"
+                  list="assembly-teams"
               value={inputs.assemblyTeam}
               onChange={(e) => setInputs((p) => ({ ...p, assemblyTeam: e.target.value }))}
             />
+                <datalist id="assembly-teams">
+                  {assemblyTeams.map((t) => (
+                    <option key={t.id} value={t.name} />
+                  ))}
+                </datalist>
               </div>
             </div>
             <div className="form-group">
@@ -1,30 +1,81 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import DataTable from '../components/DataTable';
 import PageHeader from '../components/PageHeader';
-import { getStockMovements } from '../services/dataService';
+import { getStockMovements, getStockMovementsPage, subscribeChanges } from '../services/dataService';
+
+const PAGE_SIZE = 50;
 
 const StokHareketler = () => {
   const [rows, setRows] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
+  // değişiklik akışı geldiğinde listede zaten olan satırları ayırt etmek için
+  const rowsRef = useRef(rows);
+
+  useEffect(() => {
+    rowsRef.current = rows;
+  }, [rows]);
 
   useEffect(() => {
     const load = async () => {
       try {
         setLoading(true);
         setError('');
-        const payload = await getStockMovements();
-        setRows(payload);
+        const page = await getStockMovementsPage({ limit: PAGE_SIZE });
+        setRows(page.items);
+        setTotal(page.total);
+        setNextCursor(page.nextCursor);
       } catch (err) {
-        setError(err.message || 'Hareketler alınamadı');
+        try {
+          const payload = await getStockMovements();
+          setRows(payload);
+          setTotal(payload.length);
+          setNextCursor(null);
+        } catch (fallbackErr) {
+          setError(fallbackErr.message || err.message || 'Hareketler alınamadı');
+        }
       } finally {
         setLoading(false);
       }
     };
 
     load();
+
+    // yeni hareketleri tüm listeyi yeniden çekmeden başa ekle
+    const unsubscribe = subscribeChanges(['stockMovements'], {
+      onChange: (change) => {
+        if (change.op === 'put') {
+          const listed = rowsRef.current.some((row) => row.id === change.id);
+          setRows((prev) => [change.record, ...prev.filter((row) => row.id !== change.id)]);
+          if (!listed) setTotal((prev) => prev + 1);
+        } else if (change.op === 'delete') {
+          setRows((prev) => prev.filter((row) => row.id !== change.id));
+          setTotal((prev) => Math.max(0, prev - 1));
+        }
+      },
+      onReset: load,
+    });
+    return unsubscribe;
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await getStockMovementsPage({ limit: PAGE_SIZE, cursor: nextCursor });
+      setRows((prev) => [...prev, ...page.items]);
+      setTotal(page.total);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err.message || 'Hareketler alınamadı');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <div>
       <PageHeader title="Stok Hareketleri" subtitle="Güncel giriş/çıkış işlemleri" />
@@ -62,6 +113,14 @@ const StokHareketler = () => {
           rows={rows}
         />
       )}
+
+      {!loading && !error && nextCursor ? (
+        <div style={{ display: 'flex', justifyContent: 'center', marginTop: 16 }}>
+          <button type="button" className="btn btn-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Yükleniyor...' : `Daha fazla yükle (${rows.length}/${total})`}
+          </button>
+        </div>
+      ) : null}
     </div>
   );
 };
@@ -42,6 +42,58 @@ const fetchJson = async (path, options = {}) => {
   return response.json();
 };
 
+/**
+ * Sunucu tarafı sayfalama: liste endpointleri `limit`/`offset`/`cursor`/`sort`
+ * ve alan filtrelerini kabul eder, toplamı ve sonraki sayfa imlecini
+ * `X-Total-Count` / `X-Next-Cursor` başlıklarında döner.
+ * @returns {Promise<{items: Array, total: number, nextCursor: string|null}>}
+ */
+const fetchPage = async (path, params = {}) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') query.append(key, value);
+  });
+  const url = query.toString() ? `${API_BASE}${path}?${query.toString()}` : `${API_BASE}${path}`;
+  const response = await fetch(url, { headers: { 'Content-Type': 'application/json' } });
+  if (!response.ok) {
+    const err = await response.json().catch(() => ({}));
+    throw new Error(err.detail || response.statusText);
+  }
+  const items = await response.json();
+  return {
+    items,
+    total: Number(response.headers.get('X-Total-Count') ?? items.length),
+    nextCursor: response.headers.get('X-Next-Cursor'),
+  };
+};
+
+/** İş listesi için hafif özet (ölçü, teklif satırları ve loglar olmadan). */
+export const getJobSummaries = async (params = {}) => fetchPage('/jobs/', { view: 'summary', ...params });
+
+export const getStockMovementsPage = async (params) => fetchPage('/stock/movements', params);
+
+export const getInvoicesPage = async (params) => fetchPage('/finance/invoices', params);
+
+/**
+ * Sunucudaki kayıt değişikliklerini (SSE) dinler; tarayıcı bağlantı koparsa
+ * `Last-Event-ID` ile kaldığı yerden devam eder.
+ * `onChange({ collection, op, id, record })` her put/delete için çağrılır;
+ * `onReset()` değişiklik kaçırıldığında çağrılır, liste yeniden çekilmelidir.
+ * @returns {() => void} aboneliği kapatan fonksiyon
+ */
+export const subscribeChanges = (collections, { onChange, onReset } = {}) => {
+  if (typeof EventSource === 'undefined') return () => {};
+  const query = collections?.length ? `?collections=${encodeURIComponent(collections.join(','))}` : '';
+  const source = new EventSource(`${API_BASE}/events/stream${query}`);
+  source.addEventListener('change', (event) => {
+    const change = JSON.parse(event.data);
+    if (change.op === 'reload') onReset?.();
+    else onChange?.(change);
+  });
+  source.addEventListener('reset', () => onReset?.());
+  return () => source.close();
+};
+
 export const getDashboardData = async () => {
   const data = await fetchData();
   return {
@@ -187,17 +239,37 @@ export const updateCustomer = async (id, payload) => {
   });
 };
 
+/** Müşteri özeti: duruma göre iş sayıları, teklif toplamı, açık bakiye, son işlem. */
+export const getCustomerSummary = async (id) => fetchJson(`/customers/${id}/summary`);
+
 export const softDeleteCustomer = async (id) => {
   return fetchJson(`/customers/${id}`, {
     method: 'DELETE',
   });
 };
 
-export const getPlanningEvents = async () => {
-  const data = await fetchData();
-  return data.planningEvents || [];
+const planningQuery = (params = {}) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') query.append(key, value);
+  });
+  return query.toString() ? `?${query.toString()}` : '';
 };
 
+/**
+ * Takvim kayıtları (montaj/üretim slotları, keşifler, manuel planlar).
+ * `dateFrom` / `dateTo` (YYYY-MM-DD) verilirse yalnızca o aralıkla kesişenler döner.
+ */
+export const getPlanningEvents = async ({ dateFrom, dateTo } = {}) =>
+  fetchJson(`/planning/events${planningQuery({ date_from: dateFrom, date_to: dateTo })}`);
+
+/** Üretim/montaj planı: sabit ve önerilen slotlar + çakışan ekip günleri. */
+/** Üretim ve montaj ekipleri (`kind`, günlük `capacity`). */
+export const getPlanningTeams = async () => fetchJson('/planning/teams');
+
+export const getPlanningSchedule = async ({ dateFrom, dateTo, kind } = {}) =>
+  fetchJson(`/planning/schedule${planningQuery({ date_from: dateFrom, date_to: dateTo, kind })}`);
+
 export const getStockItems = async () => {
   try {
     return await fetchJson('/stock/items');
@@ -429,3 +501,8 @@ export const deleteDocument = async (docId) =>
 
 export const getDocumentDownloadUrl = (docId) => `${API_BASE}/documents/${docId}/download`;
 
+// görseller ve PDF'ler için küçük önizleme (JPEG, en fazla 320px)
+export const getDocumentThumbnailUrl = (docId) => `${API_BASE}/documents/${docId}/thumbnail`;
+
+export const hasDocumentThumbnail = (doc) => /^image\/|^application\/pdf$/.test(doc?.mimeType || '');
+